@@ -1,5 +1,27 @@
-from fastapi import APIRouter, Depends
+import os
+from dataclasses import asdict
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 from ..core.admin import admin_required
+from ..core.config import settings
+from ..models.admin import (
+    CPUProfileRequest, FAQBulkLoad, IntentSet, RelevanceCalibration, RelevanceThreshold, RoutingPolicyUpdate
+)
+from ..services.chat_service import chat_service
+from ..services.embedding_batcher import query_embedding_batcher
+from ..services.embedding_cache import query_embedding_cache
+from ..services.faq_store import faq_store
+from ..services.intent_classifier import intent_classifier
+from ..services.llm_gateway import llm_gateway
+from ..services.model_router import model_router
+from ..services.profiler import cpu_profiler, memory_profiler, task_stacks, thread_stacks
+from ..services.relevance_gate import relevance_gate
+from ..services.reranker import reranker
+from ..services.semantic_cache import semantic_cache
+from ..services.session_store import session_store
+from ..services.single_flight import llm_flights
+from ..services.slow_request_log import slow_request_log
 
 router = APIRouter(prefix="/admin", tags=["Admin Dashboard"])
 
@@ -9,3 +31,233 @@ def admin_status(admin=Depends(admin_required)):
         "message": "Admin access granted",
         "admin": admin["sub"]
     }
+
+
+@router.get("/sessions")
+def session_store_stats(admin=Depends(admin_required)):
+    return {**session_store.get_stats(), "memory": chat_service.memory.get_stats()}
+
+
+@router.get("/cache")
+def semantic_cache_stats(admin=Depends(admin_required)):
+    return semantic_cache.get_stats()
+
+
+@router.delete("/cache")
+def clear_semantic_cache(admin=Depends(admin_required)):
+    semantic_cache.clear()
+    return {"message": "Semantic cache cleared"}
+
+
+@router.get("/cache/embeddings")
+def query_embedding_cache_stats(admin=Depends(admin_required)):
+    return {**query_embedding_cache.get_stats(), "batching": query_embedding_batcher.get_stats()}
+
+
+@router.get("/rerank")
+def rerank_stats(admin=Depends(admin_required)):
+    return reranker.get_stats()
+
+
+@router.get("/coalescing")
+def request_coalescing_stats(admin=Depends(admin_required)):
+    return llm_flights.get_stats()
+
+
+@router.get("/llm")
+def llm_gateway_stats(admin=Depends(admin_required)):
+    return llm_gateway.get_stats()
+
+
+@router.get("/slow-requests")
+def slow_requests(
+    limit: int = Query(50, ge=1, le=1000, description="Maximum number of requests to return"),
+    min_total_ms: Optional[float] = Query(None, ge=0, description="Only requests at least this slow"),
+    collection: Optional[str] = Query(None, description="Only requests to this collection"),
+    admin=Depends(admin_required),
+):
+    """Most recent slow chat requests with their pipeline breakdown, newest first"""
+    requests = slow_request_log.recent(limit, min_total_ms, collection)
+    return {**slow_request_log.get_stats(), "requests": requests}
+
+
+@router.get("/routing")
+def model_routing(admin=Depends(admin_required)):
+    return {**model_router.get_stats(), "policy": asdict(model_router.get_policy())}
+
+
+@router.put("/routing")
+def set_routing_policy(body: RoutingPolicyUpdate, admin=Depends(admin_required)):
+    # Only fields sent in the request change; an explicit null puts a model back to its default
+    changes = {
+        name: value for name, value in body.model_dump(exclude_unset=True).items()
+        if value is not None or name.endswith("_model")
+    }
+    try:
+        policy = model_router.set_policy(changes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"policy": asdict(policy)}
+
+
+@router.delete("/routing")
+def reset_routing_policy(admin=Depends(admin_required)):
+    model_router.reset()
+    return {"policy": asdict(model_router.get_policy())}
+
+
+@router.get("/relevance")
+def relevance_gate_stats(admin=Depends(admin_required)):
+    return relevance_gate.get_stats()
+
+
+@router.put("/relevance/{collection_name}")
+def set_relevance_threshold(collection_name: str, body: RelevanceThreshold, admin=Depends(admin_required)):
+    relevance_gate.set_threshold(collection_name, body.threshold)
+    return {"collection_name": collection_name, "threshold": body.threshold}
+
+
+@router.post("/relevance/{collection_name}/calibrate")
+def calibrate_relevance_threshold(collection_name: str, body: RelevanceCalibration, admin=Depends(admin_required)):
+    try:
+        return relevance_gate.calibrate(
+            collection_name,
+            body.in_scope,
+            body.out_of_scope,
+            body.target_recall if body.target_recall is not None else settings.RELEVANCE_TARGET_RECALL,
+            apply=body.apply,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/intents")
+def intent_classifier_stats(admin=Depends(admin_required)):
+    return intent_classifier.get_stats()
+
+
+@router.get("/intents/{collection_name}")
+def get_intents(collection_name: str, admin=Depends(admin_required)):
+    return {
+        "collection_name": collection_name,
+        "custom": intent_classifier.is_custom(collection_name),
+        "intents": intent_classifier.get_intents(collection_name),
+    }
+
+
+@router.put("/intents/{collection_name}")
+def set_intents(collection_name: str, body: IntentSet, admin=Depends(admin_required)):
+    intents = {label: intent.model_dump() for label, intent in body.intents.items()}
+    try:
+        intent_classifier.set_intents(collection_name, intents)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"collection_name": collection_name, "custom": True, "intents": intents}
+
+
+@router.delete("/intents/{collection_name}")
+def reset_intents(collection_name: str, admin=Depends(admin_required)):
+    intent_classifier.forget(collection_name)
+    return {"collection_name": collection_name, "custom": False}
+
+
+@router.get("/faqs")
+def faq_stats(admin=Depends(admin_required)):
+    return faq_store.get_stats()
+
+
+@router.get("/faqs/{collection_name}")
+def list_faqs(
+    collection_name: str,
+    limit: int = Query(100, ge=1, le=5000, description="Maximum number of FAQs to return, most served first"),
+    admin=Depends(admin_required),
+):
+    faqs = faq_store.list(collection_name)
+    return {"collection_name": collection_name, "total": len(faqs), "faqs": faqs[:limit]}
+
+
+@router.post("/faqs/{collection_name}")
+def load_faqs(collection_name: str, body: FAQBulkLoad, admin=Depends(admin_required)):
+    try:
+        total = faq_store.load(collection_name, [faq.model_dump() for faq in body.faqs], replace=body.replace)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"collection_name": collection_name, "loaded": len(body.faqs), "total": total}
+
+
+@router.delete("/faqs/{collection_name}")
+def delete_faqs(collection_name: str, admin=Depends(admin_required)):
+    faq_store.delete_collection(collection_name)
+    return {"message": f"FAQs of '{collection_name}' deleted"}
+
+
+@router.post("/profile/cpu")
+def start_cpu_profile(body: CPUProfileRequest, admin=Depends(admin_required)):
+    """Sample stacks while the next N chat requests run"""
+    interval_ms = body.interval_ms or settings.PROFILE_SAMPLE_INTERVAL_MS
+    try:
+        cpu_profiler.start(body.requests, interval_ms / 1000)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return cpu_profiler.get_status()
+
+
+@router.get("/profile/cpu")
+def cpu_profile_status(admin=Depends(admin_required)):
+    return cpu_profiler.get_status()
+
+
+@router.get("/profile/cpu/flamegraph", response_class=PlainTextResponse)
+def cpu_profile_flamegraph(admin=Depends(admin_required)):
+    """Stacks sampled so far in the collapsed format (flamegraph.pl, speedscope, inferno)"""
+    if cpu_profiler.get_status()["state"] == "idle":
+        raise HTTPException(status_code=404, detail="No CPU profile has been taken")
+    return cpu_profiler.collapsed()
+
+
+@router.delete("/profile/cpu")
+def stop_cpu_profile(admin=Depends(admin_required)):
+    cpu_profiler.stop()
+    return cpu_profiler.get_status()
+
+
+@router.post("/profile/memory/snapshots")
+def take_memory_snapshot(admin=Depends(admin_required)):
+    """Take a tracemalloc snapshot (the first one starts tracing)"""
+    return memory_profiler.take_snapshot()
+
+
+@router.get("/profile/memory")
+def memory_profile_status(admin=Depends(admin_required)):
+    return memory_profiler.get_stats()
+
+
+@router.get("/profile/memory/diff")
+def memory_snapshot_diff(
+    to_id: int = Query(..., alias="to", description="Snapshot to inspect"),
+    from_id: Optional[int] = Query(None, alias="from", description="Earlier snapshot to compare with"),
+    group_by: str = Query("lineno", description="lineno, filename or traceback"),
+    limit: int = Query(25, ge=1, le=500),
+    admin=Depends(admin_required),
+):
+    """Largest allocation growth between two snapshots, or the largest allocations in one"""
+    try:
+        stats = memory_profiler.diff(to_id, from_id, group_by, limit)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"to": to_id, "from": from_id, "group_by": group_by, "stats": stats}
+
+
+@router.delete("/profile/memory")
+def stop_memory_profile(admin=Depends(admin_required)):
+    """Stop tracing allocations and drop the snapshots"""
+    memory_profiler.stop()
+    return memory_profiler.get_stats()
+
+
+@router.get("/profile/threads")
+async def dump_stacks(admin=Depends(admin_required)):
+    """Stacks of every thread and of every asyncio task of this worker"""
+    return {"pid": os.getpid(), "threads": thread_stacks(), "tasks": task_stacks()}
@@ -1,9 +1,19 @@
-from fastapi import APIRouter, HTTPException
+import json
+import time
+from contextlib import aclosing
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, WebSocket
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 from ..models.chat import (
     ChatMessage, ChatResponse, SessionCreate, SessionResponse, 
     SessionListResponse, ChatHistory, SessionInfo
 )
-from ..services.chat_service import chat_service
+from ..services.chat_service import chat_service, record_stage
+from ..services.chat_socket import chat_socket_manager
+from ..services.profiler import cpu_profiler
+from ..services.rate_limiter import rate_limit
+from ..services.slow_request_log import slow_request_log
 from datetime import datetime
 
 router = APIRouter(
@@ -13,9 +23,9 @@ router = APIRouter(
 )
 
 
-@router.post("/", response_model=ChatResponse, summary="Send a chat message",
+@router.post("/", response_model=ChatResponse, summary="Send a chat message", dependencies=[Depends(rate_limit)],
              description="Send a message to the AI assistant and get a response based on relevant context from the knowledge base")
-async def chat(message: ChatMessage):
+async def chat(message: ChatMessage, background_tasks: BackgroundTasks):
     """
     Send a chat message and receive an AI-generated response.
 
@@ -26,14 +36,22 @@ async def chat(message: ChatMessage):
     Returns the AI response along with relevant source documents.
     """
     try:
-        return chat_service.process_chat_message(message)
+        with slow_request_log.trace("chat", message), cpu_profiler.request():
+            response = await chat_service.process_chat_message(message)
+            # Conversation memory is folded after the response is sent
+            background_tasks.add_task(chat_service.update_memory, message.session_id)
+            # Serialized here (with pydantic's JSON encoder) so that the time it takes is measured
+            started = time.perf_counter()
+            body = response.model_dump_json()
+            record_stage("serialization", time.perf_counter() - started)
+        return Response(body, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/history/{session_id}", response_model=ChatHistory, summary="Get chat history",
             description="Retrieve the complete chat history for a specific session")
-async def get_chat_history(session_id: str):
+def get_chat_history(session_id: str):
     """
     Get the complete chat history for a session.
 
@@ -42,14 +60,14 @@ async def get_chat_history(session_id: str):
     Returns the complete conversation history.
     """
     history = chat_service.get_chat_history(session_id)
-    if not history:
+    if history is None:
         raise HTTPException(status_code=404, detail="Session not found")
     return ChatHistory(session_id=session_id, history=history)
 
 
 @router.post("/session", response_model=SessionResponse, summary="Create new chat session",
              description="Create a new chat session with optional user ID and metadata")
-async def create_chat_session(session_data: SessionCreate):
+def create_chat_session(session_data: SessionCreate):
     """
     Create a new chat session.
 
@@ -72,7 +90,7 @@ async def create_chat_session(session_data: SessionCreate):
 
 @router.delete("/session/{session_id}", summary="Delete chat session",
                description="Delete a specific chat session and all its history")
-async def delete_chat_session(session_id: str):
+def delete_chat_session(session_id: str):
     """
     Delete a chat session and all its history.
 
@@ -89,37 +107,76 @@ async def delete_chat_session(session_id: str):
 
 
 @router.get("/sessions", response_model=SessionListResponse, summary="List all chat sessions",
-            description="Get a list of all active chat sessions with their basic information")
-async def list_chat_sessions():
+            description="Get one page of active chat sessions with their basic information")
+def list_chat_sessions(
+    offset: int = Query(0, ge=0, description="Number of sessions to skip"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of sessions to return"),
+):
     """
-    List all active chat sessions.
+    List active chat sessions, most recently active first.
 
-    Returns summary information for all sessions including message count and activity timestamps.
+    - **offset** / **limit**: Page through the sessions
+
+    Returns the total session count and summary information (message count and activity
+    timestamps) for the requested page.
     """
-    sessions_info = chat_service.list_sessions()
+    total, sessions_info = chat_service.list_sessions(offset=offset, limit=limit)
     sessions = [SessionInfo(**session) for session in sessions_info]
     return SessionListResponse(
-        total_sessions=len(sessions),
+        total_sessions=total,
+        offset=offset,
+        limit=limit,
         sessions=sessions
     )
 
 
-@router.post("/stream", summary="Stream chat response",
-             description="Send a message and get a streaming response (basic implementation)")
+@router.post("/stream", summary="Stream chat response", dependencies=[Depends(rate_limit)],
+             description="Send a message and receive the answer as Server-Sent Events")
 async def stream_chat(message: ChatMessage):
     """
-    Send a message and receive a streaming response.
+    Send a message and receive a Server-Sent Events stream.
+
+    Events, in order:
+    - **sources**: `{"session_id", "sources"}` as soon as retrieval finishes
+    - **token**: `{"content"}` for each piece of the answer as the LLM produces it
+    - **error**: `{"detail"}` if the LLM call fails mid-stream
+    - **done**: `{"session_id", "timings"}` with retrieval, time-to-first-token and total ms, plus
+      `"cached": true` when the answer was served from the semantic cache, `"faq_id"` when a
+      curated FAQ answered, `"intent"` (the label) when a templated intent answer was sent, and
+      `"degraded": true` when the LLM failed and the answer was extracted from the sources
+    """
+    async def event_stream():
+        serialization = 0.0
+        with slow_request_log.trace("stream", message), cpu_profiler.request():
+            async with aclosing(chat_service.stream_chat_message(message)) as events:
+                async for event, data in events:
+                    started = time.perf_counter()
+                    frame = f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+                    serialization += time.perf_counter() - started
+                    yield frame
+            record_stage("serialization", serialization)
+
+    async def update_memory():
+        # The session id is only known once the stream has started
+        await chat_service.update_memory(message.session_id)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(update_memory),
+    )
 
-    Note: This is a basic implementation. For true streaming, implement Server-Sent Events (SSE) or WebSocket.
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket, session_id: Optional[str] = None):
     """
-    try:
-        response = chat_service.process_chat_message(message)
-        return {
-            "message": "Streaming response",
-            "response": response.response,
-            "session_id": response.session_id,
-            "sources": response.sources,
-            "note": "This is a basic implementation. Use SSE or WebSocket for true streaming."
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    Chat over a single WebSocket bound to one session.
+
+    - Connect to `/chat/ws?session_id=...` (a new session is created when omitted);
+      the first frame is `{"type": "session", "session_id"}`
+    - Send `{"message": "...", "collection_name": ...}` with the same optional overrides as POST /chat/
+    - Receive `sources`, `token`, `error` and `done` frames, each as `{"type": <event>, ...}`
+    - Reply to `{"type": "ping"}` with `{"type": "pong"}`; silent clients are disconnected
+    """
+    await chat_socket_manager.serve(websocket, session_id)
@@ -1,17 +1,37 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from typing import List
 from ..models.document import (
     DocumentUpload, BulkDocumentUpload, CollectionCreate, 
     DocumentInfo, DocumentDetails, CollectionInfo
 )
 from ..services.document_service import document_service
-from ..core.database import get_chroma_client
+from ..services.keyword_index import keyword_index
+from ..services.relevance_gate import relevance_gate
+from ..services.semantic_cache import semantic_cache
+from ..core.database import chroma_shared_between_workers, get_chroma_client, invalidate_chroma_collection
 
 router = APIRouter(prefix="/documents", tags=["Document Management"])
 
 
-@router.post("/upload")
-async def upload_document(
+def forget_collection(collection_name: str):
+    """Drop everything derived from a collection that was deleted or is being recreated"""
+    invalidate_chroma_collection(collection_name)
+    keyword_index.drop_collection(collection_name)
+    semantic_cache.invalidate_collection(collection_name)
+    relevance_gate.forget(collection_name)
+
+
+def shared_chroma_required():
+    """Refuse writes that the other workers' embedded ChromaDB would never see"""
+    if not chroma_shared_between_workers():
+        raise HTTPException(
+            status_code=409,
+            detail="Document changes need a Chroma server when WORKERS > 1 (set CHROMA_SERVER_HOST)",
+        )
+
+
+@router.post("/upload", dependencies=[Depends(shared_chroma_required)])
+def upload_document(
     file: UploadFile = File(...), 
     collection_name: str = Form("default"), 
     metadata: str = Form("{}")
@@ -20,27 +40,27 @@ async def upload_document(
     return document_service.upload_document(file, collection_name, metadata)
 
 
-@router.post("/embed")
-async def embed_text_content(document: DocumentUpload, collection_name: str = "default"):
+@router.post("/embed", dependencies=[Depends(shared_chroma_required)])
+def embed_text_content(document: DocumentUpload, collection_name: str = "default"):
     """Embed text content directly"""
     return document_service.embed_text_content(document, collection_name)
 
 
-@router.post("/bulk-embed")
-async def bulk_embed_documents(bulk_data: BulkDocumentUpload, collection_name: str = "default"):
+@router.post("/bulk-embed", dependencies=[Depends(shared_chroma_required)])
+def bulk_embed_documents(bulk_data: BulkDocumentUpload, collection_name: str = "default"):
     """Embed multiple documents"""
     return document_service.bulk_embed_documents(bulk_data.documents, collection_name)
 
 
 @router.get("/", response_model=dict)
-async def list_documents(collection_name: str = "default", limit: int = 100):
+def list_documents(collection_name: str = "default", limit: int = 100):
     """List all documents in a collection"""
     return document_service.list_documents(collection_name, limit)
 
 
 # Collection Management Routes (must be before /{doc_id} to avoid route conflicts)
 @router.get("/collections/list", response_model=dict)
-async def list_collections():
+def list_collections():
     """List all available collections"""
     try:
         client = get_chroma_client()
@@ -59,8 +79,8 @@ async def list_collections():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/collections/create")
-async def create_collection(collection_data: CollectionCreate):
+@router.post("/collections/create", dependencies=[Depends(shared_chroma_required)])
+def create_collection(collection_data: CollectionCreate):
     """Create a new collection"""
     try:
         client = get_chroma_client()
@@ -73,6 +93,7 @@ async def create_collection(collection_data: CollectionCreate):
         if collection_data.name in existing_collections:
             if collection_data.overwrite:
                 client.delete_collection(name=collection_data.name)
+                forget_collection(collection_data.name)
             else:
                 raise HTTPException(status_code=400, detail=f"Collection '{collection_data.name}' already exists")
 
@@ -93,12 +114,13 @@ async def create_collection(collection_data: CollectionCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.delete("/collections/{collection_name}")
-async def delete_collection(collection_name: str):
+@router.delete("/collections/{collection_name}", dependencies=[Depends(shared_chroma_required)])
+def delete_collection(collection_name: str):
     """Delete a collection"""
     try:
         client = get_chroma_client()
         client.delete_collection(name=collection_name)
+        forget_collection(collection_name)
         return {"message": f"Collection '{collection_name}' deleted successfully"}
     except Exception as e:
         if "does not exist" in str(e).lower():
@@ -108,18 +130,18 @@ async def delete_collection(collection_name: str):
 
 # Document-by-ID routes (after /collections/* to avoid route conflicts)
 @router.get("/{doc_id}", response_model=DocumentDetails)
-async def get_document_details(doc_id: str, collection_name: str = "default"):
+def get_document_details(doc_id: str, collection_name: str = "default"):
     """Get detailed information about a specific document"""
     return document_service.get_document_details(doc_id, collection_name)
 
 
-@router.delete("/{doc_id}")
-async def delete_document(doc_id: str, collection_name: str = "default"):
+@router.delete("/{doc_id}", dependencies=[Depends(shared_chroma_required)])
+def delete_document(doc_id: str, collection_name: str = "default"):
     """Delete a document from the collection"""
     return document_service.delete_document(doc_id, collection_name)
 
 
-@router.put("/{doc_id}")
-async def update_document(doc_id: str, document: DocumentUpload, collection_name: str = "default"):
+@router.put("/{doc_id}", dependencies=[Depends(shared_chroma_required)])
+def update_document(doc_id: str, document: DocumentUpload, collection_name: str = "default"):
     """Update a document by replacing it"""
     return document_service.update_document(doc_id, document, collection_name)
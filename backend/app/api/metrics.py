@@ -0,0 +1,61 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..services.embedding_cache import query_embedding_cache
+from ..services.llm_gateway import llm_gateway
+from ..services.reranker import reranker
+from ..services.semantic_cache import semantic_cache
+from ..services.single_flight import llm_flights
+
+router = APIRouter(tags=["Metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# Counters the services already keep are read at scrape time, adding nothing to the hot path
+metrics.callback(
+    "chatbot_cache_lookups",
+    "Cache lookups by cache (semantic, embedding, rerank) and result (hit, miss)",
+    "counter",
+    lambda: {
+        ("semantic", "hit"): semantic_cache.stats.hits,
+        ("semantic", "miss"): semantic_cache.stats.misses,
+        ("embedding", "hit"): query_embedding_cache.hits,
+        ("embedding", "miss"): query_embedding_cache.misses,
+        ("rerank", "hit"): reranker.stats.cache_hits,
+        ("rerank", "miss"): reranker.stats.pairs_scored,
+    },
+    ["cache", "result"],
+)
+metrics.callback(
+    "chatbot_llm_calls",
+    "LLM gateway calls by outcome (calls, retries, hedged, failures, rejected, degraded)",
+    "counter",
+    lambda: {
+        (outcome,): getattr(llm_gateway.stats, outcome)
+        for outcome in ("calls", "retries", "hedged", "failures", "rejected", "degraded")
+    },
+    ["outcome"],
+)
+metrics.callback(
+    "chatbot_llm_circuit_open",
+    "1 while the LLM circuit breaker rejects calls",
+    "gauge",
+    lambda: {(): int(llm_gateway.breaker.state == "open")},
+)
+metrics.callback(
+    "chatbot_llm_coalesced",
+    "LLM requests that made the upstream call (leader) or shared one (follower)",
+    "counter",
+    lambda: {("leader",): llm_flights.stats.leaders, ("follower",): llm_flights.stats.followers},
+    ["role"],
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    """This worker's metrics in the Prometheus text exposition format"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,17 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from .config import settings
+
+
+# Bounded pool for CPU/IO-bound calls that have no async API (SentenceTransformer, Chroma)
+_blocking_executor = ThreadPoolExecutor(
+    max_workers=settings.BLOCKING_EXECUTOR_WORKERS,
+    thread_name_prefix="blocking",
+)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking callable on the bounded executor without stalling the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_executor, functools.partial(func, *args, **kwargs))
@@ -21,11 +21,16 @@ class Settings(BaseSettings):
 
     # Database Configuration
     CHROMA_DB_PATH: str = "./chroma_db"
+    # Chroma server (`chroma run`) shared by all workers; unset = embedded ChromaDB in each process.
+    # With WORKERS > 1 and no server, document writes are refused: other workers would not see them
+    CHROMA_SERVER_HOST: Optional[str] = None
+    CHROMA_SERVER_PORT: int = 8001
     DISABLE_TELEMETRY: bool = True
 
     # AI Configuration
     GROQ_API_KEY: Optional[str] = None
     GROQ_MODEL: str = "meta-llama/llama-4-scout-17b-16e-instruct"
+    GROQ_BASE_URL: Optional[str] = None   # e.g. a proxy in front of Groq; unset = api.groq.com
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
 
     # Chat Configuration
@@ -33,12 +38,148 @@ class Settings(BaseSettings):
     TEMPERATURE: float = 0.7
     TOP_P: float = 1.0
     N_RESULTS: int = 5
+    CONTEXT_TOKEN_BUDGET: int = 1500  # max tokens of retrieved context sent to the LLM
     BASE_SYSTEM_PROMPT: str = (
         "You are a helpful AI assistant. Based on the provided context, answer the user's "
         "question accurately and concisely. If the context doesn't contain relevant information, "
         "politely say so and provide a general helpful response if possible."
     )
 
+    # Hybrid Search Configuration
+    HYBRID_SEARCH_ENABLED: bool = True
+    HYBRID_CANDIDATES: int = 20       # chunks taken from each of vector and BM25 search before fusion
+    RRF_K: int = 60                   # reciprocal rank fusion damping constant
+
+    # Rerank Configuration
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 20       # chunks scored by the cross-encoder; the top N_RESULTS are kept
+    RERANK_TIMEOUT_MS: float = 150.0  # past this budget the retrieval order is used instead
+    RERANK_CACHE_SIZE: int = 20000    # cached (query, chunk) scores
+
+    # Query Embedding Cache Configuration
+    QUERY_EMBEDDING_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+
+    # Query Embedding Batching Configuration
+    EMBEDDING_BATCHING_ENABLED: bool = True
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # Semantic Cache Configuration
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92     # minimum cosine similarity to reuse an answer
+    SEMANTIC_CACHE_TTL: int = 3600             # seconds
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 5000
+    SEMANTIC_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Relevance Gate Configuration
+    RELEVANCE_GATE_ENABLED: bool = True
+    # Fallback max distance for collections without a calibrated threshold (unset = no gating)
+    RELEVANCE_MAX_DISTANCE: Optional[float] = None
+    RELEVANCE_TARGET_RECALL: float = 0.95     # share of in-scope eval questions that must pass
+
+    # FAQ Configuration
+    # Curated answers served before retrieval and the LLM when a question is close enough
+    FAQ_ENABLED: bool = True
+    FAQ_MIN_SIMILARITY: float = 0.85          # cosine similarity to one of an FAQ's question variants
+
+    # Intent Classifier Configuration
+    # Greetings, thanks, off-topic and abusive messages get a templated answer without retrieval or LLM
+    INTENT_CLASSIFIER_ENABLED: bool = True
+    INTENT_MIN_SIMILARITY: float = 0.6        # cosine similarity to the winning intent's centroid
+    INTENT_MARGIN: float = 0.05               # required lead over the closest in-scope intent
+
+    # Session Store Configuration
+    SESSION_STORE: str = "memory"             # "memory" or "sqlite"
+    SESSION_DB_PATH: str = "./sessions.db"    # used by the sqlite store
+    SESSION_IDLE_TTL: int = 7 * 24 * 3600     # seconds without activity before a session expires
+    SESSION_MAX_SESSIONS: int = 50000         # memory store: least recently active evicted past this
+    SESSION_MAX_BYTES: int = 128 * 1024 * 1024  # memory store: approximate cap for all history
+
+    # Request Coalescing Configuration
+    # Identical concurrent LLM requests (same prompt, model and parameters) share one upstream call
+    COALESCE_ENABLED: bool = True
+    COALESCE_TIMEOUT: float = 30.0            # seconds a follower waits on the leader before calling itself
+
+    # LLM Provider Configuration
+    LLM_PROVIDER: str = "groq"                # "groq", "openai" (any OpenAI-compatible server) or "stub"
+    OPENAI_BASE_URL: str = "http://localhost:8001/v1"
+    OPENAI_API_KEY: Optional[str] = None
+    # The stub answers offline, for load tests and benchmarks
+    LLM_STUB_TTFT_MS: float = 300.0           # time to first token
+    LLM_STUB_TOKENS_PER_SECOND: float = 80.0
+    LLM_STUB_ANSWER_TOKENS: int = 60          # tokens per answer (capped by max_tokens)
+    LLM_STUB_ERROR_RATE: float = 0.0          # share of calls failing with a 503
+    LLM_STUB_SEED: int = 0                    # same seed, same sequence of failures
+
+    # Model Router Configuration
+    # Easy queries go to a small, fast model and hard ones to GROQ_MODEL; the scoring policy
+    # is edited through the admin API (saved as CHROMA_DB_PATH/routing.json). Off by default:
+    # the small model below is a Groq model, so set one your LLM_PROVIDER serves before enabling
+    ROUTER_ENABLED: bool = False
+    ROUTER_SMALL_MODEL: str = "llama-3.1-8b-instant"
+
+    # LLM Gateway Configuration
+    # Connection pool, timeouts, retries, hedging and circuit breaker around every LLM call
+    LLM_MAX_CONNECTIONS: int = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY: float = 30.0        # seconds an idle pooled connection is kept open
+    LLM_CONNECT_TIMEOUT: float = 5.0
+    LLM_TIMEOUT: float = 30.0                 # whole completion, or a stream's wait for its next token
+    LLM_MAX_RETRIES: int = 2                  # on timeouts, connection errors, 429 and 5xx
+    LLM_BACKOFF_BASE: float = 0.5             # seconds; full jitter, doubling per retry
+    LLM_BACKOFF_MAX: float = 8.0              # longer Retry-After values are not waited for
+    LLM_HEDGE_ENABLED: bool = False           # duplicate a call still running after the observed p95
+    LLM_HEDGE_MIN_SAMPLES: int = 20           # latencies observed before hedging starts
+    LLM_BREAKER_THRESHOLD: int = 5            # consecutive failed calls that open the circuit
+    LLM_BREAKER_COOLDOWN: float = 30.0        # seconds open before one trial call is let through
+
+    # Conversation Memory Configuration
+    # The last turns go to the LLM verbatim; older ones are folded into a rolling summary
+    MEMORY_ENABLED: bool = True
+    MEMORY_RECENT_TURNS: int = 3              # user/assistant exchanges kept verbatim
+    MEMORY_TOKEN_BUDGET: int = 800            # summary + recent turns, per request
+    MEMORY_SUMMARY_MAX_TOKENS: int = 200
+    MEMORY_SUMMARY_MODEL: Optional[str] = None  # defaults to GROQ_MODEL
+
+    # Metrics Configuration
+    # Prometheus text format at /metrics (per worker process)
+    METRICS_ENABLED: bool = True
+
+    # Slow Request Log Configuration
+    # Chat requests slower than the threshold are appended to a JSONL file with their pipeline breakdown
+    SLOW_LOG_ENABLED: bool = True
+    SLOW_LOG_THRESHOLD_MS: float = 5000.0
+    SLOW_LOG_PATH: str = "./slow_requests.jsonl"
+    SLOW_LOG_MAX_BYTES: int = 10 * 1024 * 1024  # rotated to .1, .2, ... past this size
+    SLOW_LOG_BACKUP_COUNT: int = 3
+    SLOW_LOG_QUEUE_SIZE: int = 1000           # records waiting for the writer thread; more are dropped
+
+    # Profiling Configuration
+    # On-demand CPU sampling and tracemalloc snapshots through the admin API
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5.0   # default sampling interval of a CPU profile
+    PROFILE_MAX_SECONDS: float = 300.0        # a CPU profile stops after this, however few requests came
+    TRACEMALLOC_FRAMES: int = 10              # frames kept per allocation traceback
+    TRACEMALLOC_MAX_SNAPSHOTS: int = 5
+
+    # Rate Limit Configuration
+    RATE_LIMIT_PER_MINUTE: int = 0            # chat requests per client IP per minute (0 = unlimited)
+
+    # Multi-worker Configuration
+    # With WORKERS > 1, sessions, the semantic cache, rate-limit counters and FAQ served counts live in local SQLite files
+    WORKERS: int = 1
+    SHARED_STATE_DB_PATH: str = "./shared_state.db"
+
+    # Concurrency Configuration
+    # Threads used for blocking work (embedding, vector search) off the event loop
+    BLOCKING_EXECUTOR_WORKERS: int = 8
+
+    # WebSocket Configuration
+    WS_MAX_CONNECTIONS: int = 500         # per worker process
+    WS_HEARTBEAT_INTERVAL: float = 20.0   # seconds between server pings
+    WS_IDLE_TIMEOUT: float = 90.0         # close when the client has been silent this long
+    WS_SEND_QUEUE_SIZE: int = 64          # frames buffered for a slow reader before the producer waits
+    WS_SEND_TIMEOUT: float = 15.0         # close when a frame cannot be queued for this long
 
     ADMIN_USERNAME: str
     ADMIN_PASSWORD: str
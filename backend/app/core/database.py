@@ -1,10 +1,15 @@
 import os
+import threading
+from typing import Any, Callable, TypeVar
 import chromadb
-from sentence_transformers import SentenceTransformer
+from chromadb.errors import NotFoundError
+from sentence_transformers import CrossEncoder, SentenceTransformer
 from functools import lru_cache
 from .config import settings
 import logging
 
+T = TypeVar("T")
+
 
 @lru_cache()
 def get_embedding_model():
@@ -34,21 +39,60 @@ def get_embedding_model():
         raise
 
 
+@lru_cache()
+def get_rerank_model():
+    """Get the cross-encoder used to rerank retrieved chunks (cached)"""
+    return CrossEncoder(settings.RERANK_MODEL, device="cpu")
+
+
+@lru_cache()
 def get_chroma_client():
-    """Get ChromaDB client instance"""
+    """Get the process-wide ChromaDB client instance (cached)"""
     # Honor telemetry preference to avoid sending any analytics
     if getattr(settings, "DISABLE_TELEMETRY", False):
         os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
         os.environ.setdefault("CHROMA_TELEMETRY_ENABLED", "False")
         os.environ.setdefault("CHROMA_ANALYTICS_ENABLED", "False")
+    if settings.CHROMA_SERVER_HOST:
+        return chromadb.HttpClient(host=settings.CHROMA_SERVER_HOST, port=settings.CHROMA_SERVER_PORT)
     return chromadb.PersistentClient(path=settings.CHROMA_DB_PATH)
 
 
+def chroma_shared_between_workers() -> bool:
+    """False when several workers each run their own embedded ChromaDB, which cannot see each other's writes"""
+    return settings.WORKERS <= 1 or bool(settings.CHROMA_SERVER_HOST)
+
+
+# Open collection handles by name, so hot paths skip the lookup round trip
+_collections = {}
+_collections_lock = threading.Lock()
+
+
 def get_chroma_collection(collection_name: str = "default"):
-    """Get or create a ChromaDB collection"""
-    client = get_chroma_client()
-    try:
-        collection = client.get_collection(name=collection_name)
-    except Exception:
-        collection = client.create_collection(name=collection_name)
+    """Get or create a ChromaDB collection (handle cached until invalidated)"""
+    collection = _collections.get(collection_name)
+    if collection is None:
+        with _collections_lock:
+            collection = _collections.get(collection_name)
+            if collection is None:
+                collection = get_chroma_client().get_or_create_collection(name=collection_name)
+                _collections[collection_name] = collection
     return collection
+
+
+def invalidate_chroma_collection(collection_name: str):
+    """Forget the cached handle for a collection that was deleted or recreated"""
+    with _collections_lock:
+        _collections.pop(collection_name, None)
+
+
+def with_chroma_collection(collection_name: str, operation: Callable[[Any], T]) -> T:
+    """
+    Run `operation` on the collection's cached handle, reopening it once if the
+    collection was deleted or recreated (e.g. by another worker) since it was cached
+    """
+    try:
+        return operation(get_chroma_collection(collection_name))
+    except NotFoundError:
+        invalidate_chroma_collection(collection_name)
+        return operation(get_chroma_collection(collection_name))
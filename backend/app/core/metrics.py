@@ -0,0 +1,265 @@
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# Seconds; from cache hits (well under a millisecond) to slow LLM answers
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric(ABC):
+    """One metric family; samples are keyed by their label values, in `labelnames` order"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {list(self.labelnames)}, got {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[Sample]:
+        """(sample name, labels, value) for every sample of the family"""
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        return [(f"{self.name}_total", dict(zip(self.labelnames, key)), value) for key, value in values]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: count per bucket (the last one is +Inf), then the sum of observations
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            values[0][index] += 1
+            values[1][0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the seconds spent in the block (also across awaits)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        values = self._values.get(self._key(labels))
+        return sum(values[0]) if values else 0
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            values = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        samples = []
+        for key, counts, total in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class CallbackMetric(Metric):
+    """Values read when the metrics are scraped, from counters a service already keeps"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        callback: Callable[[], Dict[Tuple[str, ...], float]],
+        labelnames: Sequence[str] = (),
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.callback = callback
+
+    def samples(self) -> List[Sample]:
+        name = f"{self.name}_total" if self.kind == "counter" else self.name
+        return [(name, dict(zip(self.labelnames, key)), value) for key, value in self.callback().items()]
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics, rendered in the Prometheus text exposition format.
+
+    Recording is a dict update under a per-metric lock, so it can sit on the hot path.
+    Each worker process has its own registry; Prometheus should scrape every worker.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        callback: Callable[[], Dict[Tuple[str, ...], float]],
+        labelnames: Sequence[str] = (),
+    ) -> CallbackMetric:
+        """`kind` is "counter" or "gauge"; `callback` maps label values to the current value"""
+        return self._register(CallbackMetric(name, documentation, kind, callback, labelnames))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request, labelled by its route template (not the raw path)"""
+
+    def __init__(self, app, histogram: Histogram):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Streaming responses are timed until their last chunk has been sent
+            route = scope.get("route")
+            self.histogram.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status[0]),
+            )
+
+
+# Global registry
+metrics = MetricsRegistry()
+
+http_request_seconds = metrics.histogram(
+    "chatbot_http_request_seconds", "HTTP request duration, until the last byte is sent", ["method", "route", "status"]
+)
+
+# Chat pipeline
+chat_stage_seconds = metrics.histogram(
+    "chatbot_chat_stage_seconds",
+    "Time spent in each chat pipeline stage (embed, vector_query, keyword_query, fuse, rerank, "
+    "context_build, llm_ttft, llm_total, serialization)",
+    ["stage"],
+)
+chat_answers = metrics.counter(
+    "chatbot_chat_answers", "Chat answers by what produced them (llm, degraded, cache, faq, intent, no_context, blocked)", ["source"]
+)
+llm_tokens = metrics.counter(
+    "chatbot_llm_tokens", "LLM tokens (prompt, completion) per model route, counted with the local tokenizer", ["kind", "route"]
+)
+
+# Ingestion
+ingest_extract_seconds = metrics.histogram(
+    "chatbot_ingest_extract_seconds", "Text extraction time per uploaded file", ["file_type"]
+)
+ingest_extracted_bytes = metrics.counter(
+    "chatbot_ingest_extracted_bytes", "Bytes of uploaded files that text was extracted from", ["file_type"]
+)
+ingest_stage_seconds = metrics.histogram(
+    "chatbot_ingest_stage_seconds", "Time per document in each ingestion stage (chunk, embed, store)", ["stage"]
+)
+ingest_chunks = metrics.counter("chatbot_ingest_chunks", "Chunks embedded and stored")
+ingest_documents = metrics.counter("chatbot_ingest_documents", "Documents embedded and stored")
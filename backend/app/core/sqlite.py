@@ -0,0 +1,50 @@
+import os
+import sqlite3
+import threading
+
+
+class SQLiteDatabase:
+    """
+    Local SQLite file in WAL mode, safe to share between threads and worker processes.
+
+    Each thread of each process gets its own connection (a connection inherited across a
+    fork is never reused), readers never block the writer, and `transaction()` takes the
+    write lock up front so concurrent writers queue on busy_timeout instead of failing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def transaction(self) -> "Transaction":
+        return Transaction(self.conn())
+
+    def executescript(self, script: str):
+        self.conn().executescript(script)
+
+
+class Transaction:
+    """`with` block that runs its statements in one immediate transaction on a connection"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
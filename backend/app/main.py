@@ -1,15 +1,27 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .core.config import settings
-from .api import chat, documents, admin_auth, admin_dashboard
+from .core.database import get_embedding_model
+from .core.metrics import MetricsMiddleware, http_request_seconds
+from .api import chat, documents, admin_auth, admin_dashboard, metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model before serving, so concurrent first requests don't each load it
+    get_embedding_model()
+    yield
 
 
 #  CREATE APP
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version="1.0.0",
-    description="A chatbot API with document management and vector search capabilities"
+    description="A chatbot API with document management and vector search capabilities",
+    lifespan=lifespan,
 )
 
 
@@ -21,6 +33,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, histogram=http_request_seconds)
 
 
 # ROUTES
@@ -44,3 +58,4 @@ app.include_router(chat.router, prefix=settings.API_V1_STR)
 app.include_router(documents.router, prefix=settings.API_V1_STR)
 app.include_router(admin_auth.router, prefix=settings.API_V1_STR)
 app.include_router(admin_dashboard.router, prefix=settings.API_V1_STR)
+app.include_router(metrics.router)
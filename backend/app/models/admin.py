@@ -0,0 +1,53 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+
+class RelevanceCalibration(BaseModel):
+    in_scope: List[str]
+    out_of_scope: List[str] = []
+    target_recall: Optional[float] = None
+    apply: bool = True
+
+
+class RelevanceThreshold(BaseModel):
+    threshold: float
+
+
+class IntentDefinition(BaseModel):
+    examples: List[str]
+    response: Optional[str] = None     # None: questions like these pass through to retrieval and the LLM
+
+
+class IntentSet(BaseModel):
+    intents: Dict[str, IntentDefinition]
+
+
+class FAQEntry(BaseModel):
+    id: Optional[str] = None           # generated when omitted; loading the same id again replaces it
+    questions: List[str]               # phrasings of the question, each matched separately
+    answer: str
+    source_url: Optional[str] = None
+
+
+class FAQBulkLoad(BaseModel):
+    faqs: List[FAQEntry]
+    replace: bool = True               # False: add to (and update) the collection's existing FAQs
+
+
+class RoutingPolicyUpdate(BaseModel):
+    """Fields to change in the model routing policy; fields left out keep their value"""
+    threshold: Optional[float] = None          # complexity score from which the large model answers
+    small_model: Optional[str] = None          # null: ROUTER_SMALL_MODEL
+    large_model: Optional[str] = None          # null: GROQ_MODEL
+    weights: Optional[Dict[str, float]] = None     # length, retrieval, depth, intent
+    short_query_tokens: Optional[int] = None
+    long_query_tokens: Optional[int] = None
+    confident_distance: Optional[float] = None
+    unsure_distance: Optional[float] = None
+    deep_conversation_turns: Optional[int] = None
+    intent_scores: Optional[Dict[str, float]] = None   # complexity (0..1) of pass-through intent labels
+
+
+class CPUProfileRequest(BaseModel):
+    requests: int = Field(10, ge=1, le=10000)          # profile the next N chat requests
+    interval_ms: Optional[float] = Field(None, ge=1, le=1000)   # null: PROFILE_SAMPLE_INTERVAL_MS
@@ -42,6 +42,8 @@ class SessionResponse(BaseModel):
 
 class SessionListResponse(BaseModel):
     total_sessions: int
+    offset: int = 0
+    limit: int = 50
     sessions: List[SessionInfo]
 
 
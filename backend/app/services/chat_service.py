@@ -1,10 +1,35 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
 import uuid
-from datetime import datetime
-from typing import List, Dict, Any
-from groq import Groq
+from contextlib import aclosing
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+import numpy as np
 from ..core.config import settings
-from ..core.database import get_chroma_collection, get_embedding_model
+from ..core.concurrency import run_blocking
+from ..core.database import with_chroma_collection
+from ..core.metrics import chat_answers, chat_stage_seconds, llm_tokens
 from ..models.chat import ChatMessage, ChatResponse
+from ..utils.text import normalize_query
+from ..utils.tokens import count_tokens, count_tokens_uncached
+from .context_builder import BuiltContext, build_context, extractive_answer
+from .conversation_memory import ConversationMemory, Memory
+from .embedding_batcher import query_embedding_batcher
+from .embedding_cache import query_embedding_cache
+from .faq_store import faq_store
+from .intent_classifier import intent_classifier
+from .keyword_index import keyword_index, reciprocal_rank_fusion
+from .llm_gateway import failure_reason, llm_gateway
+from .llm_providers import GroqProvider
+from .model_router import RouteDecision, model_router
+from .relevance_gate import relevance_gate
+from .reranker import reranker
+from .semantic_cache import CacheEntry, Namespace, semantic_cache
+from .session_store import session_store
+from .single_flight import llm_flights
+from .slow_request_log import add_stage, annotate
 
 
 # ✅ YOUR ORIGINAL PROMPT (UNCHANGED)
@@ -97,12 +122,57 @@ INTENT:
 If unclear → ask clarification
 """
 
+BLOCKED_RESPONSE = "I am here to assist with admission-related queries for Vimala College."
+NO_CONTEXT_RESPONSE = "I do not have official information about that. Please refer to the official website."
+GENERATION_ERROR_PREFIX = "Error generating response: "
+DEGRADED_RESPONSE_PREFIX = (
+    "I cannot generate a full answer right now. Here is the most relevant official information I found:\n"
+)
+
+
+def record_stage(stage: str, seconds: float):
+    """Time spent in a chat pipeline stage, for the metrics and the request's slow-log trace"""
+    chat_stage_seconds.observe(seconds, stage=stage)
+    add_stage(stage, seconds)
+
+
+async def timed(stage: str, awaitable):
+    """Await and record the time spent as a chat pipeline stage"""
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def answered(source: str):
+    """Count what produced a chat answer"""
+    chat_answers.inc(source=source)
+    annotate(answer_source=source)
+
+
+def chunk_summary(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    ids = results.get('ids', [[]])[0]
+    distances = results.get('distances', [[]])[0] or [None] * len(ids)
+    return [
+        {"id": chunk_id, "distance": round(distance, 4) if distance is not None else None}
+        for chunk_id, distance in zip(ids, distances)
+    ]
+
 
 class ChatService:
     def __init__(self):
-        self.groq_client = Groq(api_key=settings.GROQ_API_KEY)
-        self.embedding_model = get_embedding_model()
-        self.chat_sessions = {}
+        # The configured provider behind the gateway's timeouts, retries and circuit breaker
+        self.llm = llm_gateway
+        self.groq_client = llm_gateway.provider.client if isinstance(llm_gateway.provider, GroqProvider) else None
+        self.chat_sessions = session_store
+        self.memory = ConversationMemory(
+            self.chat_sessions,
+            self.summarize,
+            recent_turns=settings.MEMORY_RECENT_TURNS,
+            token_budget=settings.MEMORY_TOKEN_BUDGET,
+            summary_max_tokens=settings.MEMORY_SUMMARY_MAX_TOKENS,
+        )
 
     def is_valid_query(self, query: str) -> bool:
         blocked = ["hack", "attack", "illegal", "porn", "sex"]
@@ -110,121 +180,434 @@ class ChatService:
 
     def validate_response(self, response: str) -> str:
         if not response.strip():
-            return "I do not have official information about that. Please refer to the official website."
+            return NO_CONTEXT_RESPONSE
         return response
 
-    def generate_response(
+    async def embed_query(self, query: str) -> np.ndarray:
+        """Embed a query: cached vectors return inline, misses are micro-batched with concurrent requests"""
+        cached = query_embedding_cache.get(query)
+        if cached is not None:
+            return cached
+        if settings.EMBEDDING_BATCHING_ENABLED:
+            return await query_embedding_batcher.embed(query)
+        # Embedding is blocking, keep it off the event loop
+        return await run_blocking(query_embedding_cache.embed, query)
+
+    def query_collection(self, collection_name: str, query_embedding: np.ndarray, n_results: int = None) -> Dict[str, Any]:
+        """Fetch the nearest chunks for an embedding (blocking; run it via run_blocking)"""
+        return with_chroma_collection(collection_name, lambda collection: collection.query(
+            query_embeddings=[query_embedding.tolist()],
+            n_results=n_results or settings.N_RESULTS
+        ))
+
+    def fuse_results(
         self,
-        query: str,
-        context: List[str],
-        *,
-        groq_model: str = None,
-        max_tokens: int = None,
-        temperature: float = None,
-        top_p: float = None,
-        system_prompt_override: str = None,
-    ) -> str:
+        collection_name: str,
+        results: Dict[str, Any],
+        keyword_hits: List[Tuple[str, float]],
+        limit: int = None,
+    ) -> Dict[str, Any]:
+        """Merge vector and keyword rankings with reciprocal rank fusion, keeping the top `limit` (N_RESULTS)"""
+        ids = results.get('ids', [[]])[0]
+        documents = results.get('documents', [[]])[0]
+        metadatas = results.get('metadatas', [[]])[0] or [None] * len(ids)
+        distances = results.get('distances', [[]])[0]
+        rows = {chunk_id: (doc, meta, dist) for chunk_id, doc, meta, dist in zip(ids, documents, metadatas, distances)}
+
+        fused = reciprocal_rank_fusion([ids, [chunk_id for chunk_id, _ in keyword_hits]], settings.RRF_K)
+        fused_ids = [chunk_id for chunk_id, _ in fused[:limit or settings.N_RESULTS]]
+
+        # Chunks only the keyword index found have no vector distance; fetch their text and metadata
+        missing = [chunk_id for chunk_id in fused_ids if chunk_id not in rows]
+        if missing:
+            fetched = with_chroma_collection(
+                collection_name, lambda collection: collection.get(ids=missing, include=["documents", "metadatas"])
+            )
+            fetched_metadatas = fetched.get('metadatas') or [None] * len(fetched['ids'])
+            for chunk_id, doc, meta in zip(fetched['ids'], fetched['documents'], fetched_metadatas):
+                rows[chunk_id] = (doc, meta, None)
+
+        fused_ids = [chunk_id for chunk_id in fused_ids if chunk_id in rows]
+        return {
+            'ids': [fused_ids],
+            'documents': [[rows[chunk_id][0] for chunk_id in fused_ids]],
+            'metadatas': [[rows[chunk_id][1] for chunk_id in fused_ids]],
+            'distances': [[rows[chunk_id][2] for chunk_id in fused_ids]],
+        }
+
+    def pack_context(self, results: Dict[str, Any]) -> Tuple[BuiltContext, List[Dict[str, Any]]]:
+        """Pack the final ranked chunks into prompt context and source entries (blocking; run it via run_blocking)"""
+        # ✅ FIXED CLEAN BLOCK
+        documents = results.get('documents', [[]])[0]
+        distances = results.get('distances', [[]])[0]
+        metadatas = results.get('metadatas', [[]])[0] or [None] * len(documents)
+        ids = results.get('ids', [[]])[0]
+
+        # ✅ BUILD SOURCES
+        sources = []
+        for doc, meta, dist in zip(documents, metadatas, distances):
+            sources.append({
+                "content": doc[:300],
+                "metadata": meta,
+                "distance": dist
+            })
+
+        context = build_context(documents, metadatas, ids, settings.CONTEXT_TOKEN_BUDGET)
+        return context, sources
+
+    async def retrieve(self, message: ChatMessage, query_embedding: np.ndarray) -> Tuple[BuiltContext, List[Dict[str, Any]]]:
+        """Return the packed context and source entries for a chat message"""
+        collection_name = message.collection_name
+        # With reranking on, a wider candidate set goes to the cross-encoder, which keeps the top N_RESULTS
+        candidates = settings.RERANK_CANDIDATES if settings.RERANK_ENABLED else settings.N_RESULTS
+
+        # Vector and keyword search are blocking; run them side by side off the event loop
+        if settings.HYBRID_SEARCH_ENABLED:
+            depth = max(settings.HYBRID_CANDIDATES, candidates)
+            results, keyword_hits = await asyncio.gather(
+                timed("vector_query", run_blocking(self.query_collection, collection_name, query_embedding, depth)),
+                timed("keyword_query", run_blocking(keyword_index.search, collection_name, message.message, depth)),
+            )
+        else:
+            results = await timed(
+                "vector_query", run_blocking(self.query_collection, collection_name, query_embedding, candidates)
+            )
+            keyword_hits = None
+
+        if keyword_hits is not None:
+            results = await timed(
+                "fuse", run_blocking(self.fuse_results, collection_name, results, keyword_hits, candidates)
+            )
+
+        # ✅ RELEVANCE GATE: nothing close enough and no keyword match means the fallback answer, without an LLM call
+        if not relevance_gate.allows(collection_name, results.get('distances', [[]])[0], keyword_match=bool(keyword_hits)):
+            annotate(chunks=chunk_summary(results))
+            return build_context([], [], [], settings.CONTEXT_TOKEN_BUDGET), []
+        if settings.RERANK_ENABLED:
+            results = await timed("rerank", reranker.rerank(message.message, results, settings.N_RESULTS))
 
-        context_text = "\n\n".join(context)
+        annotate(chunks=chunk_summary(results))
+        return await timed("context_build", run_blocking(self.pack_context, results))
 
+    async def cache_namespace(self, message: ChatMessage, memory: Memory) -> Optional[Namespace]:
+        """
+        Answers are only shared between requests with the same collection contents, model
+        and prompt. None when the cache is off or the session has memory: that answer
+        depends on the conversation, so it is neither served from nor added to the cache.
+        """
+        if not settings.SEMANTIC_CACHE_ENABLED or memory:
+            return None
+        # The shared cache reads the collection version from SQLite
+        return await run_blocking(
+            semantic_cache.namespace,
+            message.collection_name,
+            message.groq_model or settings.GROQ_MODEL,
+            message.system_prompt or TRAINING_PROMPT,
+        )
+
+    @staticmethod
+    def routed_namespace(namespace: Optional[Namespace], route: RouteDecision) -> Optional[Namespace]:
+        """The namespace to store an answer under, or None if another model (e.g. the small one) wrote it"""
+        if namespace is None or route.model != namespace[2]:
+            return None
+        return namespace
+
+    async def cached_answer(self, namespace: Optional[Namespace], query_embedding: np.ndarray) -> Optional[CacheEntry]:
+        if not settings.SEMANTIC_CACHE_ENABLED or namespace is None:
+            return None
+        return await run_blocking(semantic_cache.lookup, namespace, query_embedding)
+
+    async def remember_answer(
+        self, namespace: Optional[Namespace], query_embedding: np.ndarray, response: str, sources: List[Dict[str, Any]]
+    ):
+        if not settings.SEMANTIC_CACHE_ENABLED or namespace is None or response.startswith(DEGRADED_RESPONSE_PREFIX):
+            return
+        await run_blocking(semantic_cache.store, namespace, query_embedding, response, sources)
+
+    def degraded_answer(self, query: str, context: BuiltContext) -> str:
+        """Extractive answer from the top retrieved passages, served while the LLM is failing"""
+        self.llm.stats.degraded += 1
+        sentences = extractive_answer(query, context)
+        if not sentences:
+            return NO_CONTEXT_RESPONSE
+        return DEGRADED_RESPONSE_PREFIX + "\n".join(f"- {sentence}" for sentence in sentences)
+
+    def route_query(
+        self,
+        message: ChatMessage,
+        query_embedding: np.ndarray,
+        sources: List[Dict[str, Any]],
+        memory: Memory,
+    ) -> RouteDecision:
+        """Pick the model for a query from its complexity, unless the request named one"""
+        intent_label = None
+        if settings.ROUTER_ENABLED and not message.groq_model:
+            intent_label = intent_classifier.passthrough_label(message.collection_name, query_embedding)
+        return model_router.route(message.message, sources, memory, intent_label, message.groq_model)
+
+    def record_route(
+        self,
+        decision: RouteDecision,
+        message: ChatMessage,
+        context: BuiltContext,
+        memory: Memory,
+        answer: str,
+        seconds: float,
+        failed: bool = False,
+    ):
+        """Account an answer's latency and (approximate) token counts to the route that produced it"""
+        prompt_tokens = (
+            count_tokens(message.system_prompt or TRAINING_PROMPT)
+            + count_tokens(message.message)
+            + context.tokens
+            + memory.tokens
+        )
+        completion_tokens = count_tokens_uncached(answer) if answer else 0
+        degraded = failed or answer.startswith(DEGRADED_RESPONSE_PREFIX)
+        model_router.record(decision, seconds, prompt_tokens, completion_tokens, degraded=degraded)
+
+        record_stage("llm_total", seconds)
+        answered("degraded" if degraded else "llm")
+        llm_tokens.inc(prompt_tokens, kind="prompt", route=decision.route)
+        annotate(model=decision.model, route=decision.route, prompt_tokens=prompt_tokens)
+        if not degraded:
+            llm_tokens.inc(completion_tokens, kind="completion", route=decision.route)
+            annotate(completion_tokens=completion_tokens, upstream_status="ok")
+
+    def build_messages(
+        self,
+        query: str,
+        context: BuiltContext,
+        system_prompt_override: str = None,
+        memory: Memory = None,
+    ) -> List[Dict[str, str]]:
+        """Build the system prompt, conversation memory and user message sent to the LLM"""
         system_prompt = system_prompt_override or TRAINING_PROMPT
 
         user_prompt = f"""
         Answer the question based on the context.
 
         Context:
-        {context}
+        {context.text}
 
         Question:
         {query}
         """
 
+        return [
+            {"role": "system", "content": system_prompt},
+            *(memory.to_messages() if memory else []),
+            {"role": "user", "content": user_prompt},
+        ]
 
+    def completion_params(
+        self,
+        *,
+        groq_model: str = None,
+        max_tokens: int = None,
+        temperature: float = None,
+        top_p: float = None,
+    ) -> Dict[str, Any]:
+        """Resolve per-request overrides against the configured defaults"""
+        return {
+            "model": groq_model or settings.GROQ_MODEL,
+            "max_tokens": max_tokens or settings.MAX_TOKENS,
+            "temperature": temperature if temperature is not None else settings.TEMPERATURE,
+            "top_p": top_p if top_p is not None else settings.TOP_P,
+        }
+
+    def flight_key(
+        self,
+        query: str,
+        context: BuiltContext,
+        system_prompt_override: Optional[str],
+        memory: Optional[Memory],
+        params: Dict[str, Any],
+    ) -> str:
+        """Requests with the same key would send the LLM the same prompt, so they can share one call"""
+        key = {
+            "query": normalize_query(query) or query,
+            "context": context.text,
+            "system": system_prompt_override or TRAINING_PROMPT,
+            "memory": memory.to_messages() if memory else [],
+            "params": params,
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+    async def generate_response(
+        self,
+        query: str,
+        context: BuiltContext,
+        *,
+        system_prompt_override: str = None,
+        memory: Memory = None,
+        **overrides,
+    ) -> str:
+        params = self.completion_params(**overrides)
+        messages = self.build_messages(query, context, system_prompt_override, memory)
 
+        async def complete() -> str:
+            return await self.llm.complete(messages, **params)
 
         try:
-            response = self.groq_client.chat.completions.create(
-                model=groq_model or settings.GROQ_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                max_tokens=max_tokens or settings.MAX_TOKENS,
-                temperature=temperature if temperature is not None else settings.TEMPERATURE,
-                top_p=top_p if top_p is not None else settings.TOP_P,
-                stream=False,
+            # Identical concurrent questions (e.g. after an announcement) share one upstream call
+            content = await llm_flights.call(
+                self.flight_key(query, context, system_prompt_override, memory, params),
+                complete,
             )
-
-            return self.validate_response(response.choices[0].message.content)
+            return self.validate_response(content)
 
         except Exception as e:
-            return f"Error generating response: {str(e)}"
+            logging.warning("LLM generation failed (%r), serving an extractive answer", e)
+            annotate(upstream_status=failure_reason(e))
+            return self.degraded_answer(query, context)
+
+    async def stream_response(
+        self,
+        query: str,
+        context: BuiltContext,
+        *,
+        system_prompt_override: str = None,
+        memory: Memory = None,
+        **overrides,
+    ) -> AsyncIterator[str]:
+        """Yield answer tokens as the LLM produces them (shared with identical concurrent streams)"""
+        params = self.completion_params(**overrides)
+        messages = self.build_messages(query, context, system_prompt_override, memory)
+
+        def open_stream() -> AsyncIterator[str]:
+            return self.llm.stream(messages, **params)
+
+        key = self.flight_key(query, context, system_prompt_override, memory, params)
+        async with aclosing(llm_flights.stream(key, open_stream)) as tokens:
+            async for token in tokens:
+                yield token
+
+    async def summarize(self, messages: List[Dict[str, str]]) -> str:
+        """Completion used to fold old turns into a session's rolling summary"""
+        return await self.llm.complete(
+            messages,
+            model=settings.MEMORY_SUMMARY_MODEL or settings.GROQ_MODEL,
+            max_tokens=settings.MEMORY_SUMMARY_MAX_TOKENS,
+            temperature=0,
+        )
+
+    async def load_memory(self, session_id: str) -> Memory:
+        if not settings.MEMORY_ENABLED:
+            return Memory()
+        return await run_blocking(self.memory.load, session_id)
+
+    async def update_memory(self, session_id: Optional[str]):
+        """Fold turns that left the verbatim window into the summary; run it after the answer is delivered"""
+        if settings.MEMORY_ENABLED and session_id:
+            await self.memory.update(session_id)
+
+    def create_session(self, user_id: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> str:
+        session_id = str(uuid.uuid4())
+        self.chat_sessions.create(session_id, user_id=user_id, metadata=metadata)
+        return session_id
+
+    def get_chat_history(self, session_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Messages of a session, or None if it does not exist (or expired)"""
+        return self.chat_sessions.get_history(session_id)
+
+    def delete_session(self, session_id: str) -> bool:
+        return self.chat_sessions.delete(session_id)
+
+    def list_sessions(self, offset: int = 0, limit: int = 50) -> Tuple[int, List[Dict[str, Any]]]:
+        """(total sessions, one page of session summaries, most recently active first)"""
+        return self.chat_sessions.list(offset=offset, limit=limit)
 
-    def process_chat_message(self, message: ChatMessage) -> ChatResponse:
+    async def ensure_session(self, message: ChatMessage) -> str:
+        if not message.session_id:
+            message.session_id = str(uuid.uuid4())
+        await run_blocking(self.chat_sessions.create, message.session_id)
+        return message.session_id
+
+    async def record_turn(self, session_id: str, user_message: str, ai_response: str):
+        """Append a user/assistant exchange to the session history"""
+        await run_blocking(self.chat_sessions.append, session_id, [("user", user_message), ("assistant", ai_response)])
+
+    async def process_chat_message(self, message: ChatMessage) -> ChatResponse:
 
         if not self.is_valid_query(message.message):
+            answered("blocked")
             return ChatResponse(
-                response="I am here to assist with admission-related queries for Vimala College.",
+                response=BLOCKED_RESPONSE,
                 session_id=message.session_id or "blocked",
                 sources=[]
             )
 
-        if not message.session_id:
-            message.session_id = str(uuid.uuid4())
-            self.chat_sessions[message.session_id] = []
+        await self.ensure_session(message)
 
-        collection = get_chroma_collection(message.collection_name)
+        # Memory decides whether the semantic cache may be used, so it loads alongside the embedding
+        query_embedding, memory = await asyncio.gather(
+            timed("embed", self.embed_query(message.message)),
+            self.load_memory(message.session_id),
+        )
 
-        query_embedding = self.embedding_model.encode([message.message]).tolist()
+        # ✅ FAQ: curated answers for the most common questions
+        faq = await faq_store.match(message.collection_name, query_embedding)
+        if faq:
+            answered("faq")
+            await self.record_turn(message.session_id, message.message, faq.faq.answer)
+            return ChatResponse(
+                response=faq.faq.answer,
+                session_id=message.session_id,
+                sources=[faq.source()]
+            )
 
-        results = collection.query(
-            query_embeddings=query_embedding,
-            n_results=8
-        )
+        # ✅ INTENT: greetings, thanks, off-topic and abusive messages get a templated answer
+        intent = await intent_classifier.match(message.collection_name, query_embedding)
+        if intent:
+            answered("intent")
+            await self.record_turn(message.session_id, message.message, intent.response)
+            return ChatResponse(
+                response=intent.response,
+                session_id=message.session_id,
+                sources=[]
+            )
 
-        # ✅ FIXED CLEAN BLOCK
-        context = results.get('documents', [[]])[0]
-        distances = results.get('distances', [[]])[0]
-        metadatas = results.get('metadatas', [[]])[0]
+        # ✅ SEMANTIC CACHE
+        cache_namespace = await self.cache_namespace(message, memory)
+        cached = await self.cached_answer(cache_namespace, query_embedding)
+        if cached:
+            answered("cache")
+            await self.record_turn(message.session_id, message.message, cached.response)
+            return ChatResponse(
+                response=cached.response,
+                session_id=message.session_id,
+                sources=cached.sources
+            )
+
+        context, sources = await self.retrieve(message, query_embedding)
 
         # ✅ NO CONTEXT
         if not context:
+            answered("no_context")
             return ChatResponse(
-                response="I do not have official information about that. Please refer to the official website.",
+                response=NO_CONTEXT_RESPONSE,
                 session_id=message.session_id,
                 sources=[]
             )
 
-        # ✅ BUILD SOURCES
-        sources = []
-        for doc, meta, dist in zip(context, metadatas, distances):
-            sources.append({
-                "content": doc[:300],
-                "metadata": meta,
-                "distance": dist
-            })
-
-        ai_response = self.generate_response(
+        # ✅ MODEL ROUTING: easy questions go to the small model
+        route = self.route_query(message, query_embedding, sources, memory)
+        generation_started = time.perf_counter()
+        ai_response = await self.generate_response(
             message.message,
             context,
-            groq_model=message.groq_model,
+            groq_model=route.model,
             max_tokens=message.max_tokens,
             temperature=message.temperature,
             top_p=message.top_p,
             system_prompt_override=message.system_prompt,
+            memory=memory,
         )
+        self.record_route(route, message, context, memory, ai_response, time.perf_counter() - generation_started)
 
-        self.chat_sessions[message.session_id].append({
-            "role": "user",
-            "content": message.message,
-            "timestamp": datetime.now().isoformat()
-        })
-
-        self.chat_sessions[message.session_id].append({
-            "role": "assistant",
-            "content": ai_response,
-            "timestamp": datetime.now().isoformat()
-        })
+        await self.record_turn(message.session_id, message.message, ai_response)
+        await self.remember_answer(self.routed_namespace(cache_namespace, route), query_embedding, ai_response, sources)
 
         return ChatResponse(
             response=ai_response,
@@ -232,5 +615,127 @@ class ChatService:
             sources=sources
         )
 
+    async def stream_chat_message(self, message: ChatMessage) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Run the chat pipeline and yield (event, data) pairs:
+        "sources" once retrieval finishes, "token" per LLM delta, optionally "error",
+        then "done" with the session id and timings ("cached": true when the answer came
+        from the semantic cache, "faq_id" or "intent" when a curated FAQ or templated intent answered,
+        "degraded": true when the LLM failed and the answer was extracted from the sources).
+        History is recorded when the stream completes or is cancelled.
+        """
+        started = time.perf_counter()
+
+        def elapsed_ms() -> float:
+            return round((time.perf_counter() - started) * 1000, 1)
+
+        if not self.is_valid_query(message.message):
+            answered("blocked")
+            session_id = message.session_id or "blocked"
+            yield "sources", {"session_id": session_id, "sources": []}
+            yield "token", {"content": BLOCKED_RESPONSE}
+            yield "done", {"session_id": session_id, "timings": {"total_ms": elapsed_ms()}}
+            return
+
+        session_id = await self.ensure_session(message)
+
+        query_embedding, memory = await asyncio.gather(
+            timed("embed", self.embed_query(message.message)),
+            self.load_memory(session_id),
+        )
+
+        faq = await faq_store.match(message.collection_name, query_embedding)
+        if faq:
+            answered("faq")
+            await self.record_turn(session_id, message.message, faq.faq.answer)
+            yield "sources", {"session_id": session_id, "sources": [faq.source()]}
+            yield "token", {"content": faq.faq.answer}
+            yield "done", {"session_id": session_id, "faq_id": faq.faq.id, "timings": {"total_ms": elapsed_ms()}}
+            return
+
+        intent = await intent_classifier.match(message.collection_name, query_embedding)
+        if intent:
+            answered("intent")
+            await self.record_turn(session_id, message.message, intent.response)
+            yield "sources", {"session_id": session_id, "sources": []}
+            yield "token", {"content": intent.response}
+            yield "done", {"session_id": session_id, "intent": intent.label, "timings": {"total_ms": elapsed_ms()}}
+            return
+
+        cache_namespace = await self.cache_namespace(message, memory)
+        cached = await self.cached_answer(cache_namespace, query_embedding)
+        if cached:
+            answered("cache")
+            await self.record_turn(session_id, message.message, cached.response)
+            yield "sources", {"session_id": session_id, "sources": cached.sources}
+            yield "token", {"content": cached.response}
+            yield "done", {"session_id": session_id, "cached": True, "timings": {"total_ms": elapsed_ms()}}
+            return
+
+        context, sources = await self.retrieve(message, query_embedding)
+        timings = {"retrieval_ms": elapsed_ms()}
+        yield "sources", {"session_id": session_id, "sources": sources if context else []}
+
+        if not context:
+            answered("no_context")
+            yield "token", {"content": NO_CONTEXT_RESPONSE}
+            yield "done", {"session_id": session_id, "timings": {**timings, "total_ms": elapsed_ms()}}
+            return
+
+        route = self.route_query(message, query_embedding, sources, memory)
+        generation_started = time.perf_counter()
+        answer_parts = []
+        degraded = failed = False
+        try:
+            try:
+                async for token in self.stream_response(
+                    message.message,
+                    context,
+                    groq_model=route.model,
+                    max_tokens=message.max_tokens,
+                    temperature=message.temperature,
+                    top_p=message.top_p,
+                    system_prompt_override=message.system_prompt,
+                    memory=memory,
+                ):
+                    if not answer_parts:
+                        timings["ttft_ms"] = elapsed_ms()
+                        record_stage("llm_ttft", time.perf_counter() - generation_started)
+                    answer_parts.append(token)
+                    yield "token", {"content": token}
+            except Exception as e:
+                failed = True
+                annotate(upstream_status=failure_reason(e))
+                if answer_parts:
+                    yield "error", {"detail": f"{GENERATION_ERROR_PREFIX}{str(e)}"}
+                else:
+                    logging.warning("LLM stream failed (%r), serving an extractive answer", e)
+                    degraded = True
+                    answer_parts.append(self.degraded_answer(message.message, context))
+                    yield "token", {"content": answer_parts[0]}
+            else:
+                if answer_parts:
+                    await self.remember_answer(
+                        self.routed_namespace(cache_namespace, route), query_embedding, "".join(answer_parts), sources
+                    )
+            self.record_route(
+                route, message, context, memory, "".join(answer_parts), time.perf_counter() - generation_started, failed
+            )
+
+            if not answer_parts:
+                answer_parts.append(NO_CONTEXT_RESPONSE)
+                yield "token", {"content": NO_CONTEXT_RESPONSE}
+
+            done = {"session_id": session_id, "timings": {**timings, "total_ms": elapsed_ms()}}
+            if degraded:
+                done["degraded"] = True
+            yield "done", done
+        finally:
+            # Runs on normal completion and when the client disconnects mid-stream; shielded
+            # so a cancelled stream still records the turn
+            await asyncio.shield(
+                self.record_turn(session_id, message.message, self.validate_response("".join(answer_parts)))
+            )
+
 
 chat_service = ChatService()
\ No newline at end of file
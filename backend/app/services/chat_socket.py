@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from contextlib import aclosing
+from typing import Any, Dict, Optional
+import anyio
+from fastapi import WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from ..core.concurrency import run_blocking
+from ..core.config import settings
+from ..models.chat import ChatMessage
+from .chat_service import chat_service
+from .profiler import cpu_profiler
+from .rate_limiter import client_key, rate_limiter
+from .slow_request_log import slow_request_log
+
+
+class SlowClientError(Exception):
+    """Raised when a client stops reading and its outbound queue stays full"""
+
+
+class ChatSocketSession:
+    """
+    One WebSocket connection bound to one chat session.
+
+    Four tasks in one task group share the socket: the reader parses client frames and queues chat
+    messages, the worker answers them one at a time through the streaming pipeline,
+    the writer drains a bounded outbound queue, and the heartbeat pings the client
+    and closes idle connections. The outbound queue is what gives backpressure:
+    when the client reads slowly the queue fills, the worker blocks on it and stops
+    pulling tokens from the LLM stream.
+    """
+
+    def __init__(self, websocket: WebSocket, session_id: str):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.inbox: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_SEND_QUEUE_SIZE)
+        self.last_seen = time.monotonic()
+
+    async def push(self, frame: Dict[str, Any]):
+        """Queue a frame for the client, waiting while the client is behind"""
+        try:
+            await asyncio.wait_for(self.outbox.put(frame), timeout=settings.WS_SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise SlowClientError()
+
+    async def reader(self):
+        while True:
+            raw = await self.websocket.receive_text()
+            self.last_seen = time.monotonic()
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                await self.push({"type": "error", "detail": "Frames must be JSON objects"})
+                continue
+
+            kind = data.pop("type", "message")
+            if kind == "pong":
+                continue
+            if kind == "ping":
+                await self.push({"type": "pong"})
+                continue
+
+            try:
+                message = ChatMessage(**{**data, "session_id": self.session_id})
+            except ValidationError as e:
+                await self.push({"type": "error", "detail": e.errors(include_url=False, include_context=False)})
+                continue
+            if rate_limiter.limit > 0:
+                allowed, retry_after = await run_blocking(rate_limiter.hit, client_key(self.websocket))
+                if not allowed:
+                    await self.push({"type": "error", "detail": "Too many requests, please slow down", "retry_after": retry_after})
+                    continue
+            # Blocks while a previous message is still being answered, which in turn stops reading the socket
+            await self.inbox.put(message)
+
+    async def worker(self):
+        while True:
+            message = await self.inbox.get()
+            with slow_request_log.trace("websocket", message), cpu_profiler.request():
+                async with aclosing(chat_service.stream_chat_message(message)) as events:
+                    async for event, data in events:
+                        await self.push({"type": event, **data})
+            # The answer is already out; fold memory before taking the next message
+            await chat_service.update_memory(message.session_id)
+
+    async def writer(self):
+        while True:
+            frame = await self.outbox.get()
+            await self.websocket.send_json(frame)
+
+    async def heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.WS_HEARTBEAT_INTERVAL)
+            if time.monotonic() - self.last_seen > settings.WS_IDLE_TIMEOUT:
+                return
+            await self.push({"type": "ping"})
+
+    async def run(self):
+        await self.push({"type": "session", "session_id": self.session_id})
+        error: Optional[BaseException] = None
+
+        async with anyio.create_task_group() as tg:
+            async def until_first_exit(job):
+                nonlocal error
+                try:
+                    await job()
+                except Exception as e:
+                    error = error or e
+                # Whichever task stops first (disconnect, idle timeout, slow client) takes the others down
+                tg.cancel_scope.cancel()
+
+            for job in (self.reader, self.worker, self.writer, self.heartbeat):
+                tg.start_soon(until_first_exit, job)
+
+        if isinstance(error, WebSocketDisconnect):
+            return
+        if isinstance(error, SlowClientError):
+            await self._close(code=1008, reason="Client is not reading")
+        elif error is not None:
+            logging.error("Chat socket for session %s failed", self.session_id, exc_info=error)
+            await self._close(code=1011, reason="Internal error")
+        else:
+            await self._close(code=1000, reason="Idle timeout")
+
+    async def _close(self, code: int, reason: str):
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+
+class ChatSocketManager:
+    """Tracks open chat sockets and enforces the per-worker connection cap"""
+
+    def __init__(self):
+        self.active = 0
+
+    async def serve(self, websocket: WebSocket, session_id: Optional[str] = None):
+        await websocket.accept()
+        if self.active >= settings.WS_MAX_CONNECTIONS:
+            await websocket.close(code=1013, reason="Too many connections, retry later")
+            return
+
+        self.active += 1
+        try:
+            await ChatSocketSession(websocket, session_id or str(uuid.uuid4())).run()
+        finally:
+            self.active -= 1
+
+
+# Global instance
+chat_socket_manager = ChatSocketManager()
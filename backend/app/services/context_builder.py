@@ -0,0 +1,142 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from ..utils.text import normalize_query
+from ..utils.tokens import count_tokens, truncate_to_tokens
+
+
+# DocumentService.chunk_text overlaps neighbouring chunks by 200 characters
+MAX_CHUNK_OVERLAP = 400
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+@dataclass
+class Passage:
+    text: str
+    rank: int
+    title: Optional[str] = None
+    chunk_ids: List[str] = field(default_factory=list)
+
+
+@dataclass
+class BuiltContext:
+    text: str
+    passages: List[Passage]
+    tokens: int
+    retrieved_chunks: int
+    dropped_passages: int
+
+    def __bool__(self):
+        return bool(self.text)
+
+
+def merge_overlapping(left: str, right: str, max_overlap: int = MAX_CHUNK_OVERLAP) -> str:
+    """Join two consecutive chunks, writing their shared boundary text only once"""
+    for size in range(min(len(left), len(right), max_overlap), 0, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return left + "\n" + right
+
+
+def _to_passages(documents: List[str], metadatas: List[Optional[Dict[str, Any]]], ids: List[str]) -> List[Passage]:
+    """Merge runs of adjacent chunks from the same document; other chunks stay single passages"""
+    by_doc: Dict[str, List[tuple]] = {}
+    passages = []
+    for rank, (text, meta) in enumerate(zip(documents, metadatas)):
+        meta = meta or {}
+        chunk_id = ids[rank] if rank < len(ids) else str(rank)
+        title = meta.get("title") or meta.get("source")
+        if meta.get("doc_id") is not None and meta.get("chunk_index") is not None:
+            by_doc.setdefault(meta["doc_id"], []).append((int(meta["chunk_index"]), rank, text, title, chunk_id))
+        else:
+            passages.append(Passage(text=text, rank=rank, title=title, chunk_ids=[chunk_id]))
+
+    for chunks in by_doc.values():
+        chunks.sort()
+        current = None
+        last_index = None
+        for index, rank, text, title, chunk_id in chunks:
+            if current is not None and index == last_index + 1:
+                current.text = merge_overlapping(current.text, text)
+                current.rank = min(current.rank, rank)
+                current.chunk_ids.append(chunk_id)
+            elif current is None or index != last_index:
+                current = Passage(text=text, rank=rank, title=title, chunk_ids=[chunk_id])
+                passages.append(current)
+            last_index = index
+
+    return sorted(passages, key=lambda p: p.rank)
+
+
+def _drop_duplicates(passages: List[Passage]) -> List[Passage]:
+    """Drop passages whose text already appears inside a more relevant passage"""
+    kept, seen = [], []
+    for passage in passages:
+        normalized = normalize_query(passage.text)
+        if not normalized or any(normalized in other for other in seen):
+            continue
+        kept.append(passage)
+        seen.append(normalized)
+    return kept
+
+
+def build_context(
+    documents: List[str],
+    metadatas: List[Optional[Dict[str, Any]]],
+    ids: List[str],
+    token_budget: int,
+    count: Callable[[str], int] = count_tokens,
+) -> BuiltContext:
+    """
+    Turn ranked chunks into prompt context: merge overlapping neighbours from the same
+    document, drop duplicated text, then pack passages in relevance order until the
+    token budget is spent. The most relevant passage is always included, truncated if
+    it alone exceeds the budget.
+    """
+    passages = _drop_duplicates(_to_passages(documents, metadatas, ids))
+
+    packed, blocks, used = [], [], 0
+    for passage in passages:
+        header = f"[{len(packed) + 1}] {passage.title}\n" if passage.title else f"[{len(packed) + 1}]\n"
+        block = header + passage.text.strip()
+        tokens = count(block)
+        if used + tokens > token_budget:
+            if packed:
+                continue
+            block = truncate_to_tokens(block, token_budget, count)
+            tokens = count(block)
+        packed.append(passage)
+        blocks.append(block)
+        used += tokens
+
+    return BuiltContext(
+        text="\n\n".join(blocks),
+        passages=packed,
+        tokens=used,
+        retrieved_chunks=len(documents),
+        dropped_passages=len(passages) - len(packed),
+    )
+
+
+def extractive_answer(query: str, context: BuiltContext, max_sentences: int = 3, max_passages: int = 2) -> List[str]:
+    """
+    LLM-free answer: the sentences of the top passages that share the most words with the
+    query, in their original order. Falls back to the opening sentences when no sentence shares
+    a word with the query.
+    """
+    terms = set(normalize_query(query).split())
+    sentences = []
+    for passage in context.passages[:max_passages]:
+        for sentence in _SENTENCE_BREAK.split(passage.text):
+            sentence = " ".join(sentence.split())
+            if sentence:
+                sentences.append((len(terms & set(normalize_query(sentence).split())), sentence))
+    if not sentences:
+        return []
+
+    ranked = sorted(range(len(sentences)), key=lambda position: sentences[position][0], reverse=True)
+    chosen = [position for position in ranked[:max_sentences] if sentences[position][0] > 0]
+    if not chosen:
+        chosen = list(range(min(max_sentences, len(sentences))))
+    return [sentences[position][1] for position in sorted(chosen)]
@@ -0,0 +1,180 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List
+from ..core.concurrency import run_blocking
+from ..utils.tokens import count_tokens, truncate_to_tokens
+from .session_store import SessionStore
+
+
+SUMMARY_PROMPT = """
+You keep a running summary of a conversation between a prospective student and a college admission assistant.
+Update the current summary with the new messages. Keep what the student told about themselves (programme
+of interest, UG/PG, background) and which questions were already answered, with the key facts of each answer.
+Reply with the updated summary only, as short bullet points.
+"""
+
+# Chat messages in, completion text out
+Summarizer = Callable[[List[Dict[str, str]]], Awaitable[str]]
+
+
+@dataclass
+class Memory:
+    """Conversation memory that goes into one prompt"""
+    summary: str = ""
+    turns: List[Dict[str, str]] = field(default_factory=list)
+    tokens: int = 0
+    depth: int = 0             # exchanges earlier in the session, summarized or not
+
+    def __bool__(self):
+        return bool(self.summary or self.turns)
+
+    def to_messages(self) -> List[Dict[str, str]]:
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+        messages.extend(self.turns)
+        return messages
+
+
+@dataclass
+class MemoryStats:
+    folds: int = 0
+    summarized_messages: int = 0
+    fallbacks: int = 0
+    conflicts: int = 0
+    errors: int = 0
+
+
+def fit_memory(
+    summary: str,
+    recent: List[Dict[str, Any]],
+    token_budget: int,
+    summary_budget: int,
+    count: Callable[[str], int] = count_tokens,
+) -> Memory:
+    """
+    Fit a summary and the most recent messages into `token_budget` tokens.
+
+    The summary is capped at `summary_budget`; whole messages then fill the rest, newest
+    first. The verbatim window always starts at a user message.
+    """
+    summary = summary.strip()
+    if summary:
+        summary = truncate_to_tokens(summary, min(summary_budget, token_budget), count)
+    used = count(summary) if summary else 0
+
+    turns = []
+    for message in reversed(recent):
+        tokens = count(message["content"])
+        if used + tokens > token_budget:
+            break
+        turns.append({"role": message["role"], "content": message["content"]})
+        used += tokens
+    turns.reverse()
+    while turns and turns[0]["role"] != "user":
+        used -= count(turns.pop(0)["content"])
+
+    return Memory(summary=summary, turns=turns, tokens=used)
+
+
+def extractive_summary(
+    previous: str,
+    messages: List[Dict[str, Any]],
+    max_tokens: int,
+    count: Callable[[str], int] = count_tokens,
+) -> str:
+    """LLM-free fallback: one line per user question added to the summary, oldest lines dropped first"""
+    lines = [line for line in previous.splitlines() if line.strip()]
+    for message in messages:
+        if message["role"] == "user":
+            lines.append(f"- The student asked: {' '.join(message['content'].split())}")
+    while len(lines) > 1 and count("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return truncate_to_tokens("\n".join(lines), max_tokens, count)
+
+
+class ConversationMemory:
+    """
+    Per-session conversation memory under a fixed token budget.
+
+    The last `recent_turns` exchanges are sent verbatim. Exchanges that leave that window
+    are folded into a rolling summary stored with the session: each fold summarizes only
+    the previous summary plus the newly evicted messages, and runs after the answer has
+    been delivered. Prompt size and per-turn work stay flat however long the conversation.
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        summarize: Summarizer,
+        recent_turns: int,
+        token_budget: int,
+        summary_max_tokens: int,
+    ):
+        self.store = store
+        self.summarize = summarize
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+        self.stats = MemoryStats()
+
+    @property
+    def window(self) -> int:
+        """Messages kept verbatim"""
+        return max(self.recent_turns, 0) * 2
+
+    def load(self, session_id: str) -> Memory:
+        """Memory to send with the next request of a session (blocking; run it via run_blocking)"""
+        state = self.store.get_memory(session_id, self.window)
+        if state is None:
+            return Memory()
+        memory = fit_memory(state.summary, state.recent, self.token_budget, self.summary_max_tokens)
+        memory.depth = state.message_count // 2
+        return memory
+
+    async def update(self, session_id: str):
+        """Fold messages that left the verbatim window into the session's summary (never raises)"""
+        try:
+            state = await run_blocking(self.store.get_memory, session_id, 0)
+            if state is None:
+                return
+            end = state.message_count - self.window
+            if end <= state.summarized:
+                return
+            evicted = await run_blocking(self.store.get_messages, session_id, state.summarized, end)
+            summary = await self._fold(state.summary, evicted)
+            # Another worker or request may have folded the same messages meanwhile
+            if await run_blocking(self.store.set_summary, session_id, summary, end, state.summarized):
+                self.stats.folds += 1
+                self.stats.summarized_messages += len(evicted)
+            else:
+                self.stats.conflicts += 1
+        except Exception:
+            self.stats.errors += 1
+            logging.exception("Conversation memory update failed for session %s", session_id)
+
+    async def _fold(self, previous: str, messages: List[Dict[str, Any]]) -> str:
+        transcript = "\n".join(
+            f"{message['role'].capitalize()}: {truncate_to_tokens(message['content'], self.token_budget)}"
+            for message in messages
+        )
+        prompt = [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Current summary:\n{previous or '(empty)'}\n\nNew messages:\n{transcript}"},
+        ]
+        try:
+            summary = (await self.summarize(prompt) or "").strip()
+            if summary:
+                return truncate_to_tokens(summary, self.summary_max_tokens)
+        except Exception as e:
+            logging.warning("Summarizing conversation failed (%s), using extractive summary", e)
+        self.stats.fallbacks += 1
+        return extractive_summary(previous, messages, self.summary_max_tokens)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "recent_turns": self.recent_turns,
+            "token_budget": self.token_budget,
+            "summary_max_tokens": self.summary_max_tokens,
+            **vars(self.stats),
+        }
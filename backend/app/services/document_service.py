@@ -1,3 +1,5 @@
+import os
+import time
 import uuid
 from datetime import datetime
 from typing import List, Dict, Any
@@ -6,18 +8,37 @@ import pypdf
 import docx
 import io
 import json
-from ..core.database import get_chroma_collection, get_embedding_model
+from ..core.database import get_embedding_model, with_chroma_collection
+from ..core.metrics import (
+    ingest_chunks,
+    ingest_documents,
+    ingest_extract_seconds,
+    ingest_extracted_bytes,
+    ingest_stage_seconds,
+)
 from ..models.document import DocumentUpload, CollectionCreate
+from .keyword_index import keyword_index
+from .semantic_cache import semantic_cache
 
 
 class DocumentService:
-    def __init__(self):
-        self.embedding_model = get_embedding_model()
+    @property
+    def embedding_model(self):
+        # Loaded on first use, so importing the app does not download or load the model
+        return get_embedding_model()
     
     def extract_text_from_file(self, file: UploadFile) -> str:
         """Extract text content from uploaded file"""
         content = file.file.read()
+        started = time.perf_counter()
+        text = self._extract_text(file, content)
+        # Unsupported formats have raised by now and are not counted
+        file_type = os.path.splitext(file.filename)[1].lstrip('.').lower()
+        ingest_extract_seconds.observe(time.perf_counter() - started, file_type=file_type)
+        ingest_extracted_bytes.inc(len(content), file_type=file_type)
+        return text
 
+    def _extract_text(self, file: UploadFile, content: bytes) -> str:
         if file.filename.endswith('.pdf'):
             pdf_reader = pypdf.PdfReader(io.BytesIO(content))
             text = ""
@@ -53,10 +74,11 @@ class DocumentService:
     
     def process_and_store_document(self, content: str, title: str, metadata: Dict, collection_name: str) -> Dict:
         """Process document content and store in ChromaDB"""
-        chunks = self.chunk_text(content)
-        collection = get_chroma_collection(collection_name)
+        with ingest_stage_seconds.time(stage="chunk"):
+            chunks = self.chunk_text(content)
         doc_id = str(uuid.uuid4())
-        embeddings = self.embedding_model.encode(chunks).tolist()
+        with ingest_stage_seconds.time(stage="embed"):
+            embeddings = self.embedding_model.encode(chunks).tolist()
 
         metadatas = [
             {
@@ -68,8 +90,15 @@ class DocumentService:
             } for i in range(len(chunks))
         ]
         ids = [f"{doc_id}_chunk_{i}" for i in range(len(chunks))]
-        collection.add(documents=chunks, embeddings=embeddings, metadatas=metadatas, ids=ids)
-        
+        with ingest_stage_seconds.time(stage="store"):
+            with_chroma_collection(collection_name, lambda collection: collection.add(
+                documents=chunks, embeddings=embeddings, metadatas=metadatas, ids=ids
+            ))
+            keyword_index.add_chunks(collection_name, ids, chunks, doc_id)
+        semantic_cache.invalidate_collection(collection_name)
+        ingest_documents.inc()
+        ingest_chunks.inc(len(chunks))
+
         return {
             "doc_id": doc_id,
             "title": title,
@@ -129,8 +158,7 @@ class DocumentService:
     def list_documents(self, collection_name: str = "default", limit: int = 100) -> Dict:
         """List all documents in a collection"""
         try:
-            collection = get_chroma_collection(collection_name)
-            results = collection.get(limit=limit)
+            results = with_chroma_collection(collection_name, lambda collection: collection.get(limit=limit))
             documents = {}
             for metadata in results['metadatas']:
                 doc_id = metadata.get('doc_id')
@@ -155,8 +183,7 @@ class DocumentService:
     def get_document_details(self, doc_id: str, collection_name: str = "default") -> Dict:
         """Get detailed information about a specific document"""
         try:
-            collection = get_chroma_collection(collection_name)
-            results = collection.get(where={"doc_id": doc_id})
+            results = with_chroma_collection(collection_name, lambda collection: collection.get(where={"doc_id": doc_id}))
             if not results['ids']:
                 raise HTTPException(status_code=404, detail="Document not found")
             chunks = []
@@ -185,11 +212,12 @@ class DocumentService:
     def delete_document(self, doc_id: str, collection_name: str = "default") -> Dict:
         """Delete a document from the collection"""
         try:
-            collection = get_chroma_collection(collection_name)
-            results = collection.get(where={"doc_id": doc_id})
+            results = with_chroma_collection(collection_name, lambda collection: collection.get(where={"doc_id": doc_id}))
             if not results['ids']:
                 raise HTTPException(status_code=404, detail="Document not found")
-            collection.delete(ids=results['ids'])
+            with_chroma_collection(collection_name, lambda collection: collection.delete(ids=results['ids']))
+            keyword_index.remove_chunks(collection_name, results['ids'])
+            semantic_cache.invalidate_collection(collection_name)
             return {
                 "message": "Document deleted successfully",
                 "doc_id": doc_id,
@@ -0,0 +1,94 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from ..core.concurrency import run_blocking
+from ..core.config import settings
+from .embedding_cache import query_embedding_cache
+
+
+@dataclass
+class _PendingBatch:
+    items: List[Tuple[str, asyncio.Future]] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batching front for a blocking batch encoder.
+
+    While a batch is encoding, new `embed` calls collect for up to `max_wait_ms` (or until
+    `max_batch_size` is reached) and are then encoded together in a single call on the
+    blocking executor, each caller's future resolved with its own vector. When the encoder
+    is idle a call is dispatched straight away, so a lone request pays no batching delay.
+    One encode of 32 sentences costs far less than 32 encodes of one sentence.
+    """
+
+    def __init__(self, encode_many: Callable[[List[str]], List[np.ndarray]], max_batch_size: int, max_wait_ms: float):
+        self._encode_many = encode_many
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # Batches are tied to the loop their futures belong to
+        self._pending: Dict[asyncio.AbstractEventLoop, _PendingBatch] = {}
+        self._in_flight = 0
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    async def embed(self, text: str) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self._pending.get(loop)
+        if batch is None:
+            batch = self._pending[loop] = _PendingBatch()
+            # When the encoder is idle there is nothing to wait for: dispatch on the next loop tick
+            delay = self.max_wait if self._in_flight else 0
+            batch.timer = loop.call_later(delay, self._flush, loop)
+        batch.items.append((text, future))
+        if len(batch.items) >= self.max_batch_size:
+            self._flush(loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop):
+        batch = self._pending.pop(loop, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        loop.create_task(self._run(batch.items))
+
+    async def _run(self, items: List[Tuple[str, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(items)
+        self.largest_batch = max(self.largest_batch, len(items))
+        self._in_flight += 1
+        try:
+            vectors = await run_blocking(self._encode_many, [text for text, _ in items])
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._in_flight -= 1
+        for (_, future), vector in zip(items, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "average_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+# Global instance; cache misses from concurrent chat requests are encoded together
+query_embedding_batcher = EmbeddingBatcher(
+    encode_many=query_embedding_cache.embed_many,
+    max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+    max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+)
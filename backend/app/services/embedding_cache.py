@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from ..core.config import settings
+from ..core.database import get_embedding_model
+from ..utils.text import normalize_query
+
+
+# Rough per-entry bookkeeping cost (dict slot, key object, array header)
+_ENTRY_OVERHEAD_BYTES = 200
+
+
+class QueryEmbeddingCache:
+    """
+    LRU cache of query embeddings keyed by normalized query text.
+
+    Queries that only differ in case, whitespace or punctuation share one entry, and the
+    normalized text is what gets encoded so every variant maps to the same vector.
+    Vectors are kept as float32 and the cache is bounded by total bytes, not entry count.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], Any], max_bytes: int):
+        self._encode = encode
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for a query without encoding, or None"""
+        key = normalize_query(query) or query
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return vector
+
+    def embed(self, query: str) -> np.ndarray:
+        """Return the float32 embedding for a query (blocking on a miss)"""
+        return self.embed_many([query])[0]
+
+    def embed_many(self, queries: List[str]) -> List[np.ndarray]:
+        keys = [normalize_query(query) or query for query in queries]
+        vectors: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    vectors[key] = vector
+                    self.hits += 1
+                else:
+                    self.misses += 1
+
+        missing = list(dict.fromkeys(key for key in keys if key not in vectors))
+        if missing:
+            encoded = np.asarray(self._encode(missing), dtype=np.float32)
+            with self._lock:
+                for key, vector in zip(missing, encoded):
+                    vectors[key] = vector
+                    self._put(key, vector)
+
+        return [vectors[key] for key in keys]
+
+    def _put(self, key: str, vector: np.ndarray):
+        if key in self._entries:
+            return
+        self._entries[key] = vector
+        self._bytes += self._entry_size(key, vector)
+        while self._bytes > self.max_bytes and self._entries:
+            old_key, old_vector = self._entries.popitem(last=False)
+            self._bytes -= self._entry_size(old_key, old_vector)
+            self.evictions += 1
+
+    @staticmethod
+    def _entry_size(key: str, vector: np.ndarray) -> int:
+        return vector.nbytes + len(key) + _ENTRY_OVERHEAD_BYTES
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global instance, shared by every caller that embeds user queries
+query_embedding_cache = QueryEmbeddingCache(
+    encode=lambda texts: get_embedding_model().encode(texts),
+    max_bytes=settings.QUERY_EMBEDDING_CACHE_MAX_BYTES,
+)
+
+
+def embed_queries(queries: List[str]) -> np.ndarray:
+    """Embed query-like texts (FAQ variants, intent examples) exactly as chat queries are, one row each (blocking)"""
+    return np.asarray(query_embedding_cache.embed_many(queries), dtype=np.float32)
@@ -0,0 +1,353 @@
+import json
+import os
+import threading
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from ..core.concurrency import run_blocking
+from ..core.config import settings
+from ..core.sqlite import SQLiteDatabase
+from .embedding_cache import embed_queries
+
+
+@dataclass
+class FAQ:
+    id: str
+    questions: List[str]
+    answer: str
+    source_url: Optional[str] = None
+
+
+@dataclass
+class FAQMatch:
+    faq: FAQ
+    question: str          # the variant that matched
+    similarity: float
+
+    def source(self) -> Dict[str, Any]:
+        """Source entry in the same shape as retrieved chunks"""
+        return {
+            "content": self.faq.answer[:300],
+            "metadata": {"faq_id": self.faq.id, "question": self.question, "source_url": self.faq.source_url},
+            "distance": round(1.0 - self.similarity, 6),
+        }
+
+
+@dataclass
+class _FAQIndex:
+    faqs: List[FAQ] = field(default_factory=list)
+    matrix: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=np.float32))
+    owners: List[int] = field(default_factory=list)      # FAQ position of each matrix row
+    variants: List[str] = field(default_factory=list)
+
+
+class ServedCounts:
+    """How often each FAQ was served, counted in this process"""
+
+    shared = False  # True when counting touches disk and belongs off the event loop
+
+    def __init__(self):
+        self._counts: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    def add(self, collection_name: str, faq_id: str):
+        with self._lock:
+            self._counts.setdefault(collection_name, Counter())[faq_id] += 1
+
+    def get(self, collection_name: str) -> Counter:
+        with self._lock:
+            return Counter(self._counts.get(collection_name, Counter()))
+
+    def clear(self, collection_name: str):
+        with self._lock:
+            self._counts.pop(collection_name, None)
+
+
+class SQLiteServedCounts(ServedCounts):
+    """Same counts, in a SQLite file shared by all worker processes"""
+
+    shared = True
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.db = SQLiteDatabase(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS faq_served (
+                collection TEXT NOT NULL,
+                faq_id TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (collection, faq_id)
+            );
+        """)
+
+    def add(self, collection_name: str, faq_id: str):
+        with self.db.transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO faq_served (collection, faq_id, count) VALUES (?, ?, 1)
+                ON CONFLICT (collection, faq_id) DO UPDATE SET count = count + 1
+                """,
+                (collection_name, faq_id),
+            )
+
+    def get(self, collection_name: str) -> Counter:
+        rows = self.db.conn().execute(
+            "SELECT faq_id, count FROM faq_served WHERE collection = ?", (collection_name,)
+        ).fetchall()
+        return Counter(dict(rows))
+
+    def clear(self, collection_name: str):
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM faq_served WHERE collection = ?", (collection_name,))
+
+
+def create_served_counts() -> ServedCounts:
+    if settings.WORKERS > 1:
+        return SQLiteServedCounts(settings.SHARED_STATE_DB_PATH)
+    return ServedCounts()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class FAQStore:
+    """
+    Curated question/answer pairs per collection, answered before retrieval and the LLM.
+
+    Every question variant is embedded once, when the FAQs are loaded; a chat query is
+    then compared with all variants in one matrix-vector product and answered with the
+    canonical answer of the closest FAQ when it is at least `min_similarity` close.
+    FAQs are persisted as JSON under `directory`, with the variant embeddings alongside
+    as .npy so restarts and other workers do not re-embed them; the model name and
+    dimension are saved with them, and the variants are re-embedded when either changes.
+    Served counts are kept by `served`, shared through SQLite when several workers run.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        min_similarity: float,
+        embed: Callable[[List[str]], np.ndarray] = embed_queries,
+        served: Optional[ServedCounts] = None,
+        model_name: Optional[str] = None,
+    ):
+        self.directory = directory
+        self.min_similarity = min_similarity
+        self._embed = embed
+        self._model_name = model_name
+        self._indexes: Dict[str, _FAQIndex] = {}
+        self._mtimes: Dict[str, Optional[int]] = {}
+        self._served = served if served is not None else ServedCounts()
+        self._checked = 0
+        self._lock = threading.Lock()
+
+    def _path(self, collection_name: str, extension: str = "json") -> str:
+        return os.path.join(self.directory, f"{collection_name}.{extension}")
+
+    @property
+    def model_name(self) -> str:
+        return self._model_name or settings.EMBEDDING_MODEL
+
+    def _mtime(self, collection_name: str) -> Optional[int]:
+        try:
+            return os.stat(self._path(collection_name)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _current(self, collection_name: str) -> Optional[_FAQIndex]:
+        """The loaded index, or None when it was never loaded or another worker rewrote it"""
+        index = self._indexes.get(collection_name)
+        if index is None or self._mtime(collection_name) != self._mtimes.get(collection_name):
+            return None
+        return index
+
+    def _get(self, collection_name: str) -> _FAQIndex:
+        """Return the loaded index, reading it from disk if needed (blocking; call with the lock held)"""
+        index = self._current(collection_name)
+        if index is not None:
+            return index
+        mtime = self._mtime(collection_name)
+        try:
+            with open(self._path(collection_name), "r", encoding="utf-8") as f:
+                faqs = [FAQ(**faq) for faq in json.load(f)]
+        except FileNotFoundError:
+            faqs = []
+        embeddings = self._load_embeddings(collection_name)
+        index = self._build(faqs, embeddings)
+        if index.variants and (embeddings is None or len(embeddings) != len(index.variants)):
+            self._save_embeddings(collection_name, index.matrix)
+        self._indexes[collection_name] = index
+        self._mtimes[collection_name] = mtime
+        return index
+
+    def _build(
+        self,
+        faqs: List[FAQ],
+        embeddings: Optional[np.ndarray] = None,
+        known: Optional[_FAQIndex] = None,
+    ) -> _FAQIndex:
+        """Index FAQs, embedding only variants that have no row in `embeddings` or `known`"""
+        variants, owners = [], []
+        for position, faq in enumerate(faqs):
+            for question in faq.questions:
+                variants.append(question)
+                owners.append(position)
+        if not variants:
+            return _FAQIndex(faqs=faqs)
+        if embeddings is None or len(embeddings) != len(variants):
+            rows = dict(zip(known.variants, known.matrix)) if known is not None else {}
+            missing = [variant for variant in dict.fromkeys(variants) if variant not in rows]
+            if missing:
+                rows.update(zip(missing, _normalize(np.asarray(self._embed(missing), dtype=np.float32))))
+            embeddings = np.stack([rows[variant] for variant in variants])
+        matrix = _normalize(np.asarray(embeddings, dtype=np.float32))
+        return _FAQIndex(faqs=faqs, matrix=matrix, owners=owners, variants=variants)
+
+    def _load_embeddings(self, collection_name: str) -> Optional[np.ndarray]:
+        """Saved variant embeddings, or None when missing or made by another model"""
+        try:
+            with open(self._path(collection_name, "embeddings.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            embeddings = np.load(self._path(collection_name, "npy"))
+        except (FileNotFoundError, ValueError):
+            return None
+        if (
+            meta.get("model") != self.model_name
+            or embeddings.ndim != 2
+            or embeddings.shape[1] != meta.get("dimension")
+        ):
+            return None
+        return embeddings
+
+    def _save_embeddings(self, collection_name: str, matrix: np.ndarray):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(collection_name, "npy")
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, matrix)
+        os.replace(tmp_path, path)
+        meta_path = self._path(collection_name, "embeddings.json")
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dimension": int(matrix.shape[1])}, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    def _save(self, collection_name: str, index: _FAQIndex):
+        # Embeddings first: a reader that sees the new JSON also finds matching embeddings
+        self._save_embeddings(collection_name, index.matrix)
+        path = self._path(collection_name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump([asdict(faq) for faq in index.faqs], f, indent=2)
+        os.replace(tmp_path, path)
+        self._indexes[collection_name] = index
+        self._mtimes[collection_name] = self._mtime(collection_name)
+
+    def load(self, collection_name: str, faqs: List[Dict[str, Any]], replace: bool = True) -> int:
+        """
+        Bulk load FAQs (blocking). With `replace` the collection's FAQs are swapped out;
+        otherwise FAQs are added, overwriting existing ones with the same id.
+        Returns the number of FAQs the collection now has.
+        """
+        loaded = []
+        for faq in faqs:
+            questions = [question.strip() for question in faq["questions"] if question.strip()]
+            if not questions or not faq["answer"].strip():
+                raise ValueError("Every FAQ needs at least one question and an answer")
+            loaded.append(FAQ(
+                id=faq.get("id") or uuid.uuid4().hex[:12],
+                questions=questions,
+                answer=faq["answer"].strip(),
+                source_url=faq.get("source_url"),
+            ))
+
+        with self._lock:
+            current = self._get(collection_name)
+            merged = {} if replace else {faq.id: faq for faq in current.faqs}
+            merged.update({faq.id: faq for faq in loaded})
+            # Variants that were already indexed keep their embeddings
+            index = self._build(list(merged.values()), known=current)
+            self._save(collection_name, index)
+            if replace:
+                self._served.clear(collection_name)
+            return len(index.faqs)
+
+    def delete_collection(self, collection_name: str):
+        with self._lock:
+            for extension in ("json", "npy", "embeddings.json"):
+                try:
+                    os.remove(self._path(collection_name, extension))
+                except FileNotFoundError:
+                    pass
+            self._indexes.pop(collection_name, None)
+            self._mtimes.pop(collection_name, None)
+            self._served.clear(collection_name)
+
+    def list(self, collection_name: str) -> List[Dict[str, Any]]:
+        """FAQs of a collection with how often each was served, most served first"""
+        with self._lock:
+            faqs = self._get(collection_name).faqs
+        served = self._served.get(collection_name)
+        entries = [{**asdict(faq), "served": served[faq.id]} for faq in faqs]
+        return sorted(entries, key=lambda entry: entry["served"], reverse=True)
+
+    def lookup(self, collection_name: str, query_embedding: np.ndarray) -> Optional[FAQMatch]:
+        """Closest FAQ if it is close enough, counted as served (blocking)"""
+        with self._lock:
+            index = self._get(collection_name)
+        match = self._closest(index, query_embedding)
+        if match is not None:
+            self._served.add(collection_name, match.faq.id)
+        return match
+
+    def _closest(self, index: _FAQIndex, query_embedding: np.ndarray) -> Optional[FAQMatch]:
+        with self._lock:
+            self._checked += 1
+        if not index.variants:
+            return None
+        similarities = index.matrix @ _normalize(np.asarray(query_embedding, dtype=np.float32))
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.min_similarity:
+            return None
+        faq = index.faqs[index.owners[best]]
+        return FAQMatch(faq=faq, question=index.variants[best], similarity=float(similarities[best]))
+
+    async def match(self, collection_name: str, query_embedding: np.ndarray) -> Optional[FAQMatch]:
+        """FAQ answer for a chat query; only a collection's first query waits for the FAQs to load"""
+        if not settings.FAQ_ENABLED:
+            return None
+        index = self._current(collection_name)
+        if index is None:
+            return await run_blocking(self.lookup, collection_name, query_embedding)
+        match = self._closest(index, query_embedding)
+        if match is not None:
+            if self._served.shared:
+                await run_blocking(self._served.add, collection_name, match.faq.id)
+            else:
+                self._served.add(collection_name, match.faq.id)
+        return match
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            indexes = dict(self._indexes)
+        collections = {
+            name: {"faqs": len(index.faqs), "served": sum(self._served.get(name).values())}
+            for name, index in indexes.items()
+        }
+        return {
+            "enabled": settings.FAQ_ENABLED,
+            "min_similarity": self.min_similarity,
+            "checked": self._checked,
+            "llm_calls_avoided": sum(collection["served"] for collection in collections.values()),
+            "collections": collections,
+        }
+
+
+# Global instance
+faq_store = FAQStore(
+    directory=os.path.join(settings.CHROMA_DB_PATH, "faqs"),
+    min_similarity=settings.FAQ_MIN_SIMILARITY,
+    served=create_served_counts(),
+)
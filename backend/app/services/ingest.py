@@ -3,6 +3,7 @@ print("RUNNING FILE:", os.path.abspath(__file__))
 import uuid
 from sentence_transformers import SentenceTransformer
 from app.core.database import get_chroma_collection
+from app.services.keyword_index import keyword_index
 from docx import Document
 
 print("INGEST FILE RUNNING")
@@ -63,6 +64,7 @@ def ingest_data():
         embeddings=[emb.tolist() for emb in embeddings],
         ids=ids
     )
+    keyword_index.add_chunks("default", ids, chunks)
 
     print("✅ Clean data ingested")
 
@@ -0,0 +1,271 @@
+import json
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from ..core.concurrency import run_blocking
+from ..core.config import settings
+from .embedding_cache import embed_queries
+
+
+SCOPE_RESPONSE = (
+    "I am designed to assist only with information related to Vimala College (Autonomous), "
+    "Thrissur admissions and academic programs."
+)
+
+# Intents with a response are answered without retrieval or an LLM call; intents without
+# one ("in_scope") describe the questions the chatbot exists for and always pass through
+DEFAULT_INTENTS: Dict[str, Dict[str, Any]] = {
+    "in_scope": {
+        "response": None,
+        "examples": [
+            "What courses are offered?",
+            "What is the eligibility for BCom?",
+            "How do I apply for admission?",
+            "Which documents are required for admission?",
+            "What is the fee for the MSc programme?",
+            "When does the admission process start?",
+            "Is hostel accommodation available?",
+            "Does the college offer PhD programmes?",
+            "How do I fill the online application form?",
+            "Tell me about Vimala College",
+        ],
+    },
+    "greeting": {
+        "response": (
+            "Hello! I can help with admissions, courses, eligibility and documents at "
+            "Vimala College (Autonomous), Thrissur. What would you like to know?"
+        ),
+        "examples": ["Hi", "Hello", "Hey there", "Good morning", "Good evening", "Hello, how are you?"],
+    },
+    "thanks": {
+        "response": "You are welcome. Please ask if you have any other admission-related questions.",
+        "examples": ["Thank you", "Thanks a lot", "Ok thanks", "Thanks, that helps", "Great, thank you so much"],
+    },
+    "out_of_scope": {
+        "response": SCOPE_RESPONSE,
+        "examples": [
+            "What is the weather today?",
+            "Tell me a joke",
+            "Who will win the election?",
+            "Give me a recipe for cake",
+            "What is the price of bitcoin?",
+            "Recommend a good movie",
+            "Which religion is the best?",
+            "Can you help me with my medical symptoms?",
+        ],
+    },
+    "abusive": {
+        "response": "I am here to assist with admission-related queries for Vimala College. How may I help you?",
+        "examples": ["You are stupid", "Shut up", "This bot is useless, idiot", "You are a useless machine", "Go to hell"],
+    },
+}
+
+
+@dataclass
+class IntentMatch:
+    label: str
+    response: str
+    similarity: float
+
+
+@dataclass
+class _Centroids:
+    intents: Dict[str, Dict[str, Any]]      # the definition they were built from
+    labels: List[str]
+    responses: List[Optional[str]]
+    matrix: np.ndarray          # one L2-normalized centroid per row
+
+
+def validate_intents(intents: Dict[str, Dict[str, Any]]):
+    """Raise ValueError unless every label has examples and at least one label answers"""
+    if not intents:
+        raise ValueError("At least one intent is required")
+    for label, intent in intents.items():
+        if not intent.get("examples"):
+            raise ValueError(f"Intent '{label}' needs at least one example")
+    if not any(intent.get("response") for intent in intents.values()):
+        raise ValueError("At least one intent needs a response")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class IntentClassifier:
+    """
+    Nearest-centroid intent classifier over the query embedding the chat pipeline already has.
+
+    Each intent's labelled examples are embedded once and averaged into a centroid; a
+    query is then matched with one matrix-vector product. A query gets an intent's
+    templated response only when that intent wins, is at least `min_similarity` close,
+    and beats the closest pass-through intent by `margin`; anything else goes through
+    retrieval and the LLM as usual. Collections can have their own label set and
+    examples, persisted as JSON next to the Chroma data.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        min_similarity: float,
+        margin: float,
+        embed: Callable[[List[str]], np.ndarray] = embed_queries,
+    ):
+        self.path = path
+        self.min_similarity = min_similarity
+        self.margin = margin
+        self._embed = embed
+        self._custom: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None
+        self._mtime: Optional[int] = None
+        self._centroids: Dict[str, _Centroids] = {}
+        self._counts: Dict[str, Counter] = {}
+        self._checked = 0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        # Reload when another worker process has saved new intents
+        mtime = self._file_mtime()
+        if self._custom is None or mtime != self._mtime:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._custom = json.load(f)
+            except FileNotFoundError:
+                self._custom = {}
+            self._mtime = mtime
+        return self._custom
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._custom, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._mtime = self._file_mtime()
+
+    def get_intents(self, collection_name: str) -> Dict[str, Dict[str, Any]]:
+        """The collection's own intents, or the defaults"""
+        with self._lock:
+            return self._load().get(collection_name, DEFAULT_INTENTS)
+
+    def is_custom(self, collection_name: str) -> bool:
+        with self._lock:
+            return collection_name in self._load()
+
+    def set_intents(self, collection_name: str, intents: Dict[str, Dict[str, Any]]):
+        validate_intents(intents)
+        with self._lock:
+            self._load()[collection_name] = intents
+            self._save()
+
+    def forget(self, collection_name: str):
+        """Go back to the default intents for a collection"""
+        with self._lock:
+            if self._load().pop(collection_name, None) is not None:
+                self._save()
+
+    def _cached(self, collection_name: str, intents: Dict[str, Dict[str, Any]]) -> Optional[_Centroids]:
+        centroids = self._centroids.get(collection_name)
+        # Saving or reloading intents replaces the dict, so identity tells whether these are current
+        if centroids is not None and centroids.intents is intents:
+            return centroids
+        return None
+
+    def centroids(self, collection_name: str) -> _Centroids:
+        """Centroids for a collection's intents, embedding the examples on first use (blocking)"""
+        # Concurrent first queries wait for one build instead of each embedding the examples
+        with self._build_lock:
+            intents = self.get_intents(collection_name)
+            cached = self._cached(collection_name, intents)
+            if cached is not None:
+                return cached
+            return self._build(collection_name, intents)
+
+    def _build(self, collection_name: str, intents: Dict[str, Dict[str, Any]]) -> _Centroids:
+        labels = list(intents)
+        examples = [example for label in labels for example in intents[label]["examples"]]
+        vectors = _normalize(self._embed(examples))
+        rows, start = [], 0
+        for label in labels:
+            count = len(intents[label]["examples"])
+            rows.append(vectors[start:start + count].mean(axis=0))
+            start += count
+
+        centroids = _Centroids(
+            intents=intents,
+            labels=labels,
+            responses=[intents[label].get("response") or None for label in labels],
+            matrix=_normalize(np.stack(rows)),
+        )
+        self._centroids[collection_name] = centroids
+        return centroids
+
+    def classify(self, centroids: _Centroids, query_embedding: np.ndarray) -> Optional[IntentMatch]:
+        """Templated answer for a query embedding, or None to let the query through"""
+        similarities = centroids.matrix @ _normalize(np.asarray(query_embedding, dtype=np.float32))
+        best = int(np.argmax(similarities))
+        response = centroids.responses[best]
+        if response is None or similarities[best] < self.min_similarity:
+            return None
+        passthrough = [similarities[i] for i, r in enumerate(centroids.responses) if r is None]
+        if passthrough and similarities[best] - max(passthrough) < self.margin:
+            return None
+        return IntentMatch(label=centroids.labels[best], response=response, similarity=float(similarities[best]))
+
+    def passthrough_label(self, collection_name: str, query_embedding: np.ndarray) -> Optional[str]:
+        """Closest intent without a response (such as "in_scope") for a query going on to the LLM"""
+        if not settings.INTENT_CLASSIFIER_ENABLED:
+            return None
+        # Called after match(), so the centroids are built unless the intents just changed
+        centroids = self._cached(collection_name, self.get_intents(collection_name))
+        if centroids is None:
+            return None
+        passthrough = [i for i, response in enumerate(centroids.responses) if response is None]
+        if not passthrough:
+            return None
+        similarities = centroids.matrix @ _normalize(np.asarray(query_embedding, dtype=np.float32))
+        return centroids.labels[max(passthrough, key=lambda i: similarities[i])]
+
+    async def match(self, collection_name: str, query_embedding: np.ndarray) -> Optional[IntentMatch]:
+        """Classify a query; only the first query of a collection waits for its examples to be embedded"""
+        if not settings.INTENT_CLASSIFIER_ENABLED:
+            return None
+        centroids = self._cached(collection_name, self.get_intents(collection_name))
+        if centroids is None:
+            centroids = await run_blocking(self.centroids, collection_name)
+
+        matched = self.classify(centroids, query_embedding)
+        with self._lock:
+            self._checked += 1
+            if matched is not None:
+                self._counts.setdefault(collection_name, Counter())[matched.label] += 1
+        return matched
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            collections = {name: dict(counts) for name, counts in self._counts.items()}
+        return {
+            "enabled": settings.INTENT_CLASSIFIER_ENABLED,
+            "min_similarity": self.min_similarity,
+            "margin": self.margin,
+            "checked": self._checked,
+            "llm_calls_avoided": sum(sum(counts.values()) for counts in collections.values()),
+            "collections": collections,
+        }
+
+
+# Global instance
+intent_classifier = IntentClassifier(
+    path=os.path.join(settings.CHROMA_DB_PATH, "intents.json"),
+    min_similarity=settings.INTENT_MIN_SIMILARITY,
+    margin=settings.INTENT_MARGIN,
+)
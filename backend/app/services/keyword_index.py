@@ -0,0 +1,286 @@
+import fcntl
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+from ..core.config import settings
+from ..core.database import with_chroma_collection
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_DIGIT_GROUPING_RE = re.compile(r"(?<=\d)[,.](?=\d{3}\b)")
+
+# Kept short on purpose: course codes and short proper nouns ("BA", "OAP") must stay searchable
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or "
+    "the to what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word/number tokens; "20,000" and "20000" index the same"""
+    text = _DIGIT_GROUPING_RE.sub("", text.lower())
+    return [token for token in _TOKEN_RE.findall(text) if token not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: each id scores sum(1 / (k + rank)) over the lists it appears in"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """Okapi BM25 inverted index over the chunks of one collection"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.chunks: Dict[str, Tuple[Optional[str], Dict[str, int]]] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.total_length = 0
+        self._lengths: Dict[str, int] = {}
+
+    def add(self, chunk_id: str, text: str, doc_id: Optional[str] = None):
+        self.put(chunk_id, doc_id, dict(Counter(tokenize(text))))
+
+    def put(self, chunk_id: str, doc_id: Optional[str], terms: Dict[str, int]):
+        """Add a chunk by its term counts, replacing any earlier version"""
+        if chunk_id in self.chunks:
+            self.remove([chunk_id])
+        self._insert(chunk_id, doc_id, terms)
+
+    def _insert(self, chunk_id: str, doc_id: Optional[str], terms: Dict[str, int]):
+        self.chunks[chunk_id] = (doc_id, terms)
+        length = sum(terms.values())
+        self._lengths[chunk_id] = length
+        self.total_length += length
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[chunk_id] = tf
+
+    def remove(self, chunk_ids: Sequence[str]):
+        for chunk_id in chunk_ids:
+            entry = self.chunks.pop(chunk_id, None)
+            if entry is None:
+                continue
+            self.total_length -= self._lengths.pop(chunk_id)
+            for term in entry[1]:
+                posting = self.postings[term]
+                posting.pop(chunk_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        if not self.chunks:
+            return []
+        n = len(self.chunks)
+        avg_length = self.total_length / n or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for chunk_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def to_dict(self) -> Dict:
+        return {"version": 1, "chunks": {cid: {"doc_id": doc_id, "terms": terms} for cid, (doc_id, terms) in self.chunks.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BM25Index":
+        index = cls()
+        for chunk_id, entry in data.get("chunks", {}).items():
+            index._insert(chunk_id, entry.get("doc_id"), entry["terms"])
+        return index
+
+
+class KeywordIndexStore:
+    """
+    One BM25 index per Chroma collection, kept in step by DocumentService and queried
+    next to the vector search for hybrid retrieval.
+
+    Indexes are persisted under `directory` as a JSON snapshot plus an append-only log:
+    adding or removing chunks appends one line with just those chunks' term counts, and
+    the snapshot is only rewritten once the log has grown larger than it, so a write costs
+    the size of the change rather than of the corpus. Every worker replays log lines it
+    has not seen yet before using an index; appends and compactions hold an flock on the
+    collection's lock file, so workers never write the log or snapshot at once. Indexes load lazily on first use; a collection
+    with no index file yet (e.g. data ingested before hybrid search existed) is indexed
+    from the chunks already stored in Chroma.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._indexes: Dict[str, BM25Index] = {}
+        self._mtimes: Dict[str, Optional[int]] = {}
+        # (inode, bytes replayed) of each collection's log
+        self._log_positions: Dict[str, Tuple[Optional[int], int]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        # Collections whose file lock this process holds, so nested callers do not re-take it
+        self._file_locked: set = set()
+
+    def _path(self, collection_name: str) -> str:
+        return os.path.join(self.directory, f"{collection_name}.json")
+
+    def _log_path(self, collection_name: str) -> str:
+        return os.path.join(self.directory, f"{collection_name}.log")
+
+    def _lock_for(self, collection_name: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(collection_name, threading.Lock())
+
+    @contextmanager
+    def _file_lock(self, collection_name: str):
+        """Cross-process lock on a collection's files (call with the collection lock held)"""
+        if collection_name in self._file_locked:
+            yield
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{collection_name}.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            self._file_locked.add(collection_name)
+            try:
+                yield
+            finally:
+                self._file_locked.discard(collection_name)
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _mtime(self, collection_name: str) -> Optional[int]:
+        try:
+            return os.stat(self._path(collection_name)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _get(self, collection_name: str) -> BM25Index:
+        """Return the loaded, up to date index (call with the collection lock held)"""
+        index = self._indexes.get(collection_name)
+        # Another worker process may have compacted the index since it was loaded
+        if index is None or self._mtime(collection_name) != self._mtimes.get(collection_name):
+            self._log_positions.pop(collection_name, None)
+            try:
+                index = self._load(collection_name)
+            except FileNotFoundError:
+                with self._file_lock(collection_name):
+                    # Another worker may have indexed the collection while this one waited
+                    try:
+                        index = self._load(collection_name)
+                    except FileNotFoundError:
+                        index = self._build_from_collection(collection_name)
+                        self._compact(collection_name, index)
+            self._indexes[collection_name] = index
+        self._replay(collection_name, index)
+        return index
+
+    def _load(self, collection_name: str) -> BM25Index:
+        with open(self._path(collection_name), "r", encoding="utf-8") as f:
+            index = BM25Index.from_dict(json.load(f))
+        self._mtimes[collection_name] = self._mtime(collection_name)
+        return index
+
+    def _replay(self, collection_name: str, index: BM25Index):
+        """Apply the log lines appended (by any worker) since this process last read the log"""
+        try:
+            with open(self._log_path(collection_name), "rb") as f:
+                inode = os.fstat(f.fileno()).st_ino
+                known_inode, offset = self._log_positions.get(collection_name, (None, 0))
+                # A new log file means the index was compacted; replaying it from the start is
+                # safe because every line sets the final state of the chunks it names
+                if inode != known_inode:
+                    offset = 0
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # still being written
+                    change = json.loads(line)
+                    index.remove(change.get("remove", []))
+                    for chunk_id, entry in change.get("add", {}).items():
+                        index.put(chunk_id, entry.get("doc_id"), entry["terms"])
+                    offset += len(line)
+        except FileNotFoundError:
+            inode, offset = None, 0
+        self._log_positions[collection_name] = (inode, offset)
+
+    def _build_from_collection(self, collection_name: str) -> BM25Index:
+        index = BM25Index()
+        stored = with_chroma_collection(
+            collection_name, lambda collection: collection.get(include=["documents", "metadatas"])
+        )
+        metadatas = stored.get("metadatas") or [None] * len(stored["ids"])
+        for chunk_id, text, meta in zip(stored["ids"], stored["documents"], metadatas):
+            index.add(chunk_id, text or "", (meta or {}).get("doc_id"))
+        return index
+
+    def _compact(self, collection_name: str, index: BM25Index):
+        """Write the whole index as the snapshot and start an empty log"""
+        path, log_path = self._path(collection_name), self._log_path(collection_name)
+        with self._file_lock(collection_name):
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(index.to_dict(), f)
+            os.replace(f"{path}.tmp", path)
+            open(f"{log_path}.tmp", "wb").close()
+            os.replace(f"{log_path}.tmp", log_path)
+            self._mtimes[collection_name] = self._mtime(collection_name)
+            self._log_positions[collection_name] = (os.stat(log_path).st_ino, 0)
+
+    def _append(self, collection_name: str, change: Dict):
+        """Log one change and apply it (call with the collection lock held)"""
+        # Held from the catch-up read to the compaction: a line another worker appended in
+        # between would otherwise be dropped by the snapshot rewrite
+        with self._file_lock(collection_name):
+            index = self._get(collection_name)
+            with open(self._log_path(collection_name), "ab") as f:
+                f.write((json.dumps(change) + "\n").encode("utf-8"))
+                log_size = f.tell()
+            # Replaying (rather than applying directly) keeps lines other workers appended in order
+            self._replay(collection_name, index)
+            if log_size > os.path.getsize(self._path(collection_name)):
+                self._compact(collection_name, index)
+
+    def add_chunks(self, collection_name: str, ids: List[str], documents: List[str], doc_id: Optional[str] = None):
+        added = {
+            chunk_id: {"doc_id": doc_id, "terms": dict(Counter(tokenize(text)))}
+            for chunk_id, text in zip(ids, documents)
+        }
+        with self._lock_for(collection_name):
+            self._append(collection_name, {"add": added})
+
+    def remove_chunks(self, collection_name: str, ids: List[str]):
+        with self._lock_for(collection_name):
+            self._append(collection_name, {"remove": list(ids)})
+
+    def search(self, collection_name: str, query: str, limit: int) -> List[Tuple[str, float]]:
+        """Top chunk ids and BM25 scores for a query (blocking; run it via run_blocking)"""
+        with self._lock_for(collection_name):
+            return self._get(collection_name).search(query, limit)
+
+    def drop_collection(self, collection_name: str):
+        """Forget the index of a deleted or recreated collection"""
+        with self._lock_for(collection_name):
+            self._indexes.pop(collection_name, None)
+            self._mtimes.pop(collection_name, None)
+            self._log_positions.pop(collection_name, None)
+            for path in (self._path(collection_name), self._log_path(collection_name)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def get_stats(self) -> Dict:
+        return {
+            name: {"chunks": len(index.chunks), "terms": len(index.postings)}
+            for name, index in list(self._indexes.items())
+        }
+
+
+# Global instance
+keyword_index = KeywordIndexStore(os.path.join(settings.CHROMA_DB_PATH, "keyword_index"))
@@ -0,0 +1,340 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+import groq
+import httpx
+from ..core.config import settings
+from .llm_providers import LLMProvider, create_llm_provider
+
+
+T = TypeVar("T")
+
+# Besides every 5xx: request timeout, conflict and rate limiting are worth another try
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class LLMUnavailableError(Exception):
+    """The provider could not answer: retries ran out, or the circuit is open"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient provider failures; anything else (bad request, auth) fails the same way again"""
+    if isinstance(error, (asyncio.TimeoutError, groq.APIConnectionError, httpx.TransportError)):
+        return True
+    # groq.APIStatusError and ProviderError both carry the HTTP status
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        return False
+    return status_code in RETRYABLE_STATUS or status_code >= 500
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait (Retry-After header), if it said"""
+    if getattr(error, "retry_after", None) is not None:
+        return max(0.0, error.retry_after)
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return max(0.0, float(response.headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+def failure_reason(error: BaseException) -> str:
+    """Short description of why an LLM call failed: circuit_open, timeout, the HTTP status, or the error type"""
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    # LLMUnavailableError wraps the provider's last error
+    while isinstance(error, LLMUnavailableError) and error.__cause__ is not None:
+        error = error.__cause__
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return str(status_code)
+    return type(error).__name__
+
+
+class LatencyWindow:
+    """The most recent successful call latencies, for percentiles"""
+
+    def __init__(self, size: int = 200):
+        self.samples: deque = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. After `failure_threshold` consecutive failed calls it opens
+    and rejects calls for `cooldown` seconds. Then it is half-open: one trial call is let
+    through, and its outcome closes the circuit again or re-opens it for another cooldown.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opens = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self.clock() - self._opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open" or self._trial:
+            return False
+        self._trial = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial or self.failures >= self.failure_threshold:
+            self._opened_at = self.clock()
+            self._trial = False
+            self.opens += 1
+
+    def release(self):
+        """A call ended without telling anything about the provider (cancelled, bad request)"""
+        self._trial = False
+
+
+@dataclass
+class GatewayStats:
+    calls: int = 0
+    retries: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0        # hedged calls answered first by the duplicate
+    failures: int = 0          # calls that failed after their retries
+    rejected: int = 0          # calls refused while the circuit was open
+    degraded: int = 0          # answers served without the LLM because of a failure
+
+
+class LLMGateway:
+    """
+    Every LLM call goes through here, to the configured provider.
+
+    Each attempt is bounded by `timeout` (a stream: the wait for each token). Timeouts,
+    connection errors, 429 and 5xx are retried up to `max_retries` times with full-jitter
+    exponential backoff, honouring Retry-After. With hedging on, an attempt still running
+    after the observed p95 latency gets a duplicate, and whichever answers first wins; a
+    stream is hedged on its first token. Consecutive failed calls open the circuit
+    breaker, which then rejects calls with CircuitOpenError at once, so callers can serve
+    a degraded answer instead of waiting on a provider that is down.
+    """
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        *,
+        timeout: float,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        hedge: bool,
+        hedge_min_samples: int,
+        breaker: CircuitBreaker,
+    ):
+        self.provider = provider
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker
+        self.stats = GatewayStats()
+        self.latency = {"complete": LatencyWindow(), "stream": LatencyWindow()}
+
+    async def complete(self, messages: List[Dict[str, str]], **params) -> str:
+        """Text of a non-streaming chat completion"""
+        async def attempt() -> str:
+            return await asyncio.wait_for(self.provider.complete(messages, **params), self.timeout)
+
+        return await self._call(attempt, self.latency["complete"])
+
+    async def stream(self, messages: List[Dict[str, str]], **params) -> AsyncIterator[str]:
+        """Tokens of a streaming chat completion; only the wait for the first token is retried or hedged"""
+        async def attempt() -> Tuple[Optional[str], AsyncIterator[str]]:
+            tokens = self.provider.stream(messages, **params)
+            try:
+                return await asyncio.wait_for(self._next(tokens), self.timeout), tokens
+            except BaseException:
+                await tokens.aclose()
+                raise
+
+        async def discard(result: Tuple[Optional[str], AsyncIterator[str]]):
+            await result[1].aclose()
+
+        first, tokens = await self._call(attempt, self.latency["stream"], discard)
+        async with aclosing(tokens):
+            if first is None:
+                return
+            yield first
+            while True:
+                token = await asyncio.wait_for(self._next(tokens), self.timeout)
+                if token is None:
+                    return
+                yield token
+
+    @staticmethod
+    async def _next(tokens: AsyncIterator[str]) -> Optional[str]:
+        """Next token, or None at the end of the stream"""
+        try:
+            return await tokens.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    async def _call(
+        self,
+        attempt: Callable[[], Awaitable[T]],
+        latency: LatencyWindow,
+        discard: Optional[Callable[[T], Awaitable[None]]] = None,
+    ) -> T:
+        if not self.breaker.allow():
+            self.stats.rejected += 1
+            raise CircuitOpenError("The LLM provider is unavailable (circuit open)")
+
+        self.stats.calls += 1
+        try:
+            result = await self._with_retries(lambda: self._hedged(attempt, latency, discard))
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if not is_retryable(e):
+                self.breaker.release()
+                raise
+            self.stats.failures += 1
+            self.breaker.record_failure()
+            raise LLMUnavailableError(f"The LLM provider failed: {e!r}") from e
+        self.breaker.record_success()
+        return result
+
+    def backoff(self, retry: int, error: BaseException) -> Optional[float]:
+        """Seconds to wait before retry number `retry` (from 0), or None to give up"""
+        requested = retry_after(error)
+        if requested is not None:
+            return requested if requested <= self.backoff_max else None
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** retry))
+
+    async def _with_retries(self, call: Callable[[], Awaitable[T]]) -> T:
+        retry = 0
+        while True:
+            try:
+                return await call()
+            except Exception as e:
+                delay = self.backoff(retry, e) if retry < self.max_retries and is_retryable(e) else None
+                if delay is None:
+                    raise
+                logging.warning("LLM call failed (%r), retrying in %.2fs", e, delay)
+                self.stats.retries += 1
+                retry += 1
+                await asyncio.sleep(delay)
+
+    async def _hedged(
+        self,
+        attempt: Callable[[], Awaitable[T]],
+        latency: LatencyWindow,
+        discard: Optional[Callable[[T], Awaitable[None]]],
+    ) -> T:
+        async def timed() -> T:
+            started = time.perf_counter()
+            result = await attempt()
+            latency.add(time.perf_counter() - started)
+            return result
+
+        delay = latency.percentile(0.95) if self.hedge and len(latency) >= self.hedge_min_samples else None
+        if delay is None:
+            return await timed()
+
+        first = asyncio.ensure_future(timed())
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.stats.hedged += 1
+                tasks.append(asyncio.ensure_future(timed()))
+            error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in tasks:
+                    if task in done and task.exception() is None:
+                        if task is not first:
+                            self.stats.hedge_wins += 1
+                        tasks.remove(task)
+                        return task.result()
+                    if task in done:
+                        error = task.exception()
+            raise error
+        finally:
+            # The losing attempt is cancelled, or its result discarded if it finished too
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif discard is not None and not task.cancelled() and task.exception() is None:
+                    await discard(task.result())
+
+    def get_stats(self) -> Dict[str, Any]:
+        def p95_ms(window: LatencyWindow) -> Optional[float]:
+            p95 = window.percentile(0.95)
+            return round(p95 * 1000, 1) if p95 is not None else None
+
+        return {
+            "provider": self.provider.name,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "circuit_opens": self.breaker.opens,
+            "hedge_enabled": self.hedge,
+            "p95_ms": {kind: p95_ms(window) for kind, window in self.latency.items()},
+            **vars(self.stats),
+        }
+
+
+# Global instance, shared by every LLM call in this process
+llm_gateway = LLMGateway(
+    create_llm_provider(),
+    timeout=settings.LLM_TIMEOUT,
+    max_retries=settings.LLM_MAX_RETRIES,
+    backoff_base=settings.LLM_BACKOFF_BASE,
+    backoff_max=settings.LLM_BACKOFF_MAX,
+    hedge=settings.LLM_HEDGE_ENABLED,
+    hedge_min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+    breaker=CircuitBreaker(settings.LLM_BREAKER_THRESHOLD, settings.LLM_BREAKER_COOLDOWN),
+)
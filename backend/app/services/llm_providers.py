@@ -0,0 +1,249 @@
+import asyncio
+import json
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from groq import AsyncGroq
+from ..core.config import settings
+
+
+class ProviderError(Exception):
+    """A provider answered with an HTTP error (or, for the stub, pretended to)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """The explicit connection pool every HTTP provider sends its requests through"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+    )
+
+
+def create_groq_client() -> AsyncGroq:
+    """Groq client on the shared connection pool; retries are the gateway's job, not the SDK's"""
+    return AsyncGroq(
+        api_key=settings.GROQ_API_KEY,
+        base_url=settings.GROQ_BASE_URL,
+        http_client=create_http_client(),
+        max_retries=0,
+    )
+
+
+class LLMProvider(ABC):
+    """A chat completion backend; timeouts, retries and the circuit breaker live in LLMGateway"""
+
+    name: str
+
+    @abstractmethod
+    async def complete(self, messages: List[Dict[str, str]], **params) -> str:
+        """Text of a non-streaming chat completion"""
+
+    @abstractmethod
+    def stream(self, messages: List[Dict[str, str]], **params) -> AsyncIterator[str]:
+        """Answer tokens as they are generated"""
+
+    async def aclose(self):
+        """Release connections"""
+
+
+class GroqProvider(LLMProvider):
+    name = "groq"
+
+    def __init__(self, client: AsyncGroq):
+        self.client = client
+
+    async def complete(self, messages: List[Dict[str, str]], **params) -> str:
+        response = await self.client.chat.completions.create(messages=messages, **params, stream=False)
+        return response.choices[0].message.content
+
+    async def stream(self, messages: List[Dict[str, str]], **params) -> AsyncIterator[str]:
+        stream = await self.client.chat.completions.create(messages=messages, **params, stream=True)
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    yield token
+        finally:
+            # Hand the connection back to the pool when the consumer stops early
+            close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+            if close is not None:
+                await close()
+
+    async def aclose(self):
+        await self.client.close()
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Any server speaking the OpenAI /chat/completions API (vLLM, llama.cpp, Ollama, the stub server, ...)"""
+
+    name = "openai"
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, client: Optional[httpx.AsyncClient] = None):
+        self.url = f"{base_url.rstrip('/')}/chat/completions"
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.client = client or create_http_client()
+
+    @staticmethod
+    def _check(response: httpx.Response):
+        if response.is_success:
+            return
+        try:
+            retry_after = float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+        raise ProviderError(
+            f"Error code: {response.status_code} - {response.text[:500]}",
+            status_code=response.status_code,
+            retry_after=retry_after,
+        )
+
+    async def complete(self, messages: List[Dict[str, str]], **params) -> str:
+        response = await self.client.post(
+            self.url, json={"messages": messages, **params, "stream": False}, headers=self.headers
+        )
+        self._check(response)
+        return response.json()["choices"][0]["message"]["content"]
+
+    async def stream(self, messages: List[Dict[str, str]], **params) -> AsyncIterator[str]:
+        async with self.client.stream(
+            "POST", self.url, json={"messages": messages, **params, "stream": True}, headers=self.headers
+        ) as response:
+            if not response.is_success:
+                await response.aread()
+                self._check(response)
+            # Server-sent events: one "data: {chunk}" line per delta, then "data: [DONE]"
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    return
+                choices = json.loads(data).get("choices") or []
+                token = (choices[0].get("delta") or {}).get("content") if choices else None
+                if token:
+                    yield token
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class StubProvider(LLMProvider):
+    """
+    Deterministic offline stand-in for load tests and benchmarks. The answer is the last
+    message's words, cycled to `answer_tokens` tokens (capped by max_tokens); the first
+    token arrives after `ttft` seconds and the rest at `tokens_per_second`. A seeded share
+    `error_rate` of calls fails with a 503 after the time to first token.
+    """
+
+    name = "stub"
+
+    def __init__(self, ttft: float, tokens_per_second: float, error_rate: float = 0.0, answer_tokens: int = 60, seed: int = 0):
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.answer_tokens = answer_tokens
+        self._random = random.Random(seed)
+
+    def answer(self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None) -> List[str]:
+        words = (messages[-1]["content"] if messages else "").split() or ["stub"]
+        count = min(self.answer_tokens, max_tokens or self.answer_tokens)
+        return [(" " if position else "") + words[position % len(words)] for position in range(count)]
+
+    async def _start(self):
+        await asyncio.sleep(self.ttft)
+        if self._random.random() < self.error_rate:
+            raise ProviderError("Error code: 503 - stub provider failure", status_code=503)
+
+    async def complete(self, messages: List[Dict[str, str]], **params) -> str:
+        tokens = self.answer(messages, params.get("max_tokens"))
+        await self._start()
+        await asyncio.sleep(max(0, len(tokens) - 1) / self.tokens_per_second)
+        return "".join(tokens)
+
+    async def stream(self, messages: List[Dict[str, str]], **params) -> AsyncIterator[str]:
+        tokens = self.answer(messages, params.get("max_tokens"))
+        await self._start()
+        for position, token in enumerate(tokens):
+            if position:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            yield token
+
+
+def create_stub_app(provider: StubProvider) -> FastAPI:
+    """OpenAI-compatible server backed by a stub provider, to load test over real HTTP"""
+    app = FastAPI(title="LLM stub")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        params = {"max_tokens": body.get("max_tokens")}
+        base = {"id": "stub", "created": int(time.time()), "model": body.get("model", "stub")}
+
+        if not body.get("stream"):
+            try:
+                content = await provider.complete(messages, **params)
+            except ProviderError as e:
+                return JSONResponse({"error": {"message": str(e)}}, status_code=e.status_code)
+            return {
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            }
+
+        tokens = provider.stream(messages, **params)
+        try:
+            first = await tokens.__anext__()
+        except ProviderError as e:
+            return JSONResponse({"error": {"message": str(e)}}, status_code=e.status_code)
+
+        async def events() -> AsyncIterator[str]:
+            async for token in _prepend(first, tokens):
+                chunk = {
+                    **base,
+                    "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+async def _prepend(first: str, rest: AsyncIterator[str]) -> AsyncIterator[str]:
+    yield first
+    async for token in rest:
+        yield token
+
+
+def create_llm_provider() -> LLMProvider:
+    if settings.LLM_PROVIDER == "groq":
+        return GroqProvider(create_groq_client())
+    if settings.LLM_PROVIDER == "openai":
+        return OpenAICompatibleProvider(settings.OPENAI_BASE_URL, settings.OPENAI_API_KEY)
+    if settings.LLM_PROVIDER == "stub":
+        return StubProvider(
+            ttft=settings.LLM_STUB_TTFT_MS / 1000,
+            tokens_per_second=settings.LLM_STUB_TOKENS_PER_SECOND,
+            error_rate=settings.LLM_STUB_ERROR_RATE,
+            answer_tokens=settings.LLM_STUB_ANSWER_TOKENS,
+            seed=settings.LLM_STUB_SEED,
+        )
+    raise ValueError(f"Unknown LLM_PROVIDER '{settings.LLM_PROVIDER}' (expected 'groq', 'openai' or 'stub')")
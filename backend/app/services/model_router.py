@@ -0,0 +1,249 @@
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Dict, List, Optional
+from ..core.config import settings
+from ..utils.tokens import count_tokens
+from .conversation_memory import Memory
+from .llm_gateway import LatencyWindow
+
+
+FEATURES = ("length", "retrieval", "depth", "intent")
+
+
+@dataclass
+class RoutingPolicy:
+    """
+    How a query's complexity is scored. Each feature is scaled to 0..1 (1 = hard) and the
+    score is their weighted mean; queries scoring at least `threshold` go to the large model.
+    """
+    threshold: float = 0.5
+    small_model: Optional[str] = None          # None: ROUTER_SMALL_MODEL
+    large_model: Optional[str] = None          # None: GROQ_MODEL
+    weights: Dict[str, float] = field(default_factory=lambda: {
+        "length": 0.3, "retrieval": 0.4, "depth": 0.2, "intent": 0.1,
+    })
+    short_query_tokens: int = 8                # length: 0 at or below this ...
+    long_query_tokens: int = 40                # ... 1 at or above this
+    confident_distance: float = 0.6            # retrieval: best chunk this close scores 0 ...
+    unsure_distance: float = 1.3               # ... this far scores 1
+    deep_conversation_turns: int = 6           # depth: earlier exchanges in the session for a score of 1
+    # intent: complexity of pass-through intent labels; labels not listed do not count
+    intent_scores: Dict[str, float] = field(default_factory=dict)
+
+    def validate(self):
+        if not 0 <= self.threshold <= 1:
+            raise ValueError("threshold must be between 0 and 1")
+        unknown = set(self.weights) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown features {sorted(unknown)} (expected {', '.join(FEATURES)})")
+        if any(weight < 0 for weight in self.weights.values()) or not any(self.weights.values()):
+            raise ValueError("Weights must be non-negative and not all zero")
+        if self.long_query_tokens <= self.short_query_tokens:
+            raise ValueError("long_query_tokens must be above short_query_tokens")
+        if self.unsure_distance <= self.confident_distance:
+            raise ValueError("unsure_distance must be above confident_distance")
+        if self.deep_conversation_turns < 1:
+            raise ValueError("deep_conversation_turns must be at least 1")
+        if any(not 0 <= score <= 1 for score in self.intent_scores.values()):
+            raise ValueError("Intent scores must be between 0 and 1")
+
+
+@dataclass
+class RouteDecision:
+    route: str                 # "small" / "large", or "client" (model chosen by the request) / "default" (router off)
+    model: str
+    score: Optional[float] = None
+    features: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class RouteStats:
+    requests: int = 0
+    degraded: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: LatencyWindow = field(default_factory=LatencyWindow)
+
+    def to_dict(self) -> Dict[str, Any]:
+        def ms(q: float) -> Optional[float]:
+            value = self.latency.percentile(q)
+            return round(value * 1000, 1) if value is not None else None
+
+        answered = self.requests - self.degraded
+        return {
+            "requests": self.requests,
+            "degraded": self.degraded,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "avg_completion_tokens": round(self.completion_tokens / answered, 1) if answered else None,
+            "p50_ms": ms(0.5),
+            "p95_ms": ms(0.95),
+        }
+
+
+def _ramp(value: float, low: float, high: float) -> float:
+    """0 at or below `low`, 1 at or above `high`, linear in between"""
+    return min(1.0, max(0.0, (value - low) / (high - low)))
+
+
+def score_features(
+    policy: RoutingPolicy,
+    query_tokens: int,
+    best_distance: Optional[float],
+    depth: int,
+    intent_label: Optional[str],
+) -> Dict[str, float]:
+    """Complexity features of one query; a feature that cannot be measured is left out"""
+    features = {
+        "length": _ramp(query_tokens, policy.short_query_tokens, policy.long_query_tokens),
+        "depth": _ramp(depth, 0, policy.deep_conversation_turns),
+    }
+    if best_distance is not None:
+        features["retrieval"] = _ramp(best_distance, policy.confident_distance, policy.unsure_distance)
+    if intent_label in policy.intent_scores:
+        features["intent"] = policy.intent_scores[intent_label]
+    return features
+
+
+def complexity_score(policy: RoutingPolicy, features: Dict[str, float]) -> float:
+    total = sum(policy.weights.get(name, 0.0) for name in features)
+    if not total:
+        return 0.0
+    return sum(policy.weights.get(name, 0.0) * value for name, value in features.items()) / total
+
+
+class ModelRouter:
+    """
+    Sends easy queries to a small, fast model and hard ones to the large model.
+
+    A query's complexity is scored from its length, how confidently retrieval matched it,
+    how deep into the conversation it comes, and its pass-through intent label. The
+    policy (weights, scales, threshold, models) is persisted as JSON next to the Chroma
+    data, editable through the admin API and reloaded by every worker when it changes.
+    Latency and token counts are kept per route so the split can be tuned.
+    """
+
+    def __init__(self, path: str, small_model: str):
+        self.path = path
+        self.small_model = small_model
+        self._policy: Optional[RoutingPolicy] = None
+        self._mtime: Optional[int] = None
+        self._stats: Dict[str, RouteStats] = {}
+        self._lock = threading.Lock()
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self) -> RoutingPolicy:
+        # Reload when another worker process has saved a new policy
+        mtime = self._file_mtime()
+        if self._policy is None or mtime != self._mtime:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    policy = RoutingPolicy(**json.load(f))
+                policy.validate()
+                self._policy = policy
+            except FileNotFoundError:
+                self._policy = RoutingPolicy()
+            except (ValueError, TypeError, AttributeError) as e:
+                # A hand-edited or truncated file must not fail every request; kept until the file changes
+                logging.warning("Ignoring invalid routing policy in %s (%s), using the default policy", self.path, e)
+                self._policy = RoutingPolicy()
+            self._mtime = mtime
+        return self._policy
+
+    def get_policy(self) -> RoutingPolicy:
+        with self._lock:
+            return self._load()
+
+    def set_policy(self, changes: Dict[str, Any]) -> RoutingPolicy:
+        """Apply changes to the current policy and save it; ValueError if the result is invalid"""
+        known = {f.name for f in fields(RoutingPolicy)}
+        unknown = set(changes) - known
+        if unknown:
+            raise ValueError(f"Unknown policy fields {sorted(unknown)}")
+        with self._lock:
+            policy = RoutingPolicy(**{**asdict(self._load()), **changes})
+            policy.validate()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(asdict(policy), f, indent=2)
+            os.replace(tmp_path, self.path)
+            self._policy = policy
+            self._mtime = self._file_mtime()
+            return policy
+
+    def reset(self):
+        """Go back to the default policy"""
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self._policy = None
+
+    def route(
+        self,
+        query: str,
+        sources: List[Dict[str, Any]],
+        memory: Optional[Memory],
+        intent_label: Optional[str],
+        requested_model: Optional[str] = None,
+    ) -> RouteDecision:
+        if requested_model:
+            return RouteDecision(route="client", model=requested_model)
+        if not settings.ROUTER_ENABLED:
+            return RouteDecision(route="default", model=settings.GROQ_MODEL)
+
+        policy = self.get_policy()
+        distances = [source["distance"] for source in sources if source.get("distance") is not None]
+        features = score_features(
+            policy,
+            query_tokens=count_tokens(query),
+            best_distance=min(distances) if distances else None,
+            depth=memory.depth if memory else 0,
+            intent_label=intent_label,
+        )
+        score = complexity_score(policy, features)
+        if score >= policy.threshold:
+            return RouteDecision("large", policy.large_model or settings.GROQ_MODEL, round(score, 4), features)
+        return RouteDecision("small", policy.small_model or self.small_model, round(score, 4), features)
+
+    def record(self, decision: RouteDecision, seconds: float, prompt_tokens: int, completion_tokens: int, degraded: bool = False):
+        """Account one generated answer to its route"""
+        with self._lock:
+            stats = self._stats.setdefault(decision.route, RouteStats())
+            stats.requests += 1
+            stats.prompt_tokens += prompt_tokens
+            if degraded:
+                stats.degraded += 1
+                return
+            stats.completion_tokens += completion_tokens
+            stats.latency.add(seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        policy = self.get_policy()
+        with self._lock:
+            routes = {route: stats.to_dict() for route, stats in self._stats.items()}
+        return {
+            "enabled": settings.ROUTER_ENABLED,
+            "models": {
+                "small": policy.small_model or self.small_model,
+                "large": policy.large_model or settings.GROQ_MODEL,
+            },
+            "routes": routes,
+        }
+
+
+# Global instance
+model_router = ModelRouter(
+    path=os.path.join(settings.CHROMA_DB_PATH, "routing.json"),
+    small_model=settings.ROUTER_SMALL_MODEL,
+)
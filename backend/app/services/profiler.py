@@ -0,0 +1,251 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import traceback
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+from ..core.config import settings
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to the sys.path entry it was imported from"""
+    best = ""
+    for entry in sys.path:
+        if entry and filename.startswith(entry) and len(entry) > len(best):
+            best = entry
+    return filename[len(best):].lstrip(os.sep) if best else filename
+
+
+def _frame_label(frame) -> str:
+    return f"{frame.f_code.co_name} ({_short_path(frame.f_code.co_filename)}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    """
+    Profiles the next N chat requests by sampling every thread's stack.
+
+    While at least one of those requests is in flight, a background thread records the
+    stack of every other thread each `interval` seconds. Chat requests share the event
+    loop, so samples also include whatever else the worker was doing at the time. The
+    result is in the collapsed-stack format ("thread;outer;...;inner count") that
+    flamegraph.pl, speedscope and inferno read. A session stops on its own after
+    `max_seconds`, whether or not N requests came in.
+    """
+
+    def __init__(self, max_seconds: float):
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._session: Optional[Dict[str, Any]] = None
+        self._stacks: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._session is not None and self._session["state"] == "running"
+
+    def start(self, requests: int, interval: float):
+        """Profile the next `requests` chat requests; ValueError if a session is already running"""
+        with self._lock:
+            if self.running:
+                raise ValueError("A profiling session is already running")
+            self._stacks = Counter()
+            self._session = {
+                "state": "running",
+                "requests": requests,
+                "started": 0,
+                "finished": 0,
+                "active": 0,
+                "samples": 0,
+                "interval_ms": interval * 1000,
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "stopped_at": None,
+            }
+            self._thread = threading.Thread(target=self._sample, args=(interval,), name="profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self, state: str = "cancelled"):
+        with self._lock:
+            self._finish(self._session, state)
+
+    @staticmethod
+    def _finish(session: Optional[Dict[str, Any]], state: str):
+        if session is not None and session["state"] == "running":
+            session["state"] = state
+            session["stopped_at"] = datetime.now(timezone.utc).isoformat()
+
+    @contextmanager
+    def request(self) -> Iterator[None]:
+        """Wrap a chat request; counted in the session if it is one of the next N"""
+        with self._lock:
+            profiled = self.running and self._session["started"] < self._session["requests"]
+            if profiled:
+                session = self._session
+                session["started"] += 1
+                session["active"] += 1
+        try:
+            yield
+        finally:
+            if profiled:
+                with self._lock:
+                    session["active"] -= 1
+                    session["finished"] += 1
+                    if session["finished"] >= session["requests"]:
+                        self._finish(session, "done")
+
+    def _sample(self, interval: float):
+        session = self._session
+        deadline = time.monotonic() + self.max_seconds
+        own_id = threading.get_ident()
+        while session["state"] == "running":
+            if time.monotonic() > deadline:
+                with self._lock:
+                    self._finish(session, "timed_out")
+                break
+            if session["active"]:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(f"thread {names.get(thread_id, thread_id)}")
+                    self._stacks[";".join(reversed(stack))] += 1
+                session["samples"] += 1
+            time.sleep(interval)
+
+    def collapsed(self) -> str:
+        """Sampled stacks so far, in the collapsed-stack format, most frequent first"""
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def get_status(self) -> Dict[str, Any]:
+        if self._session is None:
+            return {"state": "idle"}
+        return {**self._session, "distinct_stacks": len(self._stacks)}
+
+
+class MemoryProfiler:
+    """
+    tracemalloc snapshots of this worker, kept in memory so they can be compared.
+
+    Tracing starts with the first snapshot (which is the baseline) and slows allocations
+    down, so stop it when done. Only the newest `max_snapshots` are kept.
+    """
+
+    def __init__(self, frames: int, max_snapshots: int):
+        self.frames = frames
+        self.max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _describe(snapshot_id: int, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {"id": snapshot_id, **{k: v for k, v in entry.items() if k != "snapshot"}}
+
+    def take_snapshot(self) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = {
+                "snapshot": snapshot,
+                "taken_at": datetime.now(timezone.utc).isoformat(),
+                "traced_bytes": current,
+                "peak_bytes": peak,
+            }
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+            return self._describe(snapshot_id, self._snapshots[snapshot_id])
+
+    def _get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        try:
+            return self._snapshots[snapshot_id]["snapshot"]
+        except KeyError:
+            raise KeyError(f"No snapshot {snapshot_id}") from None
+
+    def diff(
+        self,
+        to_id: int,
+        from_id: Optional[int] = None,
+        group_by: str = "lineno",
+        limit: int = 25,
+    ) -> List[Dict[str, Any]]:
+        """Largest allocation growth from one snapshot to another, or the largest allocations in one"""
+        if group_by not in ("lineno", "filename", "traceback"):
+            raise ValueError("group_by must be lineno, filename or traceback")
+        snapshot = self._get(to_id)
+        if from_id is None:
+            stats = snapshot.statistics(group_by)
+        else:
+            stats = snapshot.compare_to(self._get(from_id), group_by)
+
+        entries = []
+        for stat in stats[:limit]:
+            entry = {
+                "location": str(stat.traceback[0]) if group_by != "traceback" else stat.traceback.format(most_recent_first=True),
+                "size": stat.size,
+                "count": stat.count,
+            }
+            if from_id is not None:
+                entry["size_diff"] = stat.size_diff
+                entry["count_diff"] = stat.count_diff
+            entries.append(entry)
+        return entries
+
+    def stop(self):
+        """Stop tracing and drop the snapshots"""
+        with self._lock:
+            self._snapshots.clear()
+        tracemalloc.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        with self._lock:
+            snapshots = [self._describe(snapshot_id, entry) for snapshot_id, entry in self._snapshots.items()]
+        return {"tracing": tracing, "traced_bytes": current, "peak_bytes": peak, "snapshots": snapshots}
+
+
+def thread_stacks() -> List[Dict[str, Any]]:
+    """Current stack of every thread in this worker, innermost frame last"""
+    frames = sys._current_frames()
+    return [
+        {
+            "name": thread.name,
+            "ident": thread.ident,
+            "daemon": thread.daemon,
+            "stack": [line.rstrip() for line in traceback.format_stack(frames[thread.ident])] if thread.ident in frames else [],
+        }
+        for thread in threading.enumerate()
+    ]
+
+
+def task_stacks(limit: int = 20) -> List[Dict[str, Any]]:
+    """Where each asyncio task of the running event loop is suspended"""
+    tasks = []
+    for task in asyncio.all_tasks():
+        stack = task.get_stack(limit=limit)
+        tasks.append({
+            "name": task.get_name(),
+            "coroutine": getattr(task.get_coro(), "__qualname__", repr(task.get_coro())),
+            "stack": [_frame_label(frame) for frame in stack],
+        })
+    return tasks
+
+
+# Global instances
+cpu_profiler = SamplingProfiler(max_seconds=settings.PROFILE_MAX_SECONDS)
+memory_profiler = MemoryProfiler(frames=settings.TRACEMALLOC_FRAMES, max_snapshots=settings.TRACEMALLOC_MAX_SNAPSHOTS)
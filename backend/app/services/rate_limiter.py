@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import Dict, Tuple
+from fastapi import HTTPException, Request
+from ..core.config import settings
+from ..core.sqlite import SQLiteDatabase
+
+
+WINDOW_SECONDS = 60
+
+
+class RateLimiter:
+    """Fixed one-minute window of requests per client key, counted in this process"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.rejected = 0
+        self._counts: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, key: str, window: int) -> int:
+        with self._lock:
+            count = self._counts.get((key, window), 0) + 1
+            self._counts[(key, window)] = count
+            # Only the current window matters; older ones are dropped as soon as a new one starts
+            if len(self._counts) > 1:
+                for stale in [k for k in self._counts if k[1] < window]:
+                    del self._counts[stale]
+            return count
+
+    def hit(self, key: str) -> Tuple[bool, int]:
+        """Count one request; returns (allowed, seconds until the window resets)"""
+        now = time.time()
+        window = int(now // WINDOW_SECONDS)
+        retry_after = int((window + 1) * WINDOW_SECONDS - now) + 1
+        if self._count(key, window) > self.limit:
+            self.rejected += 1
+            return False, retry_after
+        return True, retry_after
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """Same fixed window, with counters in a SQLite file shared by all worker processes"""
+
+    def __init__(self, path: str, limit: int):
+        super().__init__(limit)
+        self.db = SQLiteDatabase(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT NOT NULL,
+                window INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (key, window)
+            );
+        """)
+        self._last_window = None
+
+    def _count(self, key: str, window: int) -> int:
+        with self.db.transaction() as conn:
+            if window != self._last_window:
+                conn.execute("DELETE FROM rate_limits WHERE window < ?", (window,))
+                self._last_window = window
+            conn.execute(
+                """
+                INSERT INTO rate_limits (key, window, count) VALUES (?, ?, 1)
+                ON CONFLICT (key, window) DO UPDATE SET count = count + 1
+                """,
+                (key, window),
+            )
+            return conn.execute("SELECT count FROM rate_limits WHERE key = ? AND window = ?", (key, window)).fetchone()[0]
+
+
+def create_rate_limiter() -> RateLimiter:
+    if settings.WORKERS > 1:
+        return SQLiteRateLimiter(settings.SHARED_STATE_DB_PATH, settings.RATE_LIMIT_PER_MINUTE)
+    return RateLimiter(settings.RATE_LIMIT_PER_MINUTE)
+
+
+def client_key(request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def rate_limit(request: Request):
+    """Route dependency: 429 once a client exceeds RATE_LIMIT_PER_MINUTE chat requests"""
+    if rate_limiter.limit <= 0:
+        return
+    allowed, retry_after = rate_limiter.hit(client_key(request))
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, please slow down",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+# Global instance
+rate_limiter = create_rate_limiter()
@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+from ..core.config import settings
+from ..core.database import with_chroma_collection
+from .embedding_cache import query_embedding_cache
+
+
+@dataclass
+class GateStats:
+    checked: int = 0
+    passed: int = 0
+    short_circuited: int = 0
+
+
+def calibrate_threshold(
+    in_scope: Sequence[float],
+    out_of_scope: Sequence[float],
+    target_recall: float,
+) -> Dict[str, Any]:
+    """
+    Pick the distance threshold that rejects the most out-of-scope questions while still
+    letting at least `target_recall` of the in-scope questions through.
+
+    Inputs are the best (smallest) retrieval distance of each evaluation question.
+    Returns the chosen threshold with its recall/rejection rates and the full curve.
+    """
+    if not in_scope:
+        raise ValueError("Calibration needs at least one in-scope question")
+
+    # A question passes when its best distance <= threshold, so every observed distance is a candidate cut
+    candidates = sorted(set(in_scope) | set(out_of_scope))
+    curve = []
+    for threshold in candidates:
+        recall = sum(d <= threshold for d in in_scope) / len(in_scope)
+        rejection = sum(d > threshold for d in out_of_scope) / len(out_of_scope) if out_of_scope else 0.0
+        curve.append({"threshold": threshold, "recall": round(recall, 4), "rejection_rate": round(rejection, 4)})
+
+    eligible = [point for point in curve if point["recall"] >= target_recall]
+    # Highest rejection wins; among ties take the most lenient threshold
+    best = max(eligible, key=lambda point: (point["rejection_rate"], point["threshold"]))
+    return {**best, "target_recall": target_recall, "curve": curve}
+
+
+class RelevanceGate:
+    """
+    Per-collection distance threshold that answers with the fallback response, without
+    calling the LLM, when no retrieved chunk is close enough to the question.
+
+    Thresholds are calibrated from an evaluation set of in-scope and out-of-scope
+    questions and persisted as JSON next to the Chroma data. Collections without a
+    calibrated threshold use RELEVANCE_MAX_DISTANCE, and are not gated when that is unset.
+    """
+
+    def __init__(self, path: str, default_threshold: Optional[float] = None):
+        self.path = path
+        self.default_threshold = default_threshold
+        self._thresholds: Optional[Dict[str, float]] = None
+        self._mtime: Optional[int] = None
+        self._stats: Dict[str, GateStats] = {}
+        self._lock = threading.Lock()
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self) -> Dict[str, float]:
+        # Reload when another worker process has saved new thresholds
+        mtime = self._file_mtime()
+        if self._thresholds is None or mtime != self._mtime:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._thresholds = {name: float(value) for name, value in json.load(f).items()}
+            except FileNotFoundError:
+                self._thresholds = {}
+            self._mtime = mtime
+        return self._thresholds
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._thresholds, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._mtime = self._file_mtime()
+
+    def get_threshold(self, collection_name: str) -> Optional[float]:
+        with self._lock:
+            return self._load().get(collection_name, self.default_threshold)
+
+    def set_threshold(self, collection_name: str, threshold: float):
+        with self._lock:
+            self._load()[collection_name] = float(threshold)
+            self._save()
+
+    def forget(self, collection_name: str):
+        """Drop a collection's calibrated threshold (its contents are gone)"""
+        with self._lock:
+            if self._load().pop(collection_name, None) is not None:
+                self._save()
+
+    def allows(self, collection_name: str, distances: List[Optional[float]], keyword_match: bool = False) -> bool:
+        """
+        True when the closest chunk is within the collection's threshold (or there is none).
+        A keyword match lets the query through too: those chunks have no vector distance.
+        """
+        if not settings.RELEVANCE_GATE_ENABLED:
+            return True
+        threshold = self.get_threshold(collection_name)
+        if threshold is None:
+            return True
+
+        distances = [distance for distance in distances if distance is not None]
+        allowed = keyword_match or (bool(distances) and min(distances) <= threshold)
+        with self._lock:
+            stats = self._stats.setdefault(collection_name, GateStats())
+            stats.checked += 1
+            if allowed:
+                stats.passed += 1
+            else:
+                stats.short_circuited += 1
+        return allowed
+
+    def best_distances(self, collection_name: str, questions: List[str]) -> List[float]:
+        """Smallest retrieval distance for each question (blocking)"""
+        if with_chroma_collection(collection_name, lambda collection: collection.count()) == 0:
+            raise ValueError(f"Collection '{collection_name}' has no documents to calibrate against")
+        embeddings = query_embedding_cache.embed_many(questions)
+        results = with_chroma_collection(collection_name, lambda collection: collection.query(
+            query_embeddings=[embedding.tolist() for embedding in embeddings],
+            n_results=settings.N_RESULTS,
+        ))
+        return [min(distances) if distances else float("inf") for distances in results.get("distances", [])]
+
+    def calibrate(
+        self,
+        collection_name: str,
+        in_scope: List[str],
+        out_of_scope: List[str],
+        target_recall: float,
+        apply: bool = True,
+    ) -> Dict[str, Any]:
+        """Measure the evaluation questions against a collection and choose its threshold"""
+        report = calibrate_threshold(
+            self.best_distances(collection_name, in_scope),
+            self.best_distances(collection_name, out_of_scope) if out_of_scope else [],
+            target_recall,
+        )
+        if apply:
+            self.set_threshold(collection_name, report["threshold"])
+        return {"collection_name": collection_name, "applied": apply, **report}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            thresholds = dict(self._load())
+            collections = {name: vars(stats).copy() for name, stats in self._stats.items()}
+        return {
+            "enabled": settings.RELEVANCE_GATE_ENABLED,
+            "default_threshold": self.default_threshold,
+            "thresholds": thresholds,
+            "llm_calls_avoided": sum(stats["short_circuited"] for stats in collections.values()),
+            "collections": collections,
+        }
+
+
+# Global instance
+relevance_gate = RelevanceGate(
+    path=os.path.join(settings.CHROMA_DB_PATH, "relevance_thresholds.json"),
+    default_threshold=settings.RELEVANCE_MAX_DISTANCE,
+)
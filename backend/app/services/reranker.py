@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from ..core.config import settings
+from ..core.database import get_rerank_model
+from ..utils.text import normalize_query
+
+
+@dataclass
+class RerankStats:
+    calls: int = 0
+    reranked: int = 0
+    timeouts: int = 0
+    busy: int = 0
+    errors: int = 0
+    pairs_scored: int = 0
+    cache_hits: int = 0
+
+
+class Reranker:
+    """
+    Cross-encoder rerank stage over retrieved candidates.
+
+    All uncached (query, chunk) pairs are scored in one batched CPU pass on a dedicated
+    rerank thread, so passes never occupy the shared blocking executor. If scoring does
+    not finish within the latency budget the candidates keep their retrieval order; the
+    pass still completes in the background and its scores land in the pair cache, so a
+    repeat of the query is reranked. While a pass is running, new requests keep their
+    retrieval order instead of queueing behind it. The model loads on first use, so the
+    first requests usually fall back the same way.
+    """
+
+    def __init__(self, load_model: Callable[[], Any], timeout_ms: float, cache_size: int):
+        self._load_model = load_model
+        self.timeout_ms = timeout_ms
+        self.cache_size = cache_size
+        self.stats = RerankStats()
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self._pass: Optional[Future] = None
+
+    def score_pairs(self, query: str, chunk_ids: List[str], documents: List[str]) -> List[float]:
+        """Cross-encoder scores for each chunk against the query (blocking)"""
+        key_query = normalize_query(query) or query
+        keys = [(key_query, chunk_id) for chunk_id in chunk_ids]
+        scores: Dict[Tuple[str, str], float] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._scores:
+                    self._scores.move_to_end(key)
+                    scores[key] = self._scores[key]
+            self.stats.cache_hits += len(scores)
+
+        missing = [i for i, key in enumerate(keys) if key not in scores]
+        if missing:
+            model = self._load_model()
+            predicted = model.predict(
+                [(query, documents[i]) for i in missing],
+                batch_size=len(missing),
+                show_progress_bar=False,
+            )
+            with self._lock:
+                for i, score in zip(missing, predicted):
+                    scores[keys[i]] = self._scores[keys[i]] = float(score)
+                while len(self._scores) > self.cache_size:
+                    self._scores.popitem(last=False)
+                self.stats.pairs_scored += len(missing)
+
+        return [scores[key] for key in keys]
+
+    async def rerank(self, query: str, results: Dict[str, Any], top_n: int) -> Dict[str, Any]:
+        """Reorder Chroma-shaped results by cross-encoder score and keep the top_n"""
+        ids = results.get('ids', [[]])[0]
+        self.stats.calls += 1
+        if len(ids) <= 1:
+            return self._select(results, range(min(len(ids), top_n)))
+
+        if self._pass is not None and not self._pass.done():
+            # Timed-out passes keep running; don't stack more work behind them
+            self.stats.busy += 1
+            return self._select(results, range(min(len(ids), top_n)))
+
+        self._pass = self._executor.submit(self.score_pairs, query, ids, results.get('documents', [[]])[0])
+        task = asyncio.wrap_future(self._pass)
+        # A late or failed pass must not leave an unretrieved exception behind
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        started = time.perf_counter()
+        try:
+            # shield: a timeout stops waiting but lets the pass finish and fill the cache
+            scores = await asyncio.wait_for(asyncio.shield(task), timeout=self.timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            return self._select(results, range(min(len(ids), top_n)))
+        except Exception:
+            self.stats.errors += 1
+            logging.exception("Rerank failed after %.1f ms, keeping retrieval order", (time.perf_counter() - started) * 1000)
+            return self._select(results, range(min(len(ids), top_n)))
+
+        self.stats.reranked += 1
+        order = sorted(range(len(ids)), key=lambda i: scores[i], reverse=True)[:top_n]
+        return self._select(results, order)
+
+    @staticmethod
+    def _select(results: Dict[str, Any], order) -> Dict[str, Any]:
+        order = list(order)
+        selected = {}
+        for field in ('ids', 'documents', 'metadatas', 'distances'):
+            values = results.get(field, [[]])[0] or [None] * len(results.get('ids', [[]])[0])
+            selected[field] = [[values[i] for i in order]]
+        return selected
+
+    def clear(self):
+        with self._lock:
+            self._scores.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.RERANK_ENABLED,
+            "model": settings.RERANK_MODEL,
+            "timeout_ms": self.timeout_ms,
+            "cached_pairs": len(self._scores),
+            **vars(self.stats),
+        }
+
+
+# Global instance
+reranker = Reranker(
+    load_model=get_rerank_model,
+    timeout_ms=settings.RERANK_TIMEOUT_MS,
+    cache_size=settings.RERANK_CACHE_SIZE,
+)
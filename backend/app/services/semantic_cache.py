@@ -0,0 +1,314 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from ..core.config import settings
+from ..core.sqlite import SQLiteDatabase
+
+
+Namespace = Tuple[str, int, str, str]
+
+
+@dataclass
+class CacheEntry:
+    namespace: Namespace
+    embedding: np.ndarray
+    response: str
+    sources: List[Dict[str, Any]]
+    created_at: float
+    size_bytes: int
+    hits: int = 0
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+@dataclass
+class _NamespaceIndex:
+    keys: List[int] = field(default_factory=list)
+    matrix: Optional[np.ndarray] = None
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by query embedding.
+
+    Entries live in namespaces of (collection, collection version, model, system prompt),
+    and a lookup returns the most similar cached answer in the same namespace when its
+    cosine similarity reaches the threshold. Bounded by entry count and approximate bytes
+    with LRU eviction, and entries expire after a TTL. Bumping a collection's version
+    (whenever its documents change) drops every answer built from the old contents.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int, max_bytes: int):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._indexes: Dict[Namespace, _NamespaceIndex] = {}
+        self._collection_versions: Dict[str, int] = {}
+        self._bytes = 0
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def _version(self, collection_name: str) -> int:
+        return self._collection_versions.get(collection_name, 0)
+
+    def namespace(self, collection_name: str, model: str, system_prompt: str) -> Namespace:
+        return (collection_name, self._version(collection_name), model, system_prompt)
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, namespace: Namespace, embedding) -> Optional[CacheEntry]:
+        """Return the closest live entry at or above the threshold, or None"""
+        query = self._normalize(embedding)
+        with self._lock:
+            # Expired answers go first, so they cannot hide a live one that also matches
+            self._prune_expired(namespace)
+            index = self._indexes.get(namespace)
+            if index is None:
+                self.stats.misses += 1
+                return None
+            if index.matrix is None:
+                index.matrix = np.stack([self._entries[key].embedding for key in index.keys])
+
+            similarities = index.matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.stats.misses += 1
+                return None
+
+            key = index.keys[best]
+            entry = self._entries[key]
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            self.stats.hits += 1
+            return entry
+
+    def _prune_expired(self, namespace: Namespace):
+        """Remove a namespace's entries older than the TTL (call with the lock held)"""
+        index = self._indexes.get(namespace)
+        if index is None:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        for key in [key for key in index.keys if self._entries[key].created_at < cutoff]:
+            self._remove(key)
+            self.stats.expirations += 1
+
+    @staticmethod
+    def _entry_size(vector: np.ndarray, response: str, sources: List[Dict[str, Any]]) -> int:
+        return vector.nbytes + len(response.encode("utf-8")) + len(json.dumps(sources, default=str))
+
+    def store(self, namespace: Namespace, embedding, response: str, sources: List[Dict[str, Any]]):
+        vector = self._normalize(embedding)
+        size = self._entry_size(vector, response, sources)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # A namespace from before the latest invalidation would never be looked up again
+            if namespace[1] != self._version(namespace[0]):
+                return
+            self._insert(namespace, vector, response, sources, time.monotonic(), size)
+
+    def _insert(self, namespace: Namespace, vector: np.ndarray, response: str, sources: List[Dict[str, Any]], created_at: float, size: int):
+        """Add an entry and evict down to the bounds (call with the lock held)"""
+        key = self._next_key
+        self._next_key += 1
+        self._entries[key] = CacheEntry(namespace, vector, response, sources, created_at, size)
+        index = self._indexes.setdefault(namespace, _NamespaceIndex())
+        index.keys.append(key)
+        index.matrix = None
+        self._bytes += size
+        self.stats.stores += 1
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.stats.evictions += 1
+
+    def invalidate_collection(self, collection_name: str):
+        """Drop cached answers for a collection whose documents changed"""
+        with self._lock:
+            self._collection_versions[collection_name] = self._collection_versions.get(collection_name, 0) + 1
+            for namespace in [ns for ns in self._indexes if ns[0] == collection_name]:
+                for key in list(self._indexes[namespace].keys):
+                    self._remove(key)
+            self.stats.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._indexes.clear()
+            self._bytes = 0
+
+    def _remove(self, key: int):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size_bytes
+        index = self._indexes[entry.namespace]
+        index.keys.remove(key)
+        index.matrix = None
+        if not index.keys:
+            del self._indexes[entry.namespace]
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats.hits + self.stats.misses
+        return {
+            "enabled": settings.SEMANTIC_CACHE_ENABLED,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "hit_rate": round(self.stats.hits / lookups, 4) if lookups else 0.0,
+            **vars(self.stats),
+        }
+
+
+class SharedSemanticCache(SemanticCache):
+    """
+    Semantic cache shared by worker processes through a SQLite file.
+
+    Stored answers and collection versions live in the database; each worker keeps its
+    own similarity index and, before every lookup, pulls the rows added since its last
+    sync. Invalidating a collection bumps its shared version, so every worker stops
+    matching the old answers at once, and a clear in one worker clears all of them.
+    """
+
+    def __init__(self, path: str, threshold: float, ttl_seconds: float, max_entries: int, max_bytes: int):
+        super().__init__(threshold, ttl_seconds, max_entries, max_bytes)
+        self.db = SQLiteDatabase(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS semantic_cache_entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                collection TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                response TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS semantic_cache_versions (
+                collection TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS semantic_cache_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        self._last_id = 0
+        self._generation = None
+        # Lookups and stores run on executor threads; one sync at a time keeps _last_id consistent
+        self._sync_lock = threading.Lock()
+
+    def _version(self, collection_name: str) -> int:
+        row = self.db.conn().execute(
+            "SELECT version FROM semantic_cache_versions WHERE collection = ?", (collection_name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _sync(self):
+        """Pull entries stored by any worker since the last sync"""
+        with self._sync_lock:
+            self._pull()
+
+    def _pull(self):
+        conn = self.db.conn()
+        row = conn.execute("SELECT value FROM semantic_cache_meta WHERE key = 'generation'").fetchone()
+        generation = row[0] if row else 0
+        if generation != self._generation:
+            super().clear()
+            self._generation = generation
+            self._last_id = 0
+
+        rows = conn.execute(
+            "SELECT id, namespace, embedding, response, sources, created_at FROM semantic_cache_entries WHERE id > ? ORDER BY id",
+            (self._last_id,),
+        ).fetchall()
+        if not rows:
+            return
+        now_wall, now_mono = time.time(), time.monotonic()
+        with self._lock:
+            for entry_id, namespace, embedding, response, sources, created_at in rows:
+                self._last_id = max(self._last_id, entry_id)
+                vector = np.frombuffer(embedding, dtype=np.float32).copy()
+                sources = json.loads(sources)
+                self._insert(
+                    tuple(json.loads(namespace)), vector, response, sources,
+                    now_mono - (now_wall - created_at), self._entry_size(vector, response, sources),
+                )
+
+    def lookup(self, namespace: Namespace, embedding) -> Optional[CacheEntry]:
+        self._sync()
+        return super().lookup(namespace, embedding)
+
+    def store(self, namespace: Namespace, embedding, response: str, sources: List[Dict[str, Any]]):
+        vector = self._normalize(embedding)
+        if self._entry_size(vector, response, sources) > self.max_bytes:
+            return
+        now = time.time()
+        with self.db.transaction() as conn:
+            if namespace[1] != self._version(namespace[0]):
+                return
+            conn.execute(
+                "INSERT INTO semantic_cache_entries (collection, namespace, embedding, response, sources, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace[0], json.dumps(namespace), vector.tobytes(), response, json.dumps(sources, default=str), now),
+            )
+            conn.execute("DELETE FROM semantic_cache_entries WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._sync()
+
+    def invalidate_collection(self, collection_name: str):
+        with self.db.transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO semantic_cache_versions (collection, version) VALUES (?, 1)
+                ON CONFLICT (collection) DO UPDATE SET version = version + 1
+                """,
+                (collection_name,),
+            )
+            conn.execute("DELETE FROM semantic_cache_entries WHERE collection = ?", (collection_name,))
+        super().invalidate_collection(collection_name)
+
+    def clear(self):
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM semantic_cache_entries")
+            conn.execute(
+                """
+                INSERT INTO semantic_cache_meta (key, value) VALUES ('generation', 1)
+                ON CONFLICT (key) DO UPDATE SET value = value + 1
+                """
+            )
+        self._sync()
+
+
+def create_semantic_cache() -> SemanticCache:
+    options = {
+        "threshold": settings.SEMANTIC_CACHE_THRESHOLD,
+        "ttl_seconds": settings.SEMANTIC_CACHE_TTL,
+        "max_entries": settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        "max_bytes": settings.SEMANTIC_CACHE_MAX_BYTES,
+    }
+    if settings.WORKERS > 1:
+        return SharedSemanticCache(settings.SHARED_STATE_DB_PATH, **options)
+    return SemanticCache(**options)
+
+
+# Global instance
+semantic_cache = create_semantic_cache()
@@ -0,0 +1,441 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from ..core.config import settings
+from ..core.sqlite import SQLiteDatabase
+
+
+# (role, content, unix timestamp): one small tuple per message instead of a dict with an ISO string
+Message = Tuple[str, str, float]
+
+# Rough per-message bookkeeping cost (tuple, float, list slot)
+_MESSAGE_OVERHEAD_BYTES = 120
+_SESSION_OVERHEAD_BYTES = 400
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
+
+def _message_dict(role: str, content: str, timestamp: float) -> Dict[str, Any]:
+    return {"role": role, "content": content, "timestamp": _iso(timestamp)}
+
+
+@dataclass
+class SessionMemory:
+    """What conversation memory needs from a session, read without loading the whole history"""
+    summary: str
+    summarized: int        # messages folded into the summary, counted from the start
+    message_count: int
+    recent: List[Dict[str, Any]]
+
+
+class SessionStore(ABC):
+    """Chat session history: create, append turns, read, delete, and list one page at a time"""
+
+    @abstractmethod
+    def create(self, session_id: str, user_id: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None):
+        """Create a session, or refresh it if it already exists"""
+
+    @abstractmethod
+    def append(self, session_id: str, messages: List[Tuple[str, str]]):
+        """Append (role, content) messages, creating the session if it was evicted meanwhile"""
+
+    @abstractmethod
+    def get_history(self, session_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Messages of a session, or None if it does not exist"""
+
+    @abstractmethod
+    def get_memory(self, session_id: str, recent: int) -> Optional[SessionMemory]:
+        """Rolling summary, message count and the last `recent` messages, or None if the session does not exist"""
+
+    @abstractmethod
+    def get_messages(self, session_id: str, start: int, end: int) -> List[Dict[str, Any]]:
+        """Messages start..end-1 of a session, oldest first"""
+
+    @abstractmethod
+    def set_summary(self, session_id: str, summary: str, summarized: int, expected: int) -> bool:
+        """
+        Store a summary of the first `summarized` messages, only if the stored one still
+        covers `expected` messages; False when another request updated it first
+        """
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Delete a session; False if it did not exist"""
+
+    @abstractmethod
+    def list(self, offset: int = 0, limit: int = 50) -> Tuple[int, List[Dict[str, Any]]]:
+        """(total sessions, one page of session summaries, most recently active first)"""
+
+    @abstractmethod
+    def clear(self):
+        """Delete every session"""
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        pass
+
+
+@dataclass(slots=True)
+class _Session:
+    created_at: float
+    last_activity: float
+    user_id: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+    messages: List[Message] = field(default_factory=list)
+    summary: str = ""
+    summarized: int = 0
+    size_bytes: int = _SESSION_OVERHEAD_BYTES
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local store bounded three ways: sessions idle for longer than `idle_ttl` expire,
+    and past `max_sessions` or `max_bytes` the least recently active sessions are evicted.
+    Sessions are kept in recency order, so expiry and eviction only ever look at the front.
+    """
+
+    def __init__(self, max_sessions: int, idle_ttl: float, max_bytes: int):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expire(self, now: float):
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_activity <= self.idle_ttl:
+                break
+            self._drop(session_id)
+            self.expirations += 1
+
+    def _evict(self):
+        while len(self._sessions) > self.max_sessions or (self._bytes > self.max_bytes and len(self._sessions) > 1):
+            self._drop(next(iter(self._sessions)))
+            self.evictions += 1
+
+    def _drop(self, session_id: str) -> bool:
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self._bytes -= session.size_bytes
+        return True
+
+    def _touch(self, session_id: str, now: float) -> _Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session(created_at=now, last_activity=now)
+            self._bytes += session.size_bytes
+        else:
+            session.last_activity = now
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def create(self, session_id: str, user_id: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            session = self._touch(session_id, now)
+            if user_id is not None:
+                session.user_id = user_id
+            if metadata:
+                session.metadata = metadata
+            self._evict()
+
+    def append(self, session_id: str, messages: List[Tuple[str, str]]):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            session = self._touch(session_id, now)
+            for role, content in messages:
+                session.messages.append((sys.intern(role), content, now))
+                size = sys.getsizeof(content) + _MESSAGE_OVERHEAD_BYTES
+                session.size_bytes += size
+                self._bytes += size
+            self._evict()
+
+    def get_history(self, session_id: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            self._expire(time.time())
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            return [_message_dict(*message) for message in session.messages]
+
+    def get_memory(self, session_id: str, recent: int) -> Optional[SessionMemory]:
+        with self._lock:
+            self._expire(time.time())
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            return SessionMemory(
+                summary=session.summary,
+                summarized=session.summarized,
+                message_count=len(session.messages),
+                recent=[_message_dict(*message) for message in session.messages[-recent:]] if recent > 0 else [],
+            )
+
+    def get_messages(self, session_id: str, start: int, end: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            return [_message_dict(*message) for message in session.messages[start:end]]
+
+    def set_summary(self, session_id: str, summary: str, summarized: int, expected: int) -> bool:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.summarized != expected:
+                return False
+            size = sys.getsizeof(summary) - sys.getsizeof(session.summary)
+            session.summary = summary
+            session.summarized = summarized
+            session.size_bytes += size
+            self._bytes += size
+            return True
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._drop(session_id)
+
+    def list(self, offset: int = 0, limit: int = 50) -> Tuple[int, List[Dict[str, Any]]]:
+        with self._lock:
+            self._expire(time.time())
+            total = len(self._sessions)
+            page = []
+            # Most recently active sessions sit at the end of the ordered dict
+            for index, (session_id, session) in enumerate(reversed(self._sessions.items())):
+                if index >= offset + limit:
+                    break
+                if index >= offset:
+                    page.append({
+                        "session_id": session_id,
+                        "message_count": len(session.messages),
+                        "last_activity": _iso(session.last_activity),
+                        "created_at": _iso(session.created_at),
+                    })
+            return total, page
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "idle_ttl": self.idle_ttl,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in a SQLite database in WAL mode, so memory does not grow with session count
+    and readers never block the writer. Each thread gets its own connection. Sessions idle
+    for longer than `idle_ttl` are purged by a sweep that runs at most once a minute.
+    """
+
+    SWEEP_INTERVAL = 60.0
+
+    def __init__(self, path: str, idle_ttl: float):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.db = SQLiteDatabase(path)
+        self._last_sweep = 0.0
+        self.expirations = 0
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                user_id TEXT,
+                metadata TEXT,
+                created_at REAL NOT NULL,
+                last_activity REAL NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                summary TEXT NOT NULL DEFAULT '',
+                summarized INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS sessions_by_activity ON sessions (last_activity);
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS messages_by_session ON messages (session_id, id);
+        """)
+        # Databases created before conversation memory lack the summary columns
+        columns = {row[1] for row in self.db.conn().execute("PRAGMA table_info(sessions)")}
+        if "summary" not in columns:
+            self.db.executescript("""
+                ALTER TABLE sessions ADD COLUMN summary TEXT NOT NULL DEFAULT '';
+                ALTER TABLE sessions ADD COLUMN summarized INTEGER NOT NULL DEFAULT 0;
+            """)
+
+    def _sweep(self, conn: sqlite3.Connection, now: float):
+        if now - self._last_sweep < self.SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        cutoff = now - self.idle_ttl
+        conn.execute("DELETE FROM messages WHERE session_id IN (SELECT session_id FROM sessions WHERE last_activity < ?)", (cutoff,))
+        self.expirations += conn.execute("DELETE FROM sessions WHERE last_activity < ?", (cutoff,)).rowcount
+
+    def _upsert(self, conn: sqlite3.Connection, session_id: str, now: float, added: int = 0):
+        # A session that expired but was not swept yet starts over instead of reviving old history
+        cutoff = now - self.idle_ttl
+        conn.execute(
+            "DELETE FROM messages WHERE session_id = ? AND (SELECT last_activity FROM sessions WHERE session_id = ?) < ?",
+            (session_id, session_id, cutoff),
+        )
+        conn.execute("DELETE FROM sessions WHERE session_id = ? AND last_activity < ?", (session_id, cutoff))
+        conn.execute(
+            """
+            INSERT INTO sessions (session_id, created_at, last_activity, message_count) VALUES (?, ?, ?, ?)
+            ON CONFLICT (session_id) DO UPDATE SET
+                last_activity = excluded.last_activity,
+                message_count = message_count + excluded.message_count
+            """,
+            (session_id, now, now, added),
+        )
+
+    def create(self, session_id: str, user_id: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None):
+        now = time.time()
+        with self.db.transaction() as conn:
+            self._sweep(conn, now)
+            self._upsert(conn, session_id, now)
+            if user_id is not None or metadata:
+                conn.execute(
+                    "UPDATE sessions SET user_id = COALESCE(?, user_id), metadata = COALESCE(?, metadata) WHERE session_id = ?",
+                    (user_id, json.dumps(metadata) if metadata else None, session_id),
+                )
+
+    def append(self, session_id: str, messages: List[Tuple[str, str]]):
+        now = time.time()
+        with self.db.transaction() as conn:
+            self._sweep(conn, now)
+            self._upsert(conn, session_id, now, len(messages))
+            conn.executemany(
+                "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                [(session_id, role, content, now) for role, content in messages],
+            )
+
+    def get_history(self, session_id: str) -> Optional[List[Dict[str, Any]]]:
+        conn = self.db.conn()
+        row = conn.execute("SELECT last_activity FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None or time.time() - row[0] > self.idle_ttl:
+            return None
+        rows = conn.execute(
+            "SELECT role, content, created_at FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+        ).fetchall()
+        return [_message_dict(*message) for message in rows]
+
+    def get_memory(self, session_id: str, recent: int) -> Optional[SessionMemory]:
+        conn = self.db.conn()
+        row = conn.execute(
+            "SELECT last_activity, summary, summarized, message_count FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or time.time() - row[0] > self.idle_ttl:
+            return None
+        rows = conn.execute(
+            "SELECT role, content, created_at FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+            (session_id, max(recent, 0)),
+        ).fetchall()
+        return SessionMemory(
+            summary=row[1],
+            summarized=row[2],
+            message_count=row[3],
+            recent=[_message_dict(*message) for message in reversed(rows)],
+        )
+
+    def get_messages(self, session_id: str, start: int, end: int) -> List[Dict[str, Any]]:
+        rows = self.db.conn().execute(
+            "SELECT role, content, created_at FROM messages WHERE session_id = ? ORDER BY id LIMIT ? OFFSET ?",
+            (session_id, max(end - start, 0), start),
+        ).fetchall()
+        return [_message_dict(*message) for message in rows]
+
+    def set_summary(self, session_id: str, summary: str, summarized: int, expected: int) -> bool:
+        with self.db.transaction() as conn:
+            return conn.execute(
+                "UPDATE sessions SET summary = ?, summarized = ? WHERE session_id = ? AND summarized = ?",
+                (summary, summarized, session_id, expected),
+            ).rowcount > 0
+
+    def delete(self, session_id: str) -> bool:
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            return conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount > 0
+
+    def list(self, offset: int = 0, limit: int = 50) -> Tuple[int, List[Dict[str, Any]]]:
+        cutoff = time.time() - self.idle_ttl
+        conn = self.db.conn()
+        total = conn.execute("SELECT COUNT(*) FROM sessions WHERE last_activity >= ?", (cutoff,)).fetchone()[0]
+        rows = conn.execute(
+            """
+            SELECT session_id, message_count, last_activity, created_at FROM sessions
+            WHERE last_activity >= ? ORDER BY last_activity DESC LIMIT ? OFFSET ?
+            """,
+            (cutoff, limit, offset),
+        ).fetchall()
+        return total, [
+            {
+                "session_id": session_id,
+                "message_count": message_count,
+                "last_activity": _iso(last_activity),
+                "created_at": _iso(created_at),
+            }
+            for session_id, message_count, last_activity, created_at in rows
+        ]
+
+    def clear(self):
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM messages")
+            conn.execute("DELETE FROM sessions")
+
+    def get_stats(self) -> Dict[str, Any]:
+        conn = self.db.conn()
+        sessions = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        messages = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "sessions": sessions,
+            "messages": messages,
+            "idle_ttl": self.idle_ttl,
+            "expirations": self.expirations,
+        }
+
+
+def create_session_store() -> SessionStore:
+    # Worker processes cannot see each other's memory, so multi-worker mode always shares SQLite
+    if settings.SESSION_STORE == "sqlite" or settings.WORKERS > 1:
+        return SQLiteSessionStore(settings.SESSION_DB_PATH, idle_ttl=settings.SESSION_IDLE_TTL)
+    if settings.SESSION_STORE == "memory":
+        return InMemorySessionStore(
+            max_sessions=settings.SESSION_MAX_SESSIONS,
+            idle_ttl=settings.SESSION_IDLE_TTL,
+            max_bytes=settings.SESSION_MAX_BYTES,
+        )
+    raise ValueError(f"Unknown SESSION_STORE '{settings.SESSION_STORE}' (expected 'memory' or 'sqlite')")
+
+
+# Global instance
+session_store = create_session_store()
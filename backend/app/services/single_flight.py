@@ -0,0 +1,200 @@
+import asyncio
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+from ..core.config import settings
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class FlightStats:
+    leaders: int = 0
+    followers: int = 0
+    timeouts: int = 0
+
+
+class _Call:
+    """One in-flight upstream call and the requests waiting for it"""
+
+    def __init__(self, task: "asyncio.Future[Any]"):
+        self.task = task
+        self.waiters = 0
+        # A call nobody waits for any more must not leave an unretrieved exception behind
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+class _Broadcast:
+    """Tokens of one in-flight upstream stream, replayed to every request that joins it"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.tokens: List[str] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+        self.task: Optional["asyncio.Task[None]"] = None
+
+    def _notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def publish(self, token: str):
+        self.tokens.append(token)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.finished = True
+        self.error = error
+        self._notify()
+
+
+class _LeaderTimeout(Exception):
+    def __init__(self, received: int):
+        self.received = received
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent upstream LLM calls.
+
+    The first request for a key (the leader) starts the call; requests with the same key
+    that arrive while it is in flight (followers) wait for its result instead of making
+    their own. Streams are shared the same way: every token is buffered and replayed, so
+    a follower that joins late still gets the whole answer. The upstream call runs as its
+    own task, so it survives the leader disconnecting and is only cancelled when nobody
+    is waiting any more.
+
+    A follower waits at most `timeout` seconds (for a stream: between two tokens). If a
+    stuck leader has not answered by then, the follower makes its own call, and the stuck
+    flight is dropped so later requests start afresh. A stream that stalls after tokens
+    were already sent fails with TimeoutError instead of starting over.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.stats = FlightStats()
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+
+    def _drop_call(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def _drop_stream(self, key: str, broadcast: _Broadcast):
+        if self._streams.get(key) is broadcast:
+            del self._streams[key]
+
+    async def call(self, key: str, start: Callable[[], Awaitable[T]]) -> T:
+        """Result of `start()`, shared with identical calls already in flight"""
+        if not settings.COALESCE_ENABLED:
+            return await start()
+
+        call = self._calls.get(key)
+        if call is not None:
+            self.stats.followers += 1
+            try:
+                return await self._wait(key, call, self.timeout)
+            except asyncio.TimeoutError:
+                self.stats.timeouts += 1
+                self._drop_call(key, call)
+                return await start()
+
+        self.stats.leaders += 1
+        call = self._calls[key] = _Call(asyncio.ensure_future(start()))
+        call.task.add_done_callback(lambda _: self._drop_call(key, call))
+        return await self._wait(key, call, None)
+
+    async def _wait(self, key: str, call: _Call, timeout: Optional[float]) -> Any:
+        call.waiters += 1
+        try:
+            # shield: one request giving up (timeout, client gone) must not cancel the shared call
+            return await asyncio.wait_for(asyncio.shield(call.task), timeout)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nobody wants the answer any more; later requests start a new call
+                self._drop_call(key, call)
+                call.task.cancel()
+
+    async def stream(self, key: str, open_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Tokens of `open_stream()`, shared with an identical stream already in flight"""
+        if not settings.COALESCE_ENABLED:
+            async with aclosing(open_stream()) as tokens:
+                async for token in tokens:
+                    yield token
+            return
+
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            self.stats.leaders += 1
+            broadcast = self._streams[key] = _Broadcast(key)
+            broadcast.task = asyncio.ensure_future(self._pump(key, broadcast, open_stream))
+            timeout = None
+        else:
+            self.stats.followers += 1
+            timeout = self.timeout
+
+        try:
+            async for token in self._follow(broadcast, timeout):
+                yield token
+            return
+        except _LeaderTimeout as e:
+            self.stats.timeouts += 1
+            self._drop_stream(key, broadcast)
+            if e.received:
+                raise asyncio.TimeoutError("The shared answer stream stalled") from None
+
+        # The leader never produced a token: stream on our own
+        async with aclosing(open_stream()) as tokens:
+            async for token in tokens:
+                yield token
+
+    async def _follow(self, broadcast: _Broadcast, timeout: Optional[float]) -> AsyncIterator[str]:
+        broadcast.subscribers += 1
+        received = 0
+        try:
+            while True:
+                while received < len(broadcast.tokens):
+                    yield broadcast.tokens[received]
+                    received += 1
+                if broadcast.finished:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                try:
+                    await asyncio.wait_for(broadcast.changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    raise _LeaderTimeout(received) from None
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.finished:
+                self._drop_stream(broadcast.key, broadcast)
+                broadcast.task.cancel()
+
+    async def _pump(self, key: str, broadcast: _Broadcast, open_stream: Callable[[], AsyncIterator[str]]):
+        try:
+            async with aclosing(open_stream()) as tokens:
+                async for token in tokens:
+                    broadcast.publish(token)
+            broadcast.finish()
+        except asyncio.CancelledError:
+            broadcast.finish(asyncio.CancelledError())
+        except Exception as e:
+            broadcast.finish(e)
+        finally:
+            self._drop_stream(key, broadcast)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.COALESCE_ENABLED,
+            "timeout": self.timeout,
+            "in_flight": len(self._calls) + len(self._streams),
+            **vars(self.stats),
+        }
+
+
+# Global instance, shared by every chat request in this process
+llm_flights = SingleFlight(timeout=settings.COALESCE_TIMEOUT)
@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+from ..core.config import settings
+from ..models.chat import ChatMessage
+
+
+@dataclass
+class RequestTrace:
+    """What one chat request went through, filled in by the pipeline as it runs"""
+    kind: str                                  # "chat", "stream" or "websocket"
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    started_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    stages: Dict[str, float] = field(default_factory=dict)   # seconds per pipeline stage
+    answer_source: Optional[str] = None        # "llm", "degraded", "cache", "faq", ...
+    chunks: List[Dict[str, Any]] = field(default_factory=list)
+    model: Optional[str] = None
+    route: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    upstream_status: Optional[str] = None      # "ok", an HTTP status, "timeout", "circuit_open", ...
+    error: Optional[str] = None
+
+    def add_stage(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+def add_stage(stage: str, seconds: float):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_stage(stage, seconds)
+
+
+def annotate(**fields: Any):
+    """Set fields of the current request's trace (no-op outside a traced request)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        for name, value in fields.items():
+            setattr(trace, name, value)
+
+
+class SlowRequestLog:
+    """
+    JSONL log of chat requests slower than `threshold_ms`, with their full pipeline breakdown.
+
+    Requests are traced in a context variable, so tasks spawned by the pipeline annotate the
+    same trace. Slow records are queued and written by a background thread, so the request
+    never waits on disk; when the queue is full records are dropped and counted. The file
+    is rotated by size (`path.1` … `path.<backup_count>`), and reopened for every batch so
+    several worker processes can append to it.
+    """
+
+    def __init__(self, path: str, threshold_ms: float, max_bytes: int, backup_count: int, queue_size: int):
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+    @contextmanager
+    def trace(self, kind: str, message: ChatMessage) -> Iterator[RequestTrace]:
+        """Trace the request in the block; on the way out, queue it if it was slow"""
+        trace = RequestTrace(kind=kind)
+        previous = _current_trace.get()
+        _current_trace.set(trace)
+        started = time.perf_counter()
+        try:
+            yield trace
+        except BaseException as e:
+            trace.error = "cancelled" if not isinstance(e, Exception) else repr(e)
+            raise
+        finally:
+            # set, not reset: a stream's generator may be closed from another context
+            _current_trace.set(previous)
+            total_ms = (time.perf_counter() - started) * 1000
+            if settings.SLOW_LOG_ENABLED and total_ms >= self.threshold_ms:
+                self.submit(self.to_record(trace, message, total_ms))
+
+    @staticmethod
+    def to_record(trace: RequestTrace, message: ChatMessage, total_ms: float) -> Dict[str, Any]:
+        return {
+            "request_id": trace.request_id,
+            "started_at": trace.started_at,
+            "kind": trace.kind,
+            "total_ms": round(total_ms, 1),
+            "stages_ms": {stage: round(seconds * 1000, 1) for stage, seconds in trace.stages.items()},
+            "session_id": message.session_id,
+            "collection": message.collection_name,
+            "query": message.message[:500],
+            "answer_source": trace.answer_source,
+            "chunks": trace.chunks,
+            "prompt_tokens": trace.prompt_tokens,
+            "completion_tokens": trace.completion_tokens,
+            "model": trace.model,
+            "route": trace.route,
+            "upstream_status": trace.upstream_status,
+            "error": trace.error,
+        }
+
+    def submit(self, record: Dict[str, Any]):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="slow-request-log", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Wait until every queued record has been written"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+                self.written += len(batch)
+            except Exception:
+                logging.exception("Could not write %d slow request records to %s", len(batch), self.path)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        try:
+            if os.path.getsize(self.path) >= self.max_bytes:
+                self._rotate()
+        except FileNotFoundError:
+            pass
+        lines = "".join(json.dumps(record, default=str) + "\n" for record in batch)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def recent(
+        self,
+        limit: int = 50,
+        min_total_ms: Optional[float] = None,
+        collection: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """The most recent slow requests on disk (all workers), newest first"""
+        records = []
+        for path in [self.path, *(f"{self.path}.{i}" for i in range(1, self.backup_count + 1))]:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                continue
+            for line in reversed(lines):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue        # a line another worker is still writing
+                if min_total_ms is not None and record.get("total_ms", 0) < min_total_ms:
+                    continue
+                if collection is not None and record.get("collection") != collection:
+                    continue
+                records.append(record)
+                if len(records) >= limit:
+                    return records
+        return records
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.SLOW_LOG_ENABLED,
+            "threshold_ms": self.threshold_ms,
+            "path": self.path,
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+        }
+
+
+# Global instance
+slow_request_log = SlowRequestLog(
+    path=settings.SLOW_LOG_PATH,
+    threshold_ms=settings.SLOW_LOG_THRESHOLD_MS,
+    max_bytes=settings.SLOW_LOG_MAX_BYTES,
+    backup_count=settings.SLOW_LOG_BACKUP_COUNT,
+    queue_size=settings.SLOW_LOG_QUEUE_SIZE,
+)
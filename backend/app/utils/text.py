@@ -0,0 +1,11 @@
+import re
+
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Canonical form of a user query: lowercase, punctuation replaced by spaces, whitespace collapsed"""
+    text = _PUNCTUATION.sub(" ", text.lower())
+    return _WHITESPACE.sub(" ", text).strip()
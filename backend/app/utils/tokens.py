@@ -0,0 +1,44 @@
+import copy
+import threading
+from functools import lru_cache
+from typing import Callable
+
+_local = threading.local()
+
+
+@lru_cache(maxsize=1)
+def _get_tokenizer():
+    # The embedding model's tokenizer is already loaded and close enough to the LLM's for budgeting
+    from ..core.database import get_embedding_model
+    return getattr(get_embedding_model(), "tokenizer", None)
+
+
+def _thread_tokenizer():
+    """This thread's copy of the tokenizer: a fast tokenizer used by two threads at once raises "Already borrowed" """
+    if not hasattr(_local, "tokenizer"):
+        tokenizer = _get_tokenizer()
+        _local.tokenizer = copy.deepcopy(tokenizer) if tokenizer is not None else None
+    return _local.tokenizer
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """Approximate token count of a text (cached; retrieved chunks repeat across queries)"""
+    tokenizer = _thread_tokenizer()
+    if tokenizer is None:
+        return max(1, len(text) // 4)
+    return len(tokenizer.encode(text, add_special_tokens=False, verbose=False))
+
+
+def count_tokens_uncached(text: str) -> int:
+    """count_tokens for one-off texts, such as generated answers, that should not evict cached chunks"""
+    return count_tokens.__wrapped__(text)
+
+
+def truncate_to_tokens(text: str, budget: int, count: Callable[[str], int] = count_tokens) -> str:
+    """Cut a text at a word boundary so it fits in `budget` tokens"""
+    if count(text) <= budget:
+        return text
+    while text and count(text) > budget:
+        text = text[: int(len(text) * 0.9)]
+    return text.rsplit(" ", 1)[0] if " " in text else text
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Query embedding throughput: one-at-a-time encoding vs. the micro-batching EmbeddingBatcher.
+
+For each concurrency level, N simulated clients each embed a stream of distinct queries
+(so no cache is involved) and we report queries/sec plus p50/p95 per-query latency.
+
+Usage (from backend/, with .env configured):
+    python benchmarks/embedding_batching.py
+    python benchmarks/embedding_batching.py --concurrency 1 8 32 128 --queries 512 --json results.json
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.core.concurrency import run_blocking  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.database import get_embedding_model  # noqa: E402
+from app.services.embedding_batcher import EmbeddingBatcher  # noqa: E402
+
+
+def make_queries(n):
+    topics = ["BCom fees", "BSc admission", "hostel rules", "MA eligibility", "OAP deadline", "PhD guide"]
+    return [f"What about {topics[i % len(topics)]} for applicant {i}?" for i in range(n)]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def drive(embed, queries, concurrency):
+    latencies = []
+    chunks = [queries[i::concurrency] for i in range(concurrency)]
+
+    async def client(chunk):
+        for query in chunk:
+            start = time.perf_counter()
+            await embed(query)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(chunk) for chunk in chunks))
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput_qps": round(len(queries) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+    }
+
+
+async def run(args):
+    model = get_embedding_model()
+    model.encode(["warm up"])
+
+    def encode_many(texts):
+        return list(model.encode(texts))
+
+    async def single(query):
+        return await run_blocking(lambda: model.encode([query])[0])
+
+    results = []
+    for concurrency in args.concurrency:
+        queries = make_queries(args.queries)
+        batcher = EmbeddingBatcher(encode_many, args.max_batch, args.max_wait_ms)
+        unbatched = await drive(single, queries, concurrency)
+        batched = await drive(batcher.embed, queries, concurrency)
+        results.append({
+            "concurrency": concurrency,
+            "unbatched": unbatched,
+            "batched": {**batched, "average_batch_size": batcher.get_stats()["average_batch_size"]},
+            "speedup": round(batched["throughput_qps"] / unbatched["throughput_qps"], 2),
+        })
+
+    print(f"model={settings.EMBEDDING_MODEL} queries={args.queries} max_batch={args.max_batch} max_wait_ms={args.max_wait_ms}")
+    print(f"{'clients':>8} | {'single q/s':>10} {'p50 ms':>8} {'p95 ms':>8} | {'batched q/s':>11} {'p50 ms':>8} {'p95 ms':>8} {'avg batch':>9} | {'speedup':>7}")
+    for r in results:
+        u, b = r["unbatched"], r["batched"]
+        print(f"{r['concurrency']:>8} | {u['throughput_qps']:>10} {u['p50_ms']:>8} {u['p95_ms']:>8} | "
+              f"{b['throughput_qps']:>11} {b['p50_ms']:>8} {b['p95_ms']:>8} {b['average_batch_size']:>9} | {r['speedup']:>6}x")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"model": settings.EMBEDDING_MODEL, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--queries", type=int, default=512, help="queries per concurrency level")
+    parser.add_argument("--max-batch", type=int, default=settings.EMBEDDING_BATCH_MAX_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.EMBEDDING_BATCH_MAX_WAIT_MS)
+    parser.add_argument("--json", help="write results to this file")
+    asyncio.run(run(parser.parse_args()))
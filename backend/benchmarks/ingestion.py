@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Ingestion throughput: text extraction, chunking, embedding and ChromaDB inserts, each stage
+on its own and end to end through DocumentService.upload_document.
+
+Corpora (--corpus, all by default):
+    pdf    a synthetic multi-page PDF (--pdf-pages), plus any real PDFs given with --pdf
+    docx   the scraped export (../export/all.docx) or the files given with --docx
+    txt    many small synthetic TXT files (--txt-files of --txt-kb each)
+    files  any other PDF/DOCX/TXT files given with --files
+
+Reported per corpus and stage: seconds, MB/s of input, chunks/s, embeddings/s, inserts/s
+and the peak RSS of the process during the stage. ChromaDB writes go to a throwaway
+directory. --baseline compares with an earlier --json file and exits 1 when a rate drops
+(or peak RSS grows) by more than --max-regression; --compare compares two files.
+
+Usage (from backend/):
+    python benchmarks/ingestion.py --json ingestion.json
+    python benchmarks/ingestion.py --corpus txt docx --txt-files 1000 --repeat 3
+    python benchmarks/ingestion.py --pdf ~/prospectus.pdf --corpus pdf
+    python benchmarks/ingestion.py --baseline ingestion.json --max-regression 0.15
+    python benchmarks/ingestion.py --compare before.json after.json
+"""
+import argparse
+import io
+import mimetypes
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from results import (  # noqa: E402
+    compare, load_results, print_comparison, run_metadata, shape_differences, write_results
+)
+
+EXPORT_DOCX = backend_dir.parent / "export" / "all.docx"
+CORPORA = ("pdf", "docx", "txt", "files")
+CORPUS_SHAPE = ("corpus", "pdf", "pdf_pages", "docx", "txt_files", "txt_kb", "files", "repeat", "embedding_model")
+WORDS = (
+    "admission fee hostel library semester examination scholarship programme department faculty "
+    "eligibility deadline application merit transport canteen laboratory research thesis guide "
+    "syllabus credit attendance placement alumni campus registration counselling certificate "
+    "the a of to and in for is on with by at from are be this that will students college university"
+).split()
+MB = 1024 * 1024
+MIN_STAGE_SECONDS = 0.2
+ITEM_RATES = ("embeddings_per_s", "inserts_per_s", "chunks_per_s")
+
+
+# ──────────────────────────────────────────────
+# Corpora
+# ──────────────────────────────────────────────
+
+def sentences(rng: random.Random, count: int) -> List[str]:
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 24))).capitalize() + "." for _ in range(count)]
+
+
+def synthetic_pdf(pages: int, rng: random.Random) -> bytes:
+    """A text-only PDF with `pages` pages of about 45 lines each, written by hand (no PDF library needed)"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        lines = [line[:95] for line in sentences(rng, 45)]
+        text = "".join(f"({line}) Tj T* " for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 40 800 Td {text}ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects)))
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def synthetic_txt(count: int, size_kb: float, rng: random.Random) -> List[Tuple[str, bytes]]:
+    files = []
+    for i in range(count):
+        text = ""
+        while len(text) < size_kb * 1024:
+            text += " ".join(sentences(rng, 10)) + "\n\n"
+        files.append((f"notice_{i}.txt", text.encode()))
+    return files
+
+
+def read_files(paths: List[str]) -> List[Tuple[str, bytes]]:
+    return [(Path(path).name, Path(path).expanduser().read_bytes()) for path in paths]
+
+
+def build_corpora(args, rng: random.Random) -> Dict[str, List[Tuple[str, bytes]]]:
+    corpora = {}
+    if "pdf" in args.corpus:
+        corpora["pdf"] = [(f"synthetic_{args.pdf_pages}_pages.pdf", synthetic_pdf(args.pdf_pages, rng))] + read_files(args.pdf)
+    if "docx" in args.corpus:
+        docx_files = args.docx or ([str(EXPORT_DOCX)] if EXPORT_DOCX.exists() else [])
+        if docx_files:
+            corpora["docx"] = read_files(docx_files)
+        else:
+            print(f"skipping docx: {EXPORT_DOCX} not found and no --docx given")
+    if "txt" in args.corpus:
+        corpora["txt"] = synthetic_txt(args.txt_files, args.txt_kb, rng)
+    if "files" in args.corpus and args.files:
+        corpora["files"] = read_files(args.files)
+    return corpora
+
+
+# ──────────────────────────────────────────────
+# Measurement
+# ──────────────────────────────────────────────
+
+def process_peak_rss() -> int:
+    """Highest RSS of the process so far, in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss() -> int:
+    """Resident set size in bytes (Linux /proc; elsewhere the process peak so far)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return process_peak_rss()
+
+
+@contextmanager
+def peak_rss(interval: float = 0.005) -> Iterator[Dict[str, float]]:
+    """Highest RSS seen while the block runs, sampled by a background thread"""
+    result = {"peak_rss_mb": 0.0}
+    peak = current_rss()
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.wait(interval):
+            peak = max(peak, current_rss())
+
+    sampler = threading.Thread(target=sample, name="rss-sampler", daemon=True)
+    sampler.start()
+    try:
+        yield result
+    finally:
+        done.set()
+        sampler.join()
+        result["peak_rss_mb"] = round(max(peak, current_rss()) / MB, 1)
+
+
+def measure(run: Callable[[], Any], repeat: int, setup: Callable[[], None] = lambda: None) -> Tuple[float, float, Any]:
+    """
+    Median seconds over `repeat` runs, the peak RSS across them, and the last run's result.
+    Stages quicker than MIN_STAGE_SECONDS in total are run more often, so their rate is not noise.
+    """
+    timings, peak = [], 0.0
+    result = None
+    while len(timings) < repeat or sum(timings) < MIN_STAGE_SECONDS:
+        setup()
+        with peak_rss() as rss:
+            started = time.perf_counter()
+            result = run()
+            timings.append(time.perf_counter() - started)
+        peak = max(peak, rss["peak_rss_mb"])
+    return statistics.median(timings), peak, result
+
+
+def rates(seconds: float, **amounts: float) -> Dict[str, float]:
+    return {
+        "seconds": round(seconds, 4),
+        **{f"{name}_per_s": round(amount / seconds, 2) if seconds else 0.0 for name, amount in amounts.items()},
+    }
+
+
+# ──────────────────────────────────────────────
+# Stages
+# ──────────────────────────────────────────────
+
+def upload_file(name: str, content: bytes):
+    """The UploadFile a multipart request for this file would produce"""
+    from fastapi import UploadFile
+    from starlette.datastructures import Headers
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return UploadFile(file=io.BytesIO(content), filename=name, headers=Headers({"content-type": content_type}))
+
+
+def bench_corpus(name: str, files: List[Tuple[str, bytes]], args) -> Dict[str, Any]:
+    from app.core.database import get_chroma_client, get_chroma_collection, invalidate_chroma_collection
+    from app.services.document_service import document_service
+    from app.services.keyword_index import keyword_index
+
+    model = document_service.embedding_model
+    input_mb = sum(len(content) for _, content in files) / MB
+    stages = {}
+
+    seconds, rss, texts = measure(
+        lambda: [document_service.extract_text_from_file(upload_file(n, c)) for n, c in files], args.repeat
+    )
+    text_mb = sum(len(text.encode()) for text in texts) / MB
+    stages["extract"] = {**rates(seconds, mb=input_mb, text_mb=text_mb), "peak_rss_mb": rss}
+
+    seconds, rss, chunked = measure(lambda: [document_service.chunk_text(text) for text in texts], args.repeat)
+    chunk_count = sum(len(chunks) for chunks in chunked)
+    stages["chunk"] = {**rates(seconds, text_mb=text_mb, chunks=chunk_count), "peak_rss_mb": rss}
+
+    # One encode call per document, as process_and_store_document does
+    seconds, rss, embedded = measure(
+        lambda: [model.encode(chunks).tolist() if chunks else [] for chunks in chunked], args.repeat
+    )
+    stages["embed"] = {**rates(seconds, embeddings=chunk_count, text_mb=text_mb), "peak_rss_mb": rss}
+
+    collection_name = f"bench_ingest_{name}"
+    batches = []
+    for chunks, embeddings in zip(chunked, embedded):
+        doc_id = str(uuid.uuid4())
+        metadatas = [{"title": name, "doc_id": doc_id, "chunk_index": i, "upload_date": datetime.now().isoformat()}
+                     for i in range(len(chunks))]
+        batches.append((chunks, embeddings, metadatas, [f"{doc_id}_chunk_{i}" for i in range(len(chunks))], doc_id))
+
+    def fresh_collection():
+        try:
+            get_chroma_client().delete_collection(collection_name)
+        except Exception:
+            pass
+        invalidate_chroma_collection(collection_name)
+        keyword_index.drop_collection(collection_name)
+
+    def insert():
+        collection = get_chroma_collection(collection_name)
+        for chunks, embeddings, metadatas, ids, _ in batches:
+            if chunks:
+                collection.add(documents=chunks, embeddings=embeddings, metadatas=metadatas, ids=ids)
+
+    seconds, rss, _ = measure(insert, args.repeat, setup=fresh_collection)
+    stages["chroma_insert"] = {**rates(seconds, inserts=chunk_count), "peak_rss_mb": rss}
+
+    def index():
+        for chunks, _, _, ids, doc_id in batches:
+            keyword_index.add_chunks(collection_name, ids, chunks, doc_id)
+
+    seconds, rss, _ = measure(index, args.repeat, setup=lambda: keyword_index.drop_collection(collection_name))
+    stages["keyword_index"] = {**rates(seconds, chunks=chunk_count), "peak_rss_mb": rss}
+
+    def upload_all():
+        return sum(document_service.upload_document(upload_file(n, c), collection_name)["chunks_created"] for n, c in files)
+
+    seconds, rss, stored = measure(upload_all, args.repeat, setup=fresh_collection)
+    stages["end_to_end"] = {**rates(seconds, files=len(files), mb=input_mb, chunks=stored), "peak_rss_mb": rss}
+    fresh_collection()
+
+    return {
+        "files": len(files),
+        "input_mb": round(input_mb, 3),
+        "text_mb": round(text_mb, 3),
+        "chunks": chunk_count,
+        "stages": stages,
+    }
+
+
+# ──────────────────────────────────────────────
+# Report
+# ──────────────────────────────────────────────
+
+def print_report(report: Dict[str, Any]):
+    meta = report["meta"]
+    print(f"commit={meta['commit']} model={meta['args']['embedding_model']} repeat={meta['args']['repeat']} "
+          f"peak_rss={report['peak_rss_mb']} MB")
+    print(f"{'corpus':>6} {'stage':>14} | {'seconds':>9} {'MB/s':>9} {'text MB/s':>9} {'items/s':>10} | {'peak RSS MB':>11}")
+    for name, corpus in report["corpora"].items():
+        print(f"{name:>6} files={corpus['files']} input={corpus['input_mb']} MB text={corpus['text_mb']} MB chunks={corpus['chunks']}")
+        for stage, s in corpus["stages"].items():
+            items = next((s[k] for k in ITEM_RATES if k in s), "")
+            print(f"{'':>6} {stage:>14} | {s['seconds']:>9} {s.get('mb_per_s', ''):>9} {s.get('text_mb_per_s', ''):>9} "
+                  f"{items:>10} | {s['peak_rss_mb']:>11}")
+
+
+def compare_runs(baseline: Dict[str, Any], current: Dict[str, Any], args) -> int:
+    for difference in shape_differences(baseline, current, CORPUS_SHAPE):
+        print(f"warning: the runs used different corpora or settings ({difference})")
+    return int(print_comparison(compare(baseline, current, args.max_regression)))
+
+
+def configure(workdir: str):
+    """Throwaway storage for everything the document service writes; must run before the app is imported"""
+    os.environ.update({
+        "CHROMA_DB_PATH": os.path.join(workdir, "chroma"),
+        "SHARED_STATE_DB_PATH": os.path.join(workdir, "shared_state.db"),
+        "SESSION_DB_PATH": os.path.join(workdir, "sessions.db"),
+    })
+    for name, value in {"GROQ_API_KEY": "benchmark", "ADMIN_USERNAME": "benchmark", "ADMIN_PASSWORD": "benchmark",
+                        "ADMIN_SECRET_KEY": "benchmark-secret-key-of-at-least-32-bytes"}.items():
+        os.environ.setdefault(name, value)
+
+
+def run(args) -> int:
+    configure(tempfile.mkdtemp(prefix="chatbot_ingest_bench_"))
+    from app.core.config import settings
+    from app.services.document_service import document_service
+
+    document_service.embedding_model.encode(["warm up"])
+    corpora = build_corpora(args, random.Random(args.seed))
+    args.embedding_model = settings.EMBEDDING_MODEL
+
+    results = {name: bench_corpus(name, files, args) for name, files in corpora.items()}
+    report = {
+        "meta": run_metadata({k: v for k, v in vars(args).items() if k not in ("compare", "baseline")}),
+        "peak_rss_mb": round(process_peak_rss() / MB, 1),
+        "corpora": results,
+    }
+    print_report(report)
+    if args.json:
+        write_results(args.json, report)
+    if args.baseline:
+        print(f"\ncompared with {args.baseline}:")
+        return compare_runs(load_results(args.baseline), report, args)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", nargs="+", choices=CORPORA, default=list(CORPORA))
+    parser.add_argument("--pdf", nargs="*", default=[], help="real PDFs to add to the pdf corpus")
+    parser.add_argument("--pdf-pages", type=int, default=200, help="pages of the synthetic PDF")
+    parser.add_argument("--docx", nargs="*", default=[], help=f"DOCX files (default: {EXPORT_DOCX})")
+    parser.add_argument("--txt-files", type=int, default=500)
+    parser.add_argument("--txt-kb", type=float, default=2.0, help="size of each synthetic TXT file")
+    parser.add_argument("--files", nargs="*", default=[], help="other PDF/DOCX/TXT files, as their own corpus")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per stage; the median time is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare with an earlier results file; exit 1 on a regression")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two results files and exit")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="allowed relative drop of a rate, or growth of peak RSS")
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare_runs(load_results(args.compare[0]), load_results(args.compare[1]), args)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Deterministic OpenAI-compatible LLM server for offline load tests.
+
+Serves POST /v1/chat/completions (plain and streaming) from the stub provider, with the
+time to first token, tokens/second and error rate taken from the LLM_STUB_* settings or
+the flags below. Point the backend at it with LLM_PROVIDER=openai and
+OPENAI_BASE_URL=http://127.0.0.1:8001/v1 to exercise the real HTTP path and connection
+pool, or use LLM_PROVIDER=stub to skip HTTP altogether.
+
+Usage (from backend/):
+    python benchmarks/llm_stub_server.py
+    python benchmarks/llm_stub_server.py --port 8001 --ttft-ms 400 --tokens-per-second 60 --error-rate 0.02
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import uvicorn
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.core.config import settings  # noqa: E402
+from app.services.llm_providers import StubProvider, create_stub_app  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--ttft-ms", type=float, default=settings.LLM_STUB_TTFT_MS)
+    parser.add_argument("--tokens-per-second", type=float, default=settings.LLM_STUB_TOKENS_PER_SECOND)
+    parser.add_argument("--answer-tokens", type=int, default=settings.LLM_STUB_ANSWER_TOKENS)
+    parser.add_argument("--error-rate", type=float, default=settings.LLM_STUB_ERROR_RATE)
+    parser.add_argument("--seed", type=int, default=settings.LLM_STUB_SEED)
+    args = parser.parse_args()
+
+    stub = StubProvider(
+        ttft=args.ttft_ms / 1000,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        answer_tokens=args.answer_tokens,
+        seed=args.seed,
+    )
+    uvicorn.run(create_stub_app(stub), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
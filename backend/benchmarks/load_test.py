@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Offline load test of the chat API: /chat/, /chat/stream and document uploads at a given
+concurrency or arrival rate, against a seeded collection and the stub LLM.
+
+By default the app runs in this process (httpx's ASGI transport, no sockets) with
+LLM_PROVIDER=stub and a throwaway ChromaDB directory, so no tokens are spent and runs are
+repeatable. With --url it drives a running server instead; start that one with
+LLM_PROVIDER=stub (or the stub server) and SEMANTIC_CACHE_ENABLED=false for the same effect.
+
+Reported: throughput and error rate per scenario, client-side p50/p95/p99 latency, the
+server-side time to first token of streams, and p50/p95/p99 per pipeline stage, taken
+from the difference of the /metrics histograms before and after the run. The JSON file
+(--json) carries the commit it was produced on; --baseline compares a run with an earlier
+file and exits 1 on a regression past --max-regression, and --compare compares two files
+without running anything.
+
+Usage (from backend/):
+    python benchmarks/load_test.py --requests 500 --concurrency 16 --json load.json
+    python benchmarks/load_test.py --rate 20 --duration 60 --mix chat=0.5,stream=0.5
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --requests 200 --seed-docs 0
+    python benchmarks/load_test.py --requests 500 --concurrency 16 --baseline load.json
+    python benchmarks/load_test.py --compare before.json after.json --max-regression 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from results import (  # noqa: E402
+    compare, load_results, print_comparison, run_metadata, shape_differences, summarize_ms, write_results
+)
+
+API = "/api/v1"
+SCENARIOS = ("chat", "stream", "upload")
+LOAD_SHAPE = ("url", "mix", "requests", "duration", "concurrency", "rate", "seed_docs", "upload_sentences",
+              "semantic_cache", "stub_ttft_ms", "stub_tokens_per_second", "stub_error_rate")
+TOPICS = {
+    "hostel": "The hostel fee is {n},000 rupees per year and is paid in two instalments. Rooms are allotted by merit.",
+    "library": "The library opens at {n} am on weekdays and stays open until 8 pm during examinations.",
+    "admission": "Admission to the BSc programme needs {n} percent in the qualifying examination and an entrance test.",
+    "scholarship": "Merit scholarships cover up to {n} percent of tuition for students in the top rank bracket.",
+    "transport": "College buses leave the main gate every {n} minutes between 7 am and 6 pm.",
+    "exams": "Semester examinations start in week {n} and hall tickets are issued a week earlier.",
+}
+QUESTIONS = [
+    "What is the hostel fee?", "When does the library open?", "What marks do I need for BSc admission?",
+    "How much do merit scholarships cover?", "How often do the college buses run?", "When do the semester exams start?",
+    "Are hostel rooms allotted by merit?", "Is there an entrance test for admission?",
+]
+
+
+# ──────────────────────────────────────────────
+# Setup
+# ──────────────────────────────────────────────
+
+def configure_in_process(args) -> Any:
+    """Environment for an offline app in this process; must run before the app is imported"""
+    workdir = tempfile.mkdtemp(prefix="chatbot_load_test_")
+    os.environ.update({
+        "LLM_PROVIDER": "stub",
+        "LLM_STUB_TTFT_MS": str(args.stub_ttft_ms),
+        "LLM_STUB_TOKENS_PER_SECOND": str(args.stub_tokens_per_second),
+        "LLM_STUB_ERROR_RATE": str(args.stub_error_rate),
+        "CHROMA_DB_PATH": os.path.join(workdir, "chroma"),
+        "SESSION_DB_PATH": os.path.join(workdir, "sessions.db"),
+        "SHARED_STATE_DB_PATH": os.path.join(workdir, "shared_state.db"),
+        "SLOW_LOG_PATH": os.path.join(workdir, "slow_requests.jsonl"),
+        "SEMANTIC_CACHE_ENABLED": str(args.semantic_cache).lower(),
+        "RATE_LIMIT_PER_MINUTE": "0",
+        "METRICS_ENABLED": "true",
+    })
+    for name, value in {"GROQ_API_KEY": "load-test", "ADMIN_USERNAME": "loadtest", "ADMIN_PASSWORD": "loadtest",
+                        "ADMIN_SECRET_KEY": "load-test-secret-key-of-at-least-32-bytes"}.items():
+        os.environ.setdefault(name, value)
+
+    from app.main import app
+    return app
+
+
+def make_client(args) -> httpx.AsyncClient:
+    timeout = httpx.Timeout(args.timeout)
+    if args.url:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        return httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits)
+    app = configure_in_process(args)
+    # Unhandled errors in the app come back as 500s, as they would from a server
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout)
+
+
+def synthetic_documents(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    names = list(TOPICS)
+    documents = []
+    for i in range(count):
+        topic = names[i % len(names)]
+        body = " ".join(TOPICS[t].format(n=rng.randint(2, 90)) for t in [topic] + rng.sample(names, 2))
+        documents.append({"title": f"{topic.title()} notice {i}", "content": body, "metadata": {"topic": topic}})
+    return documents
+
+
+async def seed(client: httpx.AsyncClient, args, rng: random.Random):
+    documents = synthetic_documents(args.seed_docs, rng)
+    for start in range(0, len(documents), 50):
+        r = await client.post(f"{API}/documents/bulk-embed", params={"collection_name": args.collection},
+                              json={"documents": documents[start:start + 50]})
+        r.raise_for_status()
+
+
+# ──────────────────────────────────────────────
+# Scenarios
+# ──────────────────────────────────────────────
+
+def question(rng: random.Random) -> str:
+    # Distinct texts, so the query embedding cache does not skip the encode; the semantic
+    # answer cache still matches them, which is why it is off in process unless asked for
+    return f"{rng.choice(QUESTIONS)} (ref {rng.randrange(10 ** 6)})"
+
+
+async def chat(client: httpx.AsyncClient, args, rng: random.Random) -> Dict[str, Any]:
+    r = await client.post(f"{API}/chat/", json={"message": question(rng), "collection_name": args.collection})
+    return {"ok": r.status_code == 200, "status": r.status_code}
+
+
+async def stream(client: httpx.AsyncClient, args, rng: random.Random) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"ok": False}
+    async with client.stream("POST", f"{API}/chat/stream",
+                             json={"message": question(rng), "collection_name": args.collection}) as r:
+        result["status"] = r.status_code
+        event = None
+        async for line in r.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+                # Over ASGITransport the body arrives in one piece, so only a server shows the first token
+                if event == "token" and args.url and "first_token" not in result:
+                    result["first_token"] = time.perf_counter()
+            elif line.startswith("data: ") and event in ("done", "error"):
+                data = json.loads(line[len("data: "):])
+                if event == "error":
+                    result["error"] = data.get("detail", "error event")
+                    return result
+                result["timings"] = data.get("timings", {})
+                result["ok"] = r.status_code == 200
+    return result
+
+
+async def upload(client: httpx.AsyncClient, args, rng: random.Random) -> Dict[str, Any]:
+    text = " ".join(rng.choice(list(TOPICS.values())).format(n=rng.randint(2, 90)) for _ in range(args.upload_sentences))
+    r = await client.post(
+        f"{API}/documents/upload",
+        files={"file": (f"load_{rng.randrange(10 ** 9)}.txt", text.encode(), "text/plain")},
+        data={"collection_name": f"{args.collection}_uploads"},
+    )
+    return {"ok": r.status_code == 200 and r.json().get("success", True), "status": r.status_code}
+
+
+RUNNERS = {"chat": chat, "stream": stream, "upload": upload}
+
+
+async def timed(client: httpx.AsyncClient, args, kind: str, rng: random.Random) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        result = await RUNNERS[kind](client, args, rng)
+    except httpx.HTTPError as e:
+        result = {"ok": False, "error": repr(e)}
+    result["kind"] = kind
+    result["latency"] = time.perf_counter() - started
+    if "first_token" in result:
+        result["first_token"] -= started
+    return result
+
+
+# ──────────────────────────────────────────────
+# Load shapes
+# ──────────────────────────────────────────────
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {kind!r}; expected one of {', '.join(SCENARIOS)}")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+async def run_load(client: httpx.AsyncClient, args, rng: random.Random, count: Optional[int]) -> Tuple[List[Dict[str, Any]], float]:
+    """
+    Closed loop (no --rate): `concurrency` clients send one request after another.
+    Open loop (--rate): Poisson arrivals at `rate` per second, at most `concurrency` in
+    flight; arrivals beyond that wait, and the wait is part of their latency.
+    Stops after `count` requests, or after --duration seconds when count is None.
+    """
+    kinds, weights = zip(*args.mix.items())
+    deadline = time.perf_counter() + args.duration if count is None else None
+    issued = 0
+    results: List[Dict[str, Any]] = []
+
+    def more() -> bool:
+        nonlocal issued
+        if (count is not None and issued >= count) or (deadline is not None and time.perf_counter() >= deadline):
+            return False
+        issued += 1
+        return True
+
+    started = time.perf_counter()
+    if not args.rate:
+        async def worker():
+            while more():
+                results.append(await timed(client, args, rng.choices(kinds, weights)[0], rng))
+
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    else:
+        in_flight = asyncio.Semaphore(args.concurrency)
+
+        async def arrival(kind):
+            arrived = time.perf_counter()
+            async with in_flight:
+                result = await timed(client, args, kind, rng)
+            result["latency"] = time.perf_counter() - arrived
+            results.append(result)
+
+        tasks = []
+        while more():
+            tasks.append(asyncio.ensure_future(arrival(rng.choices(kinds, weights)[0])))
+            await asyncio.sleep(rng.expovariate(args.rate))
+        await asyncio.gather(*tasks)
+    return results, time.perf_counter() - started
+
+
+# ──────────────────────────────────────────────
+# Server-side stage timings from /metrics
+# ──────────────────────────────────────────────
+
+SAMPLE = re.compile(r"^(\w+)(?:\{(.*)\})? (\S+)$")
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+async def scrape(client: httpx.AsyncClient) -> Dict[Tuple[str, Tuple], float]:
+    r = await client.get("/metrics")
+    if r.status_code != 200:
+        return {}
+    samples = {}
+    for line in r.text.splitlines():
+        match = SAMPLE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            samples[(name, tuple(sorted(LABEL.findall(labels or ""))))] = float(value)
+    return samples
+
+
+def histogram_quantile(q: float, buckets: List[Tuple[float, float]]) -> Optional[float]:
+    """Interpolated quantile from cumulative (upper bound, count) buckets, as Prometheus does"""
+    total = buckets[-1][1] if buckets else 0
+    if not total:
+        return None
+    rank = q * total
+    lower, below = 0.0, 0.0
+    for bound, cumulative in buckets:
+        if cumulative >= rank:
+            if bound == float("inf"):
+                return lower
+            return lower + (bound - lower) * (rank - below) / max(cumulative - below, 1e-12)
+        lower, below = bound, cumulative
+    return lower
+
+
+def stage_percentiles(before, after, metric: str, label: str) -> Dict[str, Dict[str, float]]:
+    """p50/p95/p99 (ms) and count per label value of a histogram, over the run only"""
+    buckets: Dict[str, List[Tuple[float, float]]] = defaultdict(list)
+    for (name, labels), value in after.items():
+        if name != f"{metric}_bucket":
+            continue
+        labels_dict = dict(labels)
+        delta = value - before.get((name, labels), 0.0)
+        buckets[labels_dict.get(label, "")].append((float(labels_dict["le"]), delta))
+
+    stages = {}
+    for key, series in sorted(buckets.items()):
+        series.sort()
+        if not series[-1][1]:
+            continue
+        stages[key] = {
+            **{f"p{int(q * 100)}": round(histogram_quantile(q, series) * 1000, 2) for q in (0.5, 0.95, 0.99)},
+            "count": int(series[-1][1]),
+        }
+    return stages
+
+
+def counter_deltas(before, after, metric: str, label: str) -> Dict[str, int]:
+    return {
+        dict(labels).get(label, ""): int(value - before.get((name, labels), 0.0))
+        for (name, labels), value in sorted(after.items())
+        if name == f"{metric}_total" and value - before.get((name, labels), 0.0)
+    }
+
+
+# ──────────────────────────────────────────────
+# Report
+# ──────────────────────────────────────────────
+
+def summarize(results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    scenarios = {}
+    for kind in SCENARIOS:
+        runs = [r for r in results if r["kind"] == kind]
+        if not runs:
+            continue
+        ok = [r for r in runs if r["ok"]]
+        errors = defaultdict(int)
+        for r in runs:
+            if not r["ok"]:
+                errors[r.get("error") or str(r.get("status"))] += 1
+        summary = {
+            "requests": len(runs),
+            "errors": len(runs) - len(ok),
+            "error_rate": round((len(runs) - len(ok)) / len(runs), 4),
+            "throughput_per_s": round(len(ok) / elapsed, 2),
+            "latency_ms": summarize_ms(r["latency"] for r in ok),
+            "error_kinds": dict(errors),
+        }
+        if kind == "stream":
+            summary["client_ttft_ms"] = summarize_ms(r["first_token"] for r in ok if "first_token" in r)
+            summary["server_ttft_ms"] = summarize_ms(r["timings"]["ttft_ms"] / 1000 for r in ok if "ttft_ms" in r["timings"])
+        scenarios[kind] = summary
+    ok_total = sum(s["requests"] - s["errors"] for s in scenarios.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "total": {
+            "requests": len(results),
+            "error_rate": round(1 - ok_total / len(results), 4) if results else 0.0,
+            "throughput_per_s": round(ok_total / elapsed, 2) if elapsed else 0.0,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    meta = report["meta"]
+    print(f"commit={meta['commit']} mode={meta['mode']} elapsed={report['elapsed_s']}s "
+          f"requests={report['total']['requests']} throughput={report['total']['throughput_per_s']}/s "
+          f"error_rate={report['total']['error_rate']:.2%}")
+    print(f"{'scenario':>10} | {'requests':>8} {'errors':>6} {'req/s':>8} | {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for kind, s in report["scenarios"].items():
+        latency = s["latency_ms"] or {k: "-" for k in ("p50", "p95", "p99", "max")}
+        print(f"{kind:>10} | {s['requests']:>8} {s['errors']:>6} {s['throughput_per_s']:>8} | "
+              f"{latency['p50']:>8} {latency['p95']:>8} {latency['p99']:>8} {latency['max']:>8}")
+        if s.get("client_ttft_ms"):
+            t = s["client_ttft_ms"]
+            print(f"{'ttft':>10} | {'':>8} {'':>6} {'':>8} | {t['p50']:>8} {t['p95']:>8} {t['p99']:>8} {t['max']:>8}")
+    for group in ("chat_stages_ms", "ingest_stages_ms"):
+        if report.get(group):
+            print(f"{group:>16} | {'count':>6} | {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+            for stage, s in report[group].items():
+                print(f"{stage:>16} | {s['count']:>6} | {s['p50']:>8} {s['p95']:>8} {s['p99']:>8}")
+    if report.get("answers"):
+        print("answers: " + ", ".join(f"{source}={count}" for source, count in report["answers"].items()))
+
+
+async def run(args) -> int:
+    rng = random.Random(args.random_seed)
+    async with make_client(args) as client:
+        if args.seed_docs:
+            await seed(client, args, rng)
+        if args.warmup:
+            await run_load(client, args, rng, args.warmup)
+
+        before = await scrape(client)
+        results, elapsed = await run_load(client, args, rng, None if args.duration else args.requests)
+        after = await scrape(client)
+
+    report = {
+        "meta": {**run_metadata({k: v for k, v in vars(args).items() if k not in ("compare", "baseline")}),
+                 "mode": args.url or "in-process"},
+        **summarize(results, elapsed),
+        "chat_stages_ms": stage_percentiles(before, after, "chatbot_chat_stage_seconds", "stage"),
+        "ingest_stages_ms": stage_percentiles(before, after, "chatbot_ingest_stage_seconds", "stage"),
+        "answers": counter_deltas(before, after, "chatbot_chat_answers", "source"),
+    }
+    print_report(report)
+    if args.json:
+        write_results(args.json, report)
+
+    if args.baseline:
+        print(f"\ncompared with {args.baseline}:")
+        return compare_runs(load_results(args.baseline), report, args)
+    return 0
+
+
+def compare_runs(baseline: Dict[str, Any], current: Dict[str, Any], args) -> int:
+    for difference in shape_differences(baseline, current, LOAD_SHAPE):
+        print(f"warning: the runs used different load ({difference})")
+    rows = compare(baseline, current, args.max_regression, args.max_error_rate_increase)
+    return int(print_comparison(rows))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server; default: the app in this process")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("chat=0.6,stream=0.3,upload=0.1"),
+                        help="scenario weights, e.g. chat=0.5,stream=0.5")
+    parser.add_argument("--requests", type=int, default=200, help="requests to send (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="send requests for this many seconds instead")
+    parser.add_argument("--concurrency", type=int, default=16, help="clients (closed loop) or max in flight (--rate)")
+    parser.add_argument("--rate", type=float, help="open loop: Poisson arrivals per second")
+    parser.add_argument("--warmup", type=int, default=10, help="requests sent before measuring")
+    parser.add_argument("--collection", default="loadtest")
+    parser.add_argument("--seed-docs", type=int, default=60, help="synthetic documents embedded before the run")
+    parser.add_argument("--upload-sentences", type=int, default=200, help="size of each uploaded text file")
+    parser.add_argument("--random-seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--semantic-cache", action="store_true", help="in-process: leave the semantic answer cache on")
+    parser.add_argument("--stub-ttft-ms", type=float, default=300.0, help="in-process: stub LLM time to first token")
+    parser.add_argument("--stub-tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare with an earlier results file; exit 1 on a regression")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two results files and exit")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="allowed relative p95/p99 latency increase or throughput drop")
+    parser.add_argument("--max-error-rate-increase", type=float, default=0.01)
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare_runs(load_results(args.compare[0]), load_results(args.compare[1]), args)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Relevance threshold tuning: measure an evaluation set against a collection and pick the
+distance cut that skips the LLM for off-topic questions without rejecting in-scope ones.
+
+The eval file is JSON: {"in_scope": ["question", ...], "out_of_scope": ["question", ...]}.
+Prints the recall / rejection curve and the chosen threshold; --apply saves it for the
+collection (same as POST /api/v1/admin/relevance/{collection}/calibrate).
+
+Usage (from backend/, with .env configured):
+    python benchmarks/relevance_threshold.py --eval benchmarks/relevance_eval.example.json
+    python benchmarks/relevance_threshold.py --collection default --target-recall 0.98 --apply --json report.json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.core.config import settings  # noqa: E402
+from app.services.relevance_gate import relevance_gate  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--eval", default=str(Path(__file__).with_name("relevance_eval.example.json")))
+    parser.add_argument("--collection", default="default")
+    parser.add_argument("--target-recall", type=float, default=settings.RELEVANCE_TARGET_RECALL)
+    parser.add_argument("--apply", action="store_true", help="save the chosen threshold for the collection")
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    with open(args.eval, "r", encoding="utf-8") as f:
+        eval_set = json.load(f)
+
+    report = relevance_gate.calibrate(
+        args.collection,
+        eval_set["in_scope"],
+        eval_set.get("out_of_scope", []),
+        args.target_recall,
+        apply=args.apply,
+    )
+
+    print(f"{'threshold':>10} {'recall':>8} {'rejected':>9}")
+    for point in report["curve"]:
+        marker = "  <- chosen" if point["threshold"] == report["threshold"] else ""
+        print(f"{point['threshold']:>10.4f} {point['recall']:>8.2%} {point['rejection_rate']:>9.2%}{marker}")
+    print(
+        f"\nCollection '{args.collection}': threshold {report['threshold']:.4f} "
+        f"(recall {report['recall']:.2%}, off-topic rejected {report['rejection_rate']:.2%})"
+        + (" - saved" if args.apply else "")
+    )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
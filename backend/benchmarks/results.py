@@ -0,0 +1,141 @@
+"""
+Shared helpers for benchmark result files: latency summaries, run metadata and the
+regression check that compares a run against a baseline file from another commit.
+
+A metric's direction is read from its name: latencies (`..._ms[.stage].p95`, `..._seconds`)
+and memory (`peak_rss_mb`) must not grow, rates (`..._per_s`, `throughput...`) must not shrink,
+and `error_rate` may only rise by an absolute amount. Other numbers are informational.
+"""
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+LATENCY_KEYS = ("p50", "p95", "p99")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize_ms(seconds: Iterable[float]) -> Optional[Dict[str, float]]:
+    """p50/p95/p99/mean/max in milliseconds, or None without samples"""
+    values = [s * 1000 for s in seconds]
+    if not values:
+        return None
+    return {
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+        "mean": round(sum(values) / len(values), 2),
+        "max": round(max(values), 2),
+    }
+
+
+def run_metadata(args: Dict[str, Any]) -> Dict[str, Any]:
+    """Where a result came from, so files from different commits can be told apart"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "args": args,
+    }
+
+
+def write_results(path: str, results: Dict[str, Any]):
+    Path(path).write_text(json.dumps(results, indent=2))
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text())
+
+
+def flatten(data: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def direction(path: str) -> Optional[str]:
+    """"lower" or "higher" is better, "error" for error rates, None for informational numbers"""
+    if path.startswith("meta."):
+        return None
+    name = path.rsplit(".", 1)[-1]
+    if name == "error_rate":
+        return "error"
+    if "_per_s" in name or name.startswith("throughput"):
+        return "higher"
+    if name.endswith("rss_mb"):
+        return "lower"
+    if name in LATENCY_KEYS and any(part.endswith("_ms") for part in path.split(".")[:-1]):
+        return "lower"
+    if name.endswith("_seconds"):
+        return "lower"
+    return None
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    max_regression: float = 0.10,
+    max_error_rate_increase: float = 0.01,
+    min_delta_ms: float = 1.0,
+) -> List[Dict[str, Any]]:
+    """
+    Metrics present in both results, with their relative change and whether it is a
+    regression. Millisecond latencies must also grow by `min_delta_ms`, so stages that
+    take a millisecond or two do not flag on noise.
+    """
+    before, after = flatten(baseline), flatten(current)
+    rows = []
+    for path in sorted(set(before) & set(after)):
+        kind = direction(path)
+        if kind is None:
+            continue
+        old, new = before[path], after[path]
+        change = (new - old) / old if old else None
+        if kind == "error":
+            regressed = new - old > max_error_rate_increase
+        elif kind == "lower":
+            regressed = change is not None and change > max_regression
+            if regressed and any(part.endswith("_ms") for part in path.split(".")):
+                regressed = new - old >= min_delta_ms
+        else:
+            regressed = change is not None and change < -max_regression
+        rows.append({"metric": path, "baseline": old, "current": new, "change": change, "regressed": regressed})
+    return rows
+
+
+def shape_differences(baseline: Dict[str, Any], current: Dict[str, Any], keys: Iterable[str]) -> List[str]:
+    """Arguments that shape the load and differ between two runs, which makes them hard to compare"""
+    before = baseline.get("meta", {}).get("args", {})
+    after = current.get("meta", {}).get("args", {})
+    return [f"{key}: {before.get(key)} -> {after.get(key)}" for key in keys if before.get(key) != after.get(key)]
+
+
+def print_comparison(rows: List[Dict[str, Any]]) -> bool:
+    """Print the comparison table; True if anything regressed"""
+    width = max((len(r["metric"]) for r in rows), default=6)
+    print(f"{'metric':<{width}} | {'baseline':>12} {'current':>12} {'change':>8}")
+    for r in rows:
+        change = f"{r['change'] * 100:+.1f}%" if r["change"] is not None else "n/a"
+        flag = "  REGRESSION" if r["regressed"] else ""
+        print(f"{r['metric']:<{width}} | {r['baseline']:>12.2f} {r['current']:>12.2f} {change:>8}{flag}")
+    regressions = [r for r in rows if r["regressed"]]
+    print(f"{len(regressions)} regression(s) in {len(rows)} compared metrics")
+    return bool(regressions)
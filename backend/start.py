@@ -23,7 +23,13 @@ if __name__ == "__main__":
         print("Please set GROQ_API_KEY in your .env file.")
         sys.exit(1)
     
+    # WORKERS > 1 runs one process per worker; sessions, the semantic cache and
+    # rate-limit counters are then shared through local SQLite files (see README)
+    workers = int(os.getenv("WORKERS", "1"))
+
     print("Starting Chatbot Backend...")
+    if workers > 1:
+        print(f"Workers: {workers} (shared state in {os.getenv('SHARED_STATE_DB_PATH', './shared_state.db')})")
     print("API Documentation: http://localhost:8000/docs")
     print("API Base URL: http://localhost:8000/api/v1")
     
@@ -31,6 +37,8 @@ if __name__ == "__main__":
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        # Reload only supports a single process
+        reload=workers == 1,
+        workers=workers,
         log_level="info"
     )
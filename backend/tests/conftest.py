@@ -0,0 +1,150 @@
+import asyncio
+import os
+import shutil
+import socket
+import string
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+# Settings are read when the app is first imported, so the test configuration goes in
+# before any test module is collected
+_test_db_dir = tempfile.mkdtemp(prefix="chatbot_test_chroma_")
+os.environ.setdefault("CHROMA_DB_PATH", _test_db_dir)
+os.environ.setdefault("ADMIN_USERNAME", "testadmin")
+os.environ.setdefault("ADMIN_PASSWORD", "testpass123")
+os.environ.setdefault("ADMIN_SECRET_KEY", "test-secret-key-for-jwt-minimum-32bytes!")
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+
+def _hub_reachable() -> bool:
+    if os.environ.get("HF_HUB_OFFLINE"):
+        return False
+    try:
+        socket.create_connection(("huggingface.co", 443), timeout=3).close()
+        return True
+    except OSError:
+        return False
+
+
+# Offline, only look at models already on disk instead of retrying the Hub for minutes per model
+if not _hub_reachable():
+    os.environ["HF_HUB_OFFLINE"] = "1"
+
+
+def _build_offline_embedding_model(path: str) -> str:
+    """
+    A small sentence-transformers model that needs no download: a random vector per
+    character bigram, averaged. Texts sharing more bigrams embed closer, which is all the
+    tests need from the embeddings (they check the pipeline, not embedding quality).
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import BertConfig, BertModel, BertTokenizer
+
+    specials = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    chars = string.ascii_lowercase + string.digits
+    pieces = list(chars) + [a + b for a in chars for b in chars]
+    vocab = specials + list(string.punctuation) + pieces + [f"##{piece}" for piece in pieces]
+    bert_dir = os.path.join(path, "bert")
+    os.makedirs(bert_dir)
+    vocab_file = os.path.join(path, "vocab.txt")
+    with open(vocab_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab))
+    BertTokenizer(vocab_file).save_pretrained(bert_dir)
+
+    # No transformer layers and no position embeddings: a token's output is its own vector
+    torch.manual_seed(0)
+    bert = BertModel(BertConfig(
+        vocab_size=len(vocab), hidden_size=128, num_hidden_layers=0, num_attention_heads=1,
+        intermediate_size=128, max_position_embeddings=512,
+    ))
+    with torch.no_grad():
+        bert.embeddings.position_embeddings.weight.zero_()
+        bert.embeddings.token_type_embeddings.weight.zero_()
+        bert.embeddings.word_embeddings.weight[:len(specials)].zero_()
+    bert.save_pretrained(bert_dir)
+
+    word_embeddings = models.Transformer(bert_dir, max_seq_length=256)
+    pooling = models.Pooling(word_embeddings.get_word_embedding_dimension())
+    model_dir = os.path.join(path, "model")
+    SentenceTransformer(modules=[word_embeddings, pooling, models.Normalize()]).save(model_dir)
+    return model_dir
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _embedding_model(tmp_path_factory):
+    """
+    Load the embedding model once, before any test embeds. If EMBEDDING_MODEL cannot be
+    loaded (offline without a cached copy), a tiny local model is built and used instead.
+    """
+    from app.core import database
+    from app.core.config import settings
+
+    try:
+        database.get_embedding_model()
+    except Exception as exc:
+        print(f"\nEmbedding model {settings.EMBEDDING_MODEL!r} unavailable ({exc}); using a tiny offline model")
+        model_dir = _build_offline_embedding_model(str(tmp_path_factory.mktemp("embedding_model")))
+        # Also exported for the worker processes tests start
+        settings.EMBEDDING_MODEL = os.environ["EMBEDDING_MODEL"] = model_dir
+        database.get_embedding_model.cache_clear()
+        database.get_embedding_model()
+    yield
+    shutil.rmtree(_test_db_dir, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def _closed_llm_circuit():
+    """A provider outage one test provokes (or hits offline) must not trip the circuit for the next"""
+    yield
+    gateway = sys.modules.get("app.services.llm_gateway")
+    if gateway is not None:
+        gateway.llm_gateway.breaker.record_success()
+
+
+@pytest.fixture
+def admin_headers():
+    """Authorization headers for the test admin"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    token = TestClient(app).post("/api/v1/admin/login", json={
+        "username": "testadmin", "password": "testpass123"
+    }).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """
+    Replace the provider's completion call: fake_llm(answer) answers every request with
+    `answer` (a string, or a function of the request kwargs, which may also raise) after
+    `delay` seconds; fake_llm(stream=tokens) streams the tokens `delay` seconds apart.
+    Returns the list of request kwargs received.
+    """
+    from app.services.chat_service import chat_service
+
+    def install(answer="ok", delay=0.0, stream=None):
+        calls = []
+
+        async def fake_create(**kwargs):
+            calls.append(kwargs)
+            if stream is not None:
+                assert kwargs["stream"] is True
+
+                async def chunks():
+                    for token in stream:
+                        await asyncio.sleep(delay)
+                        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+                return chunks()
+            await asyncio.sleep(delay)
+            content = answer(kwargs) if callable(answer) else answer
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+        monkeypatch.setattr(chat_service.groq_client.chat.completions, "create", fake_create)
+        return calls
+
+    return install
@@ -0,0 +1,83 @@
+"""
+Concurrency tests for the chat pipeline.
+Drives the real FastAPI app in-process and checks that concurrent chat
+requests overlap on one event loop instead of running one after another.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.main import app
+from app.services.chat_service import chat_service
+from app.services.semantic_cache import semantic_cache
+
+LLM_DELAY = 0.5
+CONCURRENT_REQUESTS = 8
+
+
+# ──────────────────────────────────────────────
+# Fixtures
+# ──────────────────────────────────────────────
+
+@pytest.fixture(autouse=True)
+def _slow_llm(fake_llm):
+    """Replace the upstream completion call with one that takes LLM_DELAY seconds."""
+    fake_llm("ok", delay=LLM_DELAY)
+    chat_service.chat_sessions.clear()
+    semantic_cache.clear()
+    yield
+    chat_service.chat_sessions.clear()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _seed_collection():
+    from fastapi.testclient import TestClient
+    TestClient(app).post("/api/v1/documents/embed", json={
+        "content": "Vimala College in Thrissur offers BCom, BSc and BA programmes.",
+        "title": "Concurrency Seed",
+    })
+    yield
+
+
+async def _send_chats(n):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        return await asyncio.gather(*[
+            ac.post("/api/v1/chat/", json={"message": f"What courses are offered? #{i}"})
+            for i in range(n)
+        ])
+
+
+# ──────────────────────────────────────────────
+# Tests
+# ──────────────────────────────────────────────
+
+class TestChatConcurrency:
+    def test_concurrent_chats_overlap(self):
+        start = time.perf_counter()
+        responses = asyncio.run(_send_chats(CONCURRENT_REQUESTS))
+        elapsed = time.perf_counter() - start
+
+        assert all(r.status_code == 200 for r in responses)
+        assert all(r.json()["response"] == "ok" for r in responses)
+        # Serialized handling would take CONCURRENT_REQUESTS * LLM_DELAY seconds
+        assert elapsed < CONCURRENT_REQUESTS * LLM_DELAY / 2
+
+    def test_event_loop_free_during_llm_call(self):
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+                chat_task = asyncio.create_task(ac.post("/api/v1/chat/", json={"message": "Tell me about fees"}))
+                await asyncio.sleep(0.05)
+                start = time.perf_counter()
+                health = await ac.get("/health")
+                health_latency = time.perf_counter() - start
+                await chat_task
+                return health, health_latency
+
+        health, health_latency = asyncio.run(scenario())
+        assert health.status_code == 200
+        assert health_latency < LLM_DELAY
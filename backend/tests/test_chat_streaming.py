@@ -0,0 +1,204 @@
+"""
+Streaming tests for POST /chat/stream.
+Uses a fake token stream in place of the upstream LLM so time-to-first-token
+and history recording can be checked without network access.
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.chat import ChatMessage
+from app.services.chat_service import chat_service
+from app.services.semantic_cache import semantic_cache
+
+client = TestClient(app)
+
+TOKENS = ["Vimala ", "College ", "offers ", "BCom."]
+TOKEN_DELAY = 0.2
+
+
+def parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+# ──────────────────────────────────────────────
+# Fixtures
+# ──────────────────────────────────────────────
+
+@pytest.fixture(autouse=True)
+def _fake_token_stream(fake_llm):
+    """Stream TOKENS one by one, TOKEN_DELAY seconds apart."""
+    fake_llm(stream=TOKENS, delay=TOKEN_DELAY)
+    chat_service.chat_sessions.clear()
+    semantic_cache.clear()
+    yield
+    chat_service.chat_sessions.clear()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _seed_collection():
+    client.post("/api/v1/documents/embed", json={
+        "content": "Vimala College in Thrissur offers BCom, BSc and BA programmes.",
+        "title": "Streaming Seed",
+    })
+    yield
+
+
+# ──────────────────────────────────────────────
+# Tests
+# ──────────────────────────────────────────────
+
+class TestChatStreaming:
+    def test_event_order_and_payloads(self):
+        r = client.post("/api/v1/chat/stream", json={"message": "Which courses are offered?"})
+        assert r.status_code == 200
+        events = parse_sse(r.text)
+
+        assert events[0][0] == "sources"
+        assert events[0][1]["sources"]
+        assert [data["content"] for event, data in events if event == "token"] == TOKENS
+        event, done = events[-1]
+        assert event == "done"
+        assert done["session_id"] == events[0][1]["session_id"]
+        assert set(done["timings"]) >= {"retrieval_ms", "ttft_ms", "total_ms"}
+
+    def test_first_token_arrives_before_generation_finishes(self):
+        r = client.post("/api/v1/chat/stream", json={"message": "Which courses are offered?"})
+        timings = parse_sse(r.text)[-1][1]["timings"]
+        assert timings["ttft_ms"] < timings["total_ms"] - (len(TOKENS) - 2) * TOKEN_DELAY * 1000
+
+    def test_tokens_are_flushed_incrementally(self):
+        # TestClient buffers whole responses, so drive the ASGI app directly and timestamp each body chunk
+        async def scenario():
+            body = json.dumps({"message": "Which courses are offered?"}).encode()
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+                "method": "POST", "scheme": "http", "path": "/api/v1/chat/stream",
+                "raw_path": b"/api/v1/chat/stream", "query_string": b"", "root_path": "",
+                "headers": [(b"content-type", b"application/json")],
+                "client": ("test", 1), "server": ("test", 80),
+            }
+            requests = [{"type": "http.request", "body": body, "more_body": False}]
+            arrivals = []
+            start = time.perf_counter()
+
+            async def receive():
+                if requests:
+                    return requests.pop()
+                await asyncio.sleep(3600)
+
+            async def send(event):
+                if event["type"] == "http.response.body" and b"event: token" in event.get("body", b""):
+                    arrivals.append(time.perf_counter() - start)
+
+            await app(scope, receive, send)
+            return arrivals
+
+        arrivals = asyncio.run(scenario())
+        assert len(arrivals) == len(TOKENS)
+        assert arrivals[-1] - arrivals[0] >= (len(TOKENS) - 1) * TOKEN_DELAY * 0.8
+
+    def test_history_recorded_after_stream(self):
+        r = client.post("/api/v1/chat/stream", json={"message": "Which courses are offered?"})
+        sid = parse_sse(r.text)[-1][1]["session_id"]
+        history = chat_service.get_chat_history(sid)
+        assert [m["role"] for m in history] == ["user", "assistant"]
+        assert history[1]["content"] == "".join(TOKENS)
+
+    def test_history_recorded_when_stream_is_cancelled(self):
+        async def scenario():
+            message = ChatMessage(message="Which courses are offered?", session_id="cancelled-stream")
+
+            async def consume():
+                async for event, _ in chat_service.stream_chat_message(message):
+                    if event == "token":
+                        task.cancel()
+
+            task = asyncio.ensure_future(consume())
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            await asyncio.sleep(0.2)
+
+        asyncio.run(scenario())
+        history = chat_service.get_chat_history("cancelled-stream")
+        assert [m["content"] for m in history] == ["Which courses are offered?", TOKENS[0]]
+
+
+# ──────────────────────────────────────────────
+# WebSocket channel
+# ──────────────────────────────────────────────
+
+def receive_until_done(ws):
+    frames = []
+    while True:
+        frame = ws.receive_json()
+        frames.append(frame)
+        if frame["type"] == "done":
+            return frames
+
+
+class TestChatWebSocket:
+    def test_session_bound_conversation(self):
+        with client.websocket_connect("/api/v1/chat/ws?session_id=ws-session") as ws:
+            assert ws.receive_json() == {"type": "session", "session_id": "ws-session"}
+            for question in ["Which courses are offered?", "And the fees?"]:
+                ws.send_json({"message": question})
+                frames = receive_until_done(ws)
+                assert frames[0]["type"] == "sources"
+                assert "".join(f["content"] for f in frames if f["type"] == "token") == "".join(TOKENS)
+                assert frames[-1]["session_id"] == "ws-session"
+
+        history = chat_service.get_chat_history("ws-session")
+        assert [m["content"] for m in history if m["role"] == "user"] == ["Which courses are offered?", "And the fees?"]
+
+    def test_ping_pong_and_invalid_frames(self):
+        with client.websocket_connect("/api/v1/chat/ws") as ws:
+            ws.receive_json()
+            ws.send_json({"type": "ping"})
+            assert ws.receive_json() == {"type": "pong"}
+            ws.send_text("not json")
+            assert ws.receive_json()["type"] == "error"
+            ws.send_json({"message": ""})
+            assert ws.receive_json()["type"] == "error"
+
+    def test_server_heartbeat(self, monkeypatch):
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "WS_HEARTBEAT_INTERVAL", 0.05)
+        with client.websocket_connect("/api/v1/chat/ws") as ws:
+            ws.receive_json()
+            assert ws.receive_json() == {"type": "ping"}
+
+    def test_connection_cap(self, monkeypatch):
+        from starlette.websockets import WebSocketDisconnect
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "WS_MAX_CONNECTIONS", 1)
+        with client.websocket_connect("/api/v1/chat/ws") as first:
+            first.receive_json()
+            with client.websocket_connect("/api/v1/chat/ws") as second:
+                with pytest.raises(WebSocketDisconnect) as exc:
+                    second.receive_json()
+                assert exc.value.code == 1013
+
+    def test_slow_reader_applies_backpressure(self, monkeypatch):
+        from app.core.config import settings
+        from app.services.chat_socket import ChatSocketSession, SlowClientError
+        monkeypatch.setattr(settings, "WS_SEND_QUEUE_SIZE", 2)
+        monkeypatch.setattr(settings, "WS_SEND_TIMEOUT", 0.1)
+
+        async def scenario():
+            session = ChatSocketSession(websocket=None, session_id="slow")
+            await session.push({"type": "token"})
+            await session.push({"type": "token"})
+            with pytest.raises(SlowClientError):
+                await session.push({"type": "token"})
+
+        asyncio.run(scenario())
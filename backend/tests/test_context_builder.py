@@ -0,0 +1,132 @@
+"""
+Tests for prompt context assembly: merging overlapping chunks, dropping duplicated
+text and packing passages into the token budget.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.database import get_embedding_model
+from app.services.context_builder import build_context, extractive_answer, merge_overlapping
+from app.services.document_service import document_service
+from app.utils.tokens import count_tokens, count_tokens_uncached
+
+
+def word_count(text):
+    return len(text.split())
+
+
+def meta(doc_id, index, title="Prospectus"):
+    return {"doc_id": doc_id, "chunk_index": index, "title": title}
+
+
+# ──────────────────────────────────────────────
+# Merging
+# ──────────────────────────────────────────────
+
+class TestMerging:
+    def test_merge_overlapping_writes_shared_text_once(self):
+        assert merge_overlapping("alpha beta gamma", "beta gamma delta") == "alpha beta gamma delta"
+
+    def test_merge_without_overlap_keeps_both(self):
+        assert merge_overlapping("alpha", "omega") == "alpha\nomega"
+
+    def test_real_chunks_reassemble_original_text(self):
+        text = " ".join(f"Sentence number {i} about admissions." for i in range(200))
+        chunks = document_service.chunk_text(text, chunk_size=500, overlap=200)
+        assert len(chunks) > 2
+
+        metadatas = [meta("doc-1", i) for i in range(len(chunks))]
+        context = build_context(chunks, metadatas, [f"c{i}" for i in range(len(chunks))], 100_000, word_count)
+
+        assert len(context.passages) == 1
+        assert context.passages[0].text == text
+
+    def test_adjacent_chunks_merge_even_when_retrieved_apart(self):
+        documents = ["fees are 20000 per year", "unrelated hostel text", "per year for BCom"]
+        metadatas = [meta("d", 3), meta("other", 0), meta("d", 4)]
+        context = build_context(documents, metadatas, ["a", "b", "c"], 1000, word_count)
+
+        assert [p.text for p in context.passages] == ["fees are 20000 per year for BCom", "unrelated hostel text"]
+        assert context.passages[0].chunk_ids == ["a", "c"]
+
+    def test_non_adjacent_chunks_stay_separate(self):
+        documents = ["chunk one", "chunk five"]
+        context = build_context(documents, [meta("d", 1), meta("d", 5)], ["a", "b"], 1000, word_count)
+        assert len(context.passages) == 2
+
+
+# ──────────────────────────────────────────────
+# De-duplication and packing
+# ──────────────────────────────────────────────
+
+class TestPacking:
+    def test_duplicate_text_is_dropped(self):
+        documents = ["BSc Physics takes three years.", "bsc physics takes three years", "BA English"]
+        context = build_context(documents, [None, None, None], ["a", "b", "c"], 1000, word_count)
+
+        assert [p.text for p in context.passages] == ["BSc Physics takes three years.", "BA English"]
+        assert context.text.count("three years") == 1
+
+    def test_budget_is_respected_in_relevance_order(self):
+        documents = ["one two three four", "five six seven eight nine ten eleven", "twelve"]
+        context = build_context(documents, [None, None, None], ["a", "b", "c"], 8, word_count)
+
+        assert [p.chunk_ids for p in context.passages] == [["a"], ["c"]]
+        assert context.tokens <= 8
+        assert context.dropped_passages == 1
+
+    def test_top_result_survives_an_undersized_budget(self):
+        context = build_context(["word " * 100], [None], ["a"], 10, word_count)
+        assert len(context.passages) == 1
+        assert 0 < context.tokens <= 10
+
+    def test_context_is_plain_text_not_a_list_repr(self):
+        context = build_context(["First fact.", "Second fact."], [{"title": "Guide"}, None], ["a", "b"], 1000, word_count)
+        assert context.text == "[1] Guide\nFirst fact.\n\n[2]\nSecond fact."
+        assert "['" not in context.text
+
+    def test_empty_results_build_empty_context(self):
+        context = build_context([], [], [], 1000, word_count)
+        assert not context
+        assert context.text == ""
+
+    def test_token_count_is_cached(self):
+        count_tokens.cache_clear()
+        count_tokens("How do I apply for BCom?")
+        count_tokens("How do I apply for BCom?")
+        assert count_tokens.cache_info().hits == 1
+
+    def test_token_counting_alongside_embedding_threads(self):
+        # The embedding model encodes with the same tokenizer in other executor threads
+        model = get_embedding_model()
+        texts = [f"Question {i} about hostel fees and admission deadlines " * 20 for i in range(400)]
+
+        def work(i):
+            return model.encode([texts[i]]) if i % 2 else count_tokens_uncached(texts[i])
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(work, range(len(texts))))
+
+
+# ──────────────────────────────────────────────
+# Extractive answers
+# ──────────────────────────────────────────────
+
+class TestExtractiveAnswer:
+    DOCUMENTS = [
+        "The college was founded in 1967. BCom admission opens in May. Classes begin in June.",
+        "Hostel rooms are allotted after admission.",
+    ]
+
+    def context(self):
+        return build_context(self.DOCUMENTS, [None, None], ["a", "b"], 1000, word_count)
+
+    def test_sentences_sharing_query_words_in_original_order(self):
+        answer = extractive_answer("When does BCom admission open?", self.context(), max_sentences=2)
+        assert answer == ["BCom admission opens in May.", "Hostel rooms are allotted after admission."]
+
+    def test_falls_back_to_opening_sentences(self):
+        assert extractive_answer("xyz", self.context(), max_sentences=1) == ["The college was founded in 1967."]
+
+    def test_empty_context(self):
+        assert extractive_answer("anything", build_context([], [], [], 1000, word_count)) == []
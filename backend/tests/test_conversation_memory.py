@@ -0,0 +1,214 @@
+"""
+Tests for conversation memory: fitting the summary and recent turns into the token
+budget, incremental folding of old turns into the rolling summary on both session
+store backends, and the history the chat endpoints send to the LLM.
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.chat_service import chat_service
+from app.services.conversation_memory import (
+    SUMMARY_PROMPT, ConversationMemory, extractive_summary, fit_memory,
+)
+from app.services.session_store import InMemorySessionStore, SQLiteSessionStore
+
+client = TestClient(app)
+MEMORY_COLLECTION = "memory_test"
+
+
+def words(text):
+    return len(text.split())
+
+
+def turn(question, answer):
+    return [("user", question), ("assistant", answer)]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemorySessionStore(max_sessions=100, idle_ttl=3600, max_bytes=1 << 20)
+    return SQLiteSessionStore(str(tmp_path / "sessions.db"), idle_ttl=3600)
+
+
+class FakeSummarizer:
+    def __init__(self, fail=False):
+        self.prompts = []
+        self.fail = fail
+
+    async def __call__(self, messages):
+        self.prompts.append(messages[-1]["content"])
+        if self.fail:
+            raise RuntimeError("LLM unavailable")
+        return f"summary {len(self.prompts)}"
+
+
+# ──────────────────────────────────────────────
+# 1. Token budget
+# ──────────────────────────────────────────────
+
+class TestFitMemory:
+    def test_keeps_newest_messages_within_budget(self):
+        recent = [
+            {"role": "user", "content": "one two three"},
+            {"role": "assistant", "content": "four five six"},
+            {"role": "user", "content": "seven eight"},
+            {"role": "assistant", "content": "nine ten"},
+        ]
+        memory = fit_memory("", recent, token_budget=7, summary_budget=5, count=words)
+        assert [m["content"] for m in memory.turns] == ["seven eight", "nine ten"]
+        assert memory.tokens == 4
+
+    def test_window_starts_with_a_user_message(self):
+        recent = [
+            {"role": "user", "content": "a b c d"},
+            {"role": "assistant", "content": "e f"},
+            {"role": "user", "content": "g"},
+            {"role": "assistant", "content": "h"},
+        ]
+        memory = fit_memory("", recent, token_budget=4, summary_budget=5, count=words)
+        assert [m["role"] for m in memory.turns] == ["user", "assistant"]
+
+    def test_summary_is_capped_and_sent_first(self):
+        memory = fit_memory("s " * 50, [{"role": "user", "content": "q"}], token_budget=20, summary_budget=5, count=words)
+        assert words(memory.summary) <= 5
+        messages = memory.to_messages()
+        assert messages[0]["role"] == "system" and "earlier conversation" in messages[0]["content"]
+        assert messages[-1] == {"role": "user", "content": "q"}
+
+    def test_empty_memory_is_falsy(self):
+        assert not fit_memory("", [], token_budget=100, summary_budget=10)
+
+    def test_extractive_summary_drops_oldest_lines(self):
+        summary = extractive_summary("- old line here", [{"role": "user", "content": "new   question"}], 8, count=words)
+        assert summary == "- The student asked: new question"
+
+
+# ──────────────────────────────────────────────
+# 2. Incremental folding
+# ──────────────────────────────────────────────
+
+class TestConversationMemory:
+    def make(self, store, summarizer, recent_turns=1):
+        return ConversationMemory(store, summarizer, recent_turns=recent_turns, token_budget=200, summary_max_tokens=50)
+
+    def test_only_evicted_messages_are_summarized(self, store):
+        summarizer = FakeSummarizer()
+        memory = self.make(store, summarizer)
+        store.append("s", turn("q1", "a1"))
+        asyncio.run(memory.update("s"))
+        assert summarizer.prompts == []  # still inside the verbatim window
+
+        store.append("s", turn("q2", "a2"))
+        asyncio.run(memory.update("s"))
+        store.append("s", turn("q3", "a3"))
+        asyncio.run(memory.update("s"))
+
+        assert len(summarizer.prompts) == 2
+        assert "q1" in summarizer.prompts[0] and "q2" not in summarizer.prompts[0]
+        # The second fold sees the previous summary and only the newly evicted turn
+        assert "summary 1" in summarizer.prompts[1]
+        assert "q2" in summarizer.prompts[1] and "q1" not in summarizer.prompts[1]
+
+        loaded = memory.load("s")
+        assert loaded.summary == "summary 2"
+        assert [m["content"] for m in loaded.turns] == ["q3", "a3"]
+        assert memory.get_stats()["summarized_messages"] == 4
+
+    def test_stale_update_is_rejected(self, store):
+        store.append("s", turn("q1", "a1"))
+        assert store.set_summary("s", "first", 2, expected=0) is True
+        assert store.set_summary("s", "late", 2, expected=0) is False
+        assert store.get_memory("s", 0).summary == "first"
+
+    def test_failed_summary_falls_back_to_extractive(self, store):
+        memory = self.make(store, FakeSummarizer(fail=True))
+        store.append("s", turn("What is the BCom fee?", "See prospectus."))
+        store.append("s", turn("q2", "a2"))
+        asyncio.run(memory.update("s"))
+        assert "What is the BCom fee?" in memory.load("s").summary
+        assert memory.get_stats()["fallbacks"] == 1
+
+    def test_missing_session(self, store):
+        memory = self.make(store, FakeSummarizer())
+        asyncio.run(memory.update("nope"))
+        assert not memory.load("nope")
+
+    def test_sqlite_adds_summary_columns_to_old_database(self, tmp_path):
+        path = str(tmp_path / "old.db")
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            CREATE TABLE sessions (
+                session_id TEXT PRIMARY KEY, user_id TEXT, metadata TEXT,
+                created_at REAL NOT NULL, last_activity REAL NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        conn.close()
+        store = SQLiteSessionStore(path, idle_ttl=3600)
+        store.append("s", turn("q", "a"))
+        assert store.get_memory("s", 2).summary == ""
+
+
+# ──────────────────────────────────────────────
+# 3. Chat pipeline integration
+# ──────────────────────────────────────────────
+
+class TestMemoryInChat:
+    @pytest.fixture(autouse=True)
+    def _recording_llm(self, monkeypatch, fake_llm):
+        answers, summaries = [], []
+
+        def answer(kwargs):
+            if kwargs["messages"][0]["content"] == SUMMARY_PROMPT:
+                summaries.append(kwargs)
+                return "Student wants BCom."
+            answers.append(kwargs)
+            return f"answer {len(answers)}"
+
+        fake_llm(answer)
+        monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", False)
+        monkeypatch.setattr(chat_service.memory, "recent_turns", 1)
+        client.post("/api/v1/documents/embed", json={
+            "content": "The BCom programme fee is published in the prospectus.",
+            "title": "Fees",
+        }, params={"collection_name": MEMORY_COLLECTION})
+        self.answers, self.summaries = answers, summaries
+
+    def test_history_is_sent_as_summary_plus_recent_turns(self):
+        sid = client.post("/api/v1/chat/session", json={}).json()["session_id"]
+        for question in ["I want to join BCom", "What is the fee?", "Is there a hostel?"]:
+            r = client.post("/api/v1/chat/", json={"message": question, "session_id": sid, "collection_name": MEMORY_COLLECTION})
+            assert r.status_code == 200
+
+        assert [m["role"] for m in self.answers[0]["messages"]] == ["system", "user"]
+        last = self.answers[-1]["messages"]
+        assert last[1] == {"role": "system", "content": "Summary of the earlier conversation:\nStudent wants BCom."}
+        assert last[2:4] == [
+            {"role": "user", "content": "What is the fee?"},
+            {"role": "assistant", "content": "answer 2"},
+        ]
+        assert "Is there a hostel?" in last[-1]["content"]
+        assert len(self.summaries) == 2
+
+    def test_stream_folds_after_the_answer(self):
+        sid = client.post("/api/v1/chat/session", json={}).json()["session_id"]
+        for question in ["I want to join BCom", "What is the fee?"]:
+            r = client.post("/api/v1/chat/stream", json={"message": question, "session_id": sid, "collection_name": MEMORY_COLLECTION})
+            assert r.status_code == 200
+        assert chat_service.chat_sessions.get_memory(sid, 0).summarized == 2
+        assert self.answers[-1]["messages"][1] == {"role": "user", "content": "I want to join BCom"}
+
+    def test_disabled_memory_sends_no_history(self, monkeypatch):
+        monkeypatch.setattr(settings, "MEMORY_ENABLED", False)
+        sid = client.post("/api/v1/chat/session", json={}).json()["session_id"]
+        for question in ["I want to join BCom", "What is the fee?"]:
+            client.post("/api/v1/chat/", json={"message": question, "session_id": sid, "collection_name": MEMORY_COLLECTION})
+        assert [m["role"] for m in self.answers[-1]["messages"]] == ["system", "user"]
+        assert self.summaries == []
@@ -3,21 +3,10 @@ End-to-end tests for the Chatbot API.
 Runs against the real FastAPI app with real ChromaDB — no mocks.
 """
 
-import os
-import shutil
-import tempfile
 import pytest
 from fastapi.testclient import TestClient
 
-# Override DB path BEFORE importing the app so it uses a temp directory
-_test_db_dir = tempfile.mkdtemp(prefix="chatbot_test_chroma_")
-os.environ["CHROMA_DB_PATH"] = _test_db_dir
-os.environ["ADMIN_USERNAME"] = "testadmin"
-os.environ["ADMIN_PASSWORD"] = "testpass123"
-os.environ["ADMIN_SECRET_KEY"] = "test-secret-key-for-jwt-minimum-32bytes!"
-os.environ["GROQ_API_KEY"] = os.environ.get("GROQ_API_KEY", "test-key")
-
-from app.main import app  # noqa: E402
+from app.main import app
 
 client = TestClient(app)
 
@@ -37,13 +26,6 @@ def _cleanup_sessions():
     chat_service.chat_sessions.clear()
 
 
-@pytest.fixture(scope="module", autouse=True)
-def _cleanup_test_db():
-    """Remove the temp ChromaDB directory after all tests."""
-    yield
-    shutil.rmtree(_test_db_dir, ignore_errors=True)
-
-
 # ──────────────────────────────────────────────
 # 1. Health & Root
 # ──────────────────────────────────────────────
@@ -276,6 +258,49 @@ class TestCollections:
         r = client.delete("/api/v1/documents/collections/no_such_col")
         assert r.status_code in (404, 500)
 
+    def test_collection_handle_is_reused(self):
+        from app.core.database import get_chroma_client, get_chroma_collection
+        assert get_chroma_client() is get_chroma_client()
+        assert get_chroma_collection(TEST_COLLECTION) is get_chroma_collection(TEST_COLLECTION)
+
+    def test_embed_after_collection_deleted(self):
+        """A deleted collection's cached handle must not be reused."""
+        doc = {"content": "Recreated collection content.", "title": "Recreate"}
+        params = {"collection_name": "recreate_col"}
+        assert client.post("/api/v1/documents/embed", json=doc, params=params).status_code == 200
+        assert client.delete("/api/v1/documents/collections/recreate_col").status_code == 200
+
+        r = client.post("/api/v1/documents/embed", json=doc, params=params)
+        assert r.status_code == 200
+        listed = client.get("/api/v1/documents/", params=params).json()
+        assert listed["total_documents"] == 1
+
+    def test_stale_handle_is_reopened(self):
+        """A collection another worker deleted and recreated is reopened, not reported missing."""
+        from app.core.database import get_chroma_client, get_chroma_collection
+        doc = {"content": "Content written before another worker recreated the collection.", "title": "Stale"}
+        params = {"collection_name": "stale_handle_col"}
+        assert client.post("/api/v1/documents/embed", json=doc, params=params).status_code == 200
+        stale = get_chroma_collection("stale_handle_col")
+
+        # Behind this process's back: its cached handle now points at a deleted collection
+        get_chroma_client().delete_collection("stale_handle_col")
+        get_chroma_client().create_collection("stale_handle_col")
+
+        assert client.post("/api/v1/documents/embed", json=doc, params=params).status_code == 200
+        assert client.get("/api/v1/documents/", params=params).json()["total_documents"] == 1
+        assert get_chroma_collection("stale_handle_col").id != stale.id
+
+    def test_embed_after_collection_overwritten(self):
+        doc = {"content": "Overwritten collection content.", "title": "Overwrite"}
+        params = {"collection_name": "overwrite_handle_col"}
+        client.post("/api/v1/documents/embed", json=doc, params=params)
+        r = client.post("/api/v1/documents/collections/create", json={"name": "overwrite_handle_col", "overwrite": True})
+        assert r.status_code == 200
+
+        assert client.post("/api/v1/documents/embed", json=doc, params=params).status_code == 200
+        assert client.get("/api/v1/documents/", params=params).json()["total_documents"] == 1
+
 
 # ──────────────────────────────────────────────
 # 5. Chat (RAG) — requires embedded docs
@@ -354,9 +379,13 @@ class TestChat:
             "collection_name": "default"
         })
         assert r.status_code == 200
-        body = r.json()
-        assert body["response"]
-        assert "note" in body
+        assert r.headers["content-type"].startswith("text/event-stream")
+        events = [
+            block.split("\n")[0].removeprefix("event: ")
+            for block in r.text.strip().split("\n\n")
+        ]
+        assert events[0] == "sources"
+        assert events[-1] == "done"
 
 
 # ──────────────────────────────────────────────
@@ -0,0 +1,58 @@
+"""
+Tests for the micro-batching query embedder.
+"""
+
+import asyncio
+import time
+
+import numpy as np
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+def recording_encoder(delay=0.0):
+    batches = []
+
+    def encode_many(texts):
+        batches.append(list(texts))
+        time.sleep(delay)
+        return [np.full(4, len(text), dtype=np.float32) for text in texts]
+
+    return encode_many, batches
+
+
+class TestEmbeddingBatcher:
+    def test_concurrent_calls_share_batches(self):
+        encode_many, batches = recording_encoder(delay=0.02)
+        batcher = EmbeddingBatcher(encode_many, max_batch_size=8, max_wait_ms=50)
+        texts = [f"q{'x' * i}" for i in range(20)]
+
+        async def scenario():
+            return await asyncio.gather(*(batcher.embed(text) for text in texts))
+
+        vectors = asyncio.run(scenario())
+        assert [int(v[0]) for v in vectors] == [len(t) for t in texts]
+        assert len(batches) < len(texts)
+        assert max(len(b) for b in batches) <= 8
+        assert batcher.get_stats()["items"] == len(texts)
+
+    def test_lone_call_is_not_delayed(self):
+        encode_many, batches = recording_encoder()
+        batcher = EmbeddingBatcher(encode_many, max_batch_size=32, max_wait_ms=500)
+
+        start = time.perf_counter()
+        asyncio.run(batcher.embed("hello"))
+        assert time.perf_counter() - start < 0.25
+        assert batches == [["hello"]]
+
+    def test_encoder_errors_reach_every_caller(self):
+        def failing(texts):
+            raise RuntimeError("model unavailable")
+
+        batcher = EmbeddingBatcher(failing, max_batch_size=4, max_wait_ms=5)
+
+        async def scenario():
+            return await asyncio.gather(*(batcher.embed(str(i)) for i in range(3)), return_exceptions=True)
+
+        results = asyncio.run(scenario())
+        assert all(isinstance(r, RuntimeError) for r in results)
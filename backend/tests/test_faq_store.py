@@ -0,0 +1,180 @@
+"""
+Tests for the curated FAQ fast path: matching question variants, bulk loading and
+persistence, served counts, and FAQ answers in the chat pipeline and admin API.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.faq_store import FAQStore, SQLiteServedCounts, faq_store
+
+client = TestClient(app)
+FAQ_COLLECTION = "faq_test"
+
+VOCABULARY = ["fee", "bcom", "hostel", "apply", "deadline", "documents"]
+
+
+class CountingEmbedder:
+    """Bag-of-words embedding that records every text it embeds"""
+
+    def __init__(self):
+        self.embedded = []
+
+    def __call__(self, texts):
+        self.embedded.extend(texts)
+        return np.array(
+            [[float(word in text.lower().split()) for word in VOCABULARY] for text in texts],
+            dtype=np.float32,
+        )
+
+
+FAQS = [
+    {"id": "fee", "questions": ["bcom fee", "fee for bcom"], "answer": "See the fee page.", "source_url": "https://example.edu/fees"},
+    {"id": "hostel", "questions": ["hostel"], "answer": "Hostels open in June."},
+]
+
+
+@pytest.fixture
+def embedder():
+    return CountingEmbedder()
+
+
+@pytest.fixture
+def store(tmp_path, embedder):
+    store = FAQStore(str(tmp_path / "faqs"), min_similarity=0.9, embed=embedder)
+    store.load("col", FAQS)
+    return store
+
+
+# ──────────────────────────────────────────────
+# 1. Matching and loading
+# ──────────────────────────────────────────────
+
+class TestFAQStore:
+    def test_close_question_gets_canonical_answer(self, store, embedder):
+        match = store.lookup("col", embedder(["what is the bcom fee"])[0])
+        assert match.faq.id == "fee"
+        assert match.faq.answer == "See the fee page."
+        assert match.source()["metadata"]["source_url"] == "https://example.edu/fees"
+
+    def test_distant_question_passes_through(self, store, embedder):
+        assert store.lookup("col", embedder(["how do I apply"])[0]) is None
+        assert store.lookup("other", embedder(["bcom fee"])[0]) is None
+
+    def test_served_counts_rank_the_list(self, store, embedder):
+        for _ in range(2):
+            store.lookup("col", embedder(["hostel"])[0])
+        store.lookup("col", embedder(["bcom fee"])[0])
+        assert [(faq["id"], faq["served"]) for faq in store.list("col")] == [("hostel", 2), ("fee", 1)]
+
+    def test_shared_served_counts_span_workers(self, tmp_path, embedder):
+        def worker():
+            return FAQStore(
+                str(tmp_path / "faqs"), min_similarity=0.9, embed=embedder,
+                served=SQLiteServedCounts(str(tmp_path / "shared.db")),
+            )
+
+        first, second = worker(), worker()
+        first.load("col", FAQS)
+        first.lookup("col", embedder(["hostel"])[0])
+        asyncio.run(second.match("col", embedder(["hostel"])[0]))
+
+        assert [(faq["id"], faq["served"]) for faq in first.list("col")][0] == ("hostel", 2)
+        assert second.get_stats()["llm_calls_avoided"] == 2
+        second.load("col", FAQS)
+        assert all(faq["served"] == 0 for faq in first.list("col"))
+
+    def test_merge_only_embeds_new_variants(self, store, embedder):
+        embedder.embedded.clear()
+        total = store.load("col", [{"id": "apply", "questions": ["apply deadline", "hostel"], "answer": "By May."}], replace=False)
+        assert total == 3
+        assert embedder.embedded == ["apply deadline"]
+
+    def test_replace_swaps_faqs(self, store):
+        assert store.load("col", [{"questions": ["documents"], "answer": "Marksheets."}]) == 1
+        assert [faq["answer"] for faq in store.list("col")] == ["Marksheets."]
+
+    def test_reload_uses_saved_embeddings(self, store, tmp_path):
+        fresh = CountingEmbedder()
+        reloaded = FAQStore(store.directory, min_similarity=0.9, embed=fresh)
+        assert reloaded.lookup("col", fresh(["hostel"])[0]).faq.id == "hostel"
+        assert fresh.embedded == ["hostel"]  # only the query itself
+
+    def test_reload_reembeds_after_model_change(self, store):
+        fresh = CountingEmbedder()
+        reloaded = FAQStore(store.directory, min_similarity=0.9, embed=fresh, model_name="another-model")
+        assert reloaded.lookup("col", fresh(["hostel"])[0]).faq.id == "hostel"
+        assert sorted(fresh.embedded) == ["bcom fee", "fee for bcom", "hostel", "hostel"]
+
+        # Saved under the new model, so the next worker reuses them again
+        fresh.embedded.clear()
+        again = FAQStore(store.directory, min_similarity=0.9, embed=fresh, model_name="another-model")
+        assert again.lookup("col", fresh(["hostel"])[0]).faq.id == "hostel"
+        assert fresh.embedded == ["hostel"]
+
+    def test_invalid_faq_rejected(self, store):
+        with pytest.raises(ValueError):
+            store.load("col", [{"questions": [" "], "answer": "x"}])
+
+    def test_delete_collection(self, store, embedder):
+        store.delete_collection("col")
+        assert store.list("col") == []
+        assert store.lookup("col", embedder(["hostel"])[0]) is None
+
+
+# ──────────────────────────────────────────────
+# 2. Chat pipeline and admin API
+# ──────────────────────────────────────────────
+
+class TestFAQInChat:
+    @pytest.fixture(autouse=True)
+    def _faqs(self, monkeypatch, fake_llm, admin_headers):
+        calls = fake_llm("LLM answer")
+        # Only exact variant matches, whatever the embedding model in use
+        monkeypatch.setattr(faq_store, "min_similarity", 0.9999)
+        r = client.post(f"/api/v1/admin/faqs/{FAQ_COLLECTION}", headers=admin_headers, json={"faqs": [{
+            "id": "deadline",
+            "questions": ["What is the last date to apply for BCom?"],
+            "answer": "Please check the admission notice for the BCom deadline.",
+            "source_url": "https://example.edu/admissions",
+        }]})
+        assert r.status_code == 200 and r.json()["total"] == 1
+        client.post("/api/v1/documents/embed", json={
+            "content": "The BCom programme fee is published in the prospectus.",
+            "title": "Fees",
+        }, params={"collection_name": FAQ_COLLECTION})
+        self.calls = calls
+        yield
+        faq_store.delete_collection(FAQ_COLLECTION)
+
+    def test_faq_answer_skips_retrieval_and_llm(self):
+        r = client.post("/api/v1/chat/", json={"message": "What is the last date to apply for BCom?", "collection_name": FAQ_COLLECTION})
+        body = r.json()
+        assert body["response"] == "Please check the admission notice for the BCom deadline."
+        assert body["sources"][0]["metadata"]["source_url"] == "https://example.edu/admissions"
+        assert self.calls == []
+
+    def test_stream_reports_the_faq(self):
+        r = client.post("/api/v1/chat/stream", json={"message": "What is the last date to apply for BCom?", "collection_name": FAQ_COLLECTION})
+        assert '"faq_id": "deadline"' in r.text
+        assert self.calls == []
+
+    def test_other_questions_reach_the_llm(self):
+        r = client.post("/api/v1/chat/", json={"message": "Tell me about the BCom fee structure", "collection_name": FAQ_COLLECTION})
+        assert r.json()["response"] == "LLM answer"
+
+    def test_admin_lists_most_served(self, admin_headers):
+        client.post("/api/v1/chat/", json={"message": "What is the last date to apply for BCom?", "collection_name": FAQ_COLLECTION})
+        listed = client.get(f"/api/v1/admin/faqs/{FAQ_COLLECTION}", headers=admin_headers).json()
+        assert listed["faqs"][0]["id"] == "deadline" and listed["faqs"][0]["served"] >= 1
+        assert client.get("/api/v1/admin/faqs", headers=admin_headers).json()["llm_calls_avoided"] >= 1
+
+    def test_bulk_load_validation(self, admin_headers):
+        r = client.post(f"/api/v1/admin/faqs/{FAQ_COLLECTION}", headers=admin_headers, json={
+            "faqs": [{"questions": [], "answer": "x"}],
+        })
+        assert r.status_code == 400
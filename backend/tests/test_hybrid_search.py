@@ -0,0 +1,191 @@
+"""
+Tests for hybrid retrieval: BM25 keyword index (tokenizing, scoring, persistence,
+maintenance by DocumentService) and reciprocal rank fusion with vector results.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.chat_service import chat_service
+from app.services.keyword_index import (
+    BM25Index, KeywordIndexStore, keyword_index, reciprocal_rank_fusion, tokenize,
+)
+from app.services.semantic_cache import semantic_cache
+
+client = TestClient(app)
+
+HYBRID_COLLECTION = "test_hybrid_search"
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Appends one chunk at a time, compacting along the way, in its own process
+ADD_MANY_SCRIPT = """
+import sys
+from app.services.keyword_index import KeywordIndexStore
+
+store = KeywordIndexStore(sys.argv[1])
+for i in range(100):
+    store.add_chunks("racing", [f"{sys.argv[2]}{i}"], [f"notice {i} about exams"])
+"""
+
+
+# ──────────────────────────────────────────────
+# 1. BM25 index
+# ──────────────────────────────────────────────
+
+class TestBM25Index:
+    def test_tokenize_keeps_codes_and_numbers(self):
+        assert tokenize("What is the BVoc fee? Rs. 20,000 via OAP") == ["bvoc", "fee", "rs", "20000", "via", "oap"]
+
+    def test_exact_code_ranks_first(self):
+        index = BM25Index()
+        index.add("a", "BCom programme admission details and fee structure")
+        index.add("b", "BVoc Software Development admission through OAP")
+        index.add("c", "BSc Physics programme admission details")
+
+        hits = index.search("BVoc admission", limit=3)
+        assert hits[0][0] == "b"
+        assert {chunk_id for chunk_id, _ in hits} == {"a", "b", "c"}
+
+    def test_remove_drops_postings(self):
+        index = BM25Index()
+        index.add("a", "hostel rules")
+        index.add("b", "hostel fees")
+        index.remove(["a"])
+
+        assert [chunk_id for chunk_id, _ in index.search("rules", limit=5)] == []
+        assert "rules" not in index.postings
+        assert index.total_length == 2
+
+    def test_reciprocal_rank_fusion_rewards_agreement(self):
+        fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "w"]], k=60)
+        assert [item_id for item_id, _ in fused] == ["y", "x", "w", "z"]
+
+
+# ──────────────────────────────────────────────
+# 2. Persistence and maintenance
+# ──────────────────────────────────────────────
+
+class TestKeywordIndexStore:
+    def test_index_persists_and_loads_lazily(self, tmp_path):
+        store = KeywordIndexStore(str(tmp_path))
+        store.add_chunks("persisted", ["c1", "c2"], ["OAP portal login", "hostel rules"], doc_id="d1")
+        assert (tmp_path / "persisted.json").exists()
+
+        reloaded = KeywordIndexStore(str(tmp_path))
+        assert reloaded.get_stats() == {}
+        assert reloaded.search("persisted", "oap", limit=5)[0][0] == "c1"
+        assert reloaded.get_stats()["persisted"]["chunks"] == 2
+
+    def test_small_changes_append_to_the_log(self, tmp_path):
+        store = KeywordIndexStore(str(tmp_path))
+        store.add_chunks("logged", [f"c{i}" for i in range(50)], [f"hostel rule number {i}" for i in range(50)])
+        snapshot_mtime = os.stat(tmp_path / "logged.json").st_mtime_ns
+
+        store.add_chunks("logged", ["extra"], ["OAP portal login"], doc_id="d2")
+        store.remove_chunks("logged", ["c0"])
+
+        assert os.stat(tmp_path / "logged.json").st_mtime_ns == snapshot_mtime
+        assert len((tmp_path / "logged.log").read_text().splitlines()) == 2
+        assert store.search("logged", "oap", limit=5)[0][0] == "extra"
+        assert store.get_stats()["logged"]["chunks"] == 50
+
+    def test_other_workers_replay_the_log_and_compactions(self, tmp_path):
+        writer, reader = KeywordIndexStore(str(tmp_path)), KeywordIndexStore(str(tmp_path))
+        writer.add_chunks("shared", ["c1"], ["hostel rules"])
+        assert reader.search("shared", "hostel", limit=5)[0][0] == "c1"
+
+        writer.add_chunks("shared", ["c2"], ["OAP portal login"])
+        assert reader.search("shared", "oap", limit=5)[0][0] == "c2"
+
+        # Enough changes to outgrow the snapshot and compact it
+        for i in range(20):
+            writer.add_chunks("shared", [f"n{i}"], [f"notice {i} about exams"])
+        writer.remove_chunks("shared", ["c1"])
+        assert (tmp_path / "shared.log").stat().st_size < (tmp_path / "shared.json").stat().st_size
+        assert reader.search("shared", "hostel", limit=5) == []
+        assert reader.get_stats()["shared"] == writer.get_stats()["shared"]
+
+    def test_concurrent_worker_writes_are_not_lost(self, tmp_path):
+        KeywordIndexStore(str(tmp_path)).add_chunks("racing", ["seed"], ["hostel rules"])
+        workers = [
+            subprocess.Popen([sys.executable, "-c", ADD_MANY_SCRIPT, str(tmp_path), prefix], cwd=BACKEND_DIR)
+            for prefix in ("a", "b")
+        ]
+        assert [worker.wait(timeout=120) for worker in workers] == [0, 0]
+
+        assert len(KeywordIndexStore(str(tmp_path)).search("racing", "notice", limit=1000)) == 200
+
+    def test_documents_are_indexed_and_unindexed(self):
+        doc = client.post("/api/v1/documents/embed", json={
+            "content": "The XQ42 certificate course runs for six months.",
+            "title": "Certificates",
+        }, params={"collection_name": HYBRID_COLLECTION}).json()
+        chunk_id = f"{doc['doc_id']}_chunk_0"
+        assert keyword_index.search(HYBRID_COLLECTION, "XQ42", limit=5)[0][0] == chunk_id
+
+        client.delete(f"/api/v1/documents/{doc['doc_id']}", params={"collection_name": HYBRID_COLLECTION})
+        assert keyword_index.search(HYBRID_COLLECTION, "XQ42", limit=5) == []
+
+    def test_missing_index_is_rebuilt_from_chroma(self):
+        client.post("/api/v1/documents/embed", json={
+            "content": "Scholarship code ZK9 applies to merit students.",
+            "title": "Scholarships",
+        }, params={"collection_name": HYBRID_COLLECTION})
+        keyword_index.drop_collection(HYBRID_COLLECTION)
+
+        hits = keyword_index.search(HYBRID_COLLECTION, "ZK9", limit=5)
+        assert len(hits) == 1
+
+    def test_deleting_collection_drops_index(self):
+        client.post("/api/v1/documents/embed", json={"content": "Temporary", "title": "T"},
+                    params={"collection_name": "test_hybrid_drop"})
+        path = keyword_index._path("test_hybrid_drop")
+        assert os.path.exists(path)
+        client.delete("/api/v1/documents/collections/test_hybrid_drop")
+        assert not os.path.exists(path)
+
+
+# ──────────────────────────────────────────────
+# 3. Fusion in the chat pipeline
+# ──────────────────────────────────────────────
+
+class TestHybridRetrieval:
+    def test_keyword_only_hits_are_fetched_from_chroma(self):
+        doc = client.post("/api/v1/documents/embed", json={
+            "content": "BVoc Logistics Management admission is through the OAP.",
+            "title": "BVoc",
+        }, params={"collection_name": HYBRID_COLLECTION}).json()
+        keyword_hits = keyword_index.search(HYBRID_COLLECTION, "BVoc logistics", limit=5)
+        vector_results = {
+            "ids": [["vector-only"]],
+            "documents": [["Hostel admission rules."]],
+            "metadatas": [[{"title": "Hostel"}]],
+            "distances": [[0.4]],
+        }
+
+        fused = chat_service.fuse_results(HYBRID_COLLECTION, vector_results, keyword_hits)
+        fused_ids = fused["ids"][0]
+        assert f"{doc['doc_id']}_chunk_0" in fused_ids
+        assert "vector-only" in fused_ids
+
+        position = fused_ids.index(f"{doc['doc_id']}_chunk_0")
+        assert fused["documents"][0][position].startswith("BVoc Logistics")
+        assert fused["distances"][0][position] is None
+
+    def test_chat_sources_include_keyword_match(self, fake_llm):
+        fake_llm("ok")
+        semantic_cache.clear()
+        client.post("/api/v1/documents/embed", json={
+            "content": "Course code QW77 is the evening diploma in journalism.",
+            "title": "Diploma",
+        }, params={"collection_name": HYBRID_COLLECTION})
+
+        r = client.post("/api/v1/chat/", json={"message": "QW77", "collection_name": HYBRID_COLLECTION})
+        assert r.status_code == 200
+        assert any("QW77" in source["content"] for source in r.json()["sources"])
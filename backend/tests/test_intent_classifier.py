@@ -0,0 +1,175 @@
+"""
+Tests for the pre-LLM intent classifier: nearest-centroid matching and its thresholds,
+per-collection intent sets and their persistence, and templated answers in the chat
+pipeline and admin API.
+"""
+
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.intent_classifier import IntentClassifier, intent_classifier
+
+client = TestClient(app)
+INTENT_COLLECTION = "intent_test"
+
+VOCABULARY = ["hello", "hi", "thanks", "fee", "course", "weather", "joke"]
+
+
+def bag_of_words(texts):
+    """Tiny deterministic embedding: one dimension per vocabulary word"""
+    return np.array(
+        [[float(word in text.lower().split()) for word in VOCABULARY] for text in texts],
+        dtype=np.float32,
+    )
+
+
+INTENTS = {
+    "in_scope": {"response": None, "examples": ["course fee", "course"]},
+    "greeting": {"response": "Hello!", "examples": ["hello", "hi"]},
+    "out_of_scope": {"response": "Out of scope.", "examples": ["weather", "joke"]},
+}
+
+
+@pytest.fixture
+def classifier(tmp_path):
+    classifier = IntentClassifier(str(tmp_path / "intents.json"), min_similarity=0.5, margin=0.1, embed=bag_of_words)
+    classifier.set_intents("col", INTENTS)
+    return classifier
+
+
+def classify(classifier, text, collection="col"):
+    return classifier.classify(classifier.centroids(collection), bag_of_words([text])[0])
+
+
+# ──────────────────────────────────────────────
+# 1. Nearest-centroid matching
+# ──────────────────────────────────────────────
+
+class TestClassify:
+    def test_templated_intents_match(self, classifier):
+        match = classify(classifier, "hello")
+        assert (match.label, match.response) == ("greeting", "Hello!")
+        assert classify(classifier, "tell me a joke").label == "out_of_scope"
+
+    def test_in_scope_questions_pass_through(self, classifier):
+        assert classify(classifier, "what is the course fee") is None
+
+    def test_far_from_every_centroid_passes_through(self, classifier):
+        assert classify(classifier, "something else entirely") is None
+
+    def test_needs_a_margin_over_in_scope(self, classifier):
+        # Equally close to greeting and in-scope: answered by the LLM, not the template
+        assert classify(classifier, "hello course") is None
+
+    def test_passthrough_label_for_llm_bound_queries(self, classifier):
+        classifier.centroids("col")
+        assert classifier.passthrough_label("col", bag_of_words(["what is the course fee"])[0]) == "in_scope"
+
+    def test_centroids_are_built_once(self, classifier):
+        assert classifier.centroids("col") is classifier.centroids("col")
+
+    def test_classification_is_fast(self, classifier):
+        centroids = classifier.centroids("col")
+        query = bag_of_words(["hello"])[0]
+        started = time.perf_counter()
+        for _ in range(1000):
+            classifier.classify(centroids, query)
+        assert (time.perf_counter() - started) / 1000 < 0.001
+
+
+# ──────────────────────────────────────────────
+# 2. Per-collection intent sets
+# ──────────────────────────────────────────────
+
+class TestIntentSets:
+    def test_unknown_collection_uses_defaults(self, classifier):
+        assert not classifier.is_custom("other")
+        assert "greeting" in classifier.get_intents("other")
+
+    def test_saved_intents_survive_a_new_instance(self, classifier):
+        reloaded = IntentClassifier(classifier.path, min_similarity=0.5, margin=0.1, embed=bag_of_words)
+        assert reloaded.get_intents("col") == INTENTS
+
+    def test_changing_intents_rebuilds_centroids(self, classifier):
+        classifier.set_intents("col", {**INTENTS, "greeting": {"response": "Hi there!", "examples": ["hi"]}})
+        assert classify(classifier, "hi").response == "Hi there!"
+
+    def test_forget_restores_defaults(self, classifier):
+        classifier.forget("col")
+        assert not classifier.is_custom("col")
+
+    @pytest.mark.parametrize("intents", [
+        {},
+        {"greeting": {"response": "Hello!", "examples": []}},
+        {"in_scope": {"response": None, "examples": ["course"]}},
+    ])
+    def test_invalid_intents_rejected(self, classifier, intents):
+        with pytest.raises(ValueError):
+            classifier.set_intents("col", intents)
+
+
+# ──────────────────────────────────────────────
+# 3. Chat pipeline and admin API
+# ──────────────────────────────────────────────
+
+class TestIntentsInChat:
+    @pytest.fixture(autouse=True)
+    def _exact_intents(self, monkeypatch, fake_llm):
+        calls = fake_llm("LLM answer")
+        # Only exact example matches, whatever the embedding model in use
+        monkeypatch.setattr(intent_classifier, "min_similarity", 0.9999)
+        monkeypatch.setattr(intent_classifier, "margin", 0.0)
+        intent_classifier.set_intents(INTENT_COLLECTION, {
+            "in_scope": {"response": None, "examples": ["What is the BCom fee?"]},
+            "greeting": {"response": "Hello! Ask me about admissions.", "examples": ["Good morning chatbot"]},
+        })
+        client.post("/api/v1/documents/embed", json={
+            "content": "The BCom programme fee is published in the prospectus.",
+            "title": "Fees",
+        }, params={"collection_name": INTENT_COLLECTION})
+        self.calls = calls
+        yield
+        intent_classifier.forget(INTENT_COLLECTION)
+
+    def ask(self, text, path="/api/v1/chat/"):
+        r = client.post(path, json={"message": text, "collection_name": INTENT_COLLECTION})
+        assert r.status_code == 200
+        return r
+
+    def test_greeting_skips_retrieval_and_llm(self):
+        body = self.ask("Good morning chatbot").json()
+        assert body["response"] == "Hello! Ask me about admissions."
+        assert body["sources"] == []
+        assert self.calls == []
+        history = client.get(f"/api/v1/chat/history/{body['session_id']}").json()["history"]
+        assert [m["content"] for m in history] == ["Good morning chatbot", "Hello! Ask me about admissions."]
+
+    def test_other_questions_reach_the_llm(self):
+        assert self.ask("Tell me about the BCom fee structure").json()["response"] == "LLM answer"
+        assert len(self.calls) == 1
+
+    def test_stream_reports_the_intent(self):
+        text = self.ask("Good morning chatbot", path="/api/v1/chat/stream").text
+        assert "Hello! Ask me about admissions." in text
+        assert '"intent": "greeting"' in text
+        assert self.calls == []
+
+    def test_admin_endpoints(self, admin_headers):
+        r = client.get(f"/api/v1/admin/intents/{INTENT_COLLECTION}", headers=admin_headers)
+        assert r.status_code == 200 and r.json()["custom"] is True
+
+        r = client.put(f"/api/v1/admin/intents/{INTENT_COLLECTION}", headers=admin_headers, json={
+            "intents": {"in_scope": {"examples": ["fees"]}},
+        })
+        assert r.status_code == 400
+
+        self.ask("Good morning chatbot")
+        stats = client.get("/api/v1/admin/intents", headers=admin_headers).json()
+        assert stats["collections"][INTENT_COLLECTION]["greeting"] >= 1
+
+        r = client.delete(f"/api/v1/admin/intents/{INTENT_COLLECTION}", headers=admin_headers)
+        assert r.json()["custom"] is False
@@ -0,0 +1,281 @@
+"""
+Tests for the resilient LLM gateway against a local fake OpenAI-compatible server:
+retries with backoff, timeouts, hedging, the circuit breaker, and degraded extractive
+answers in the chat pipeline while the provider is down.
+"""
+
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import groq
+import pytest
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.chat_service import DEGRADED_RESPONSE_PREFIX, chat_service
+from app.services.llm_gateway import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LLMGateway,
+    LLMUnavailableError,
+)
+from app.services.llm_providers import GroqProvider, create_groq_client
+
+client = TestClient(app)
+GATEWAY_COLLECTION = "llm_gateway_test"
+MESSAGES = [{"role": "user", "content": "When does admission open?"}]
+
+
+class FakeOpenAIServer:
+    """
+    OpenAI-compatible /chat/completions served by uvicorn on a local port. Each request
+    takes the next step of `plan` (a status code to fail with, a delay, or both) and
+    otherwise answers "answer" / streams `tokens`.
+    """
+
+    def __init__(self):
+        self.plan = []
+        self.requests = 0
+        self.tokens = ["Admission ", "opens ", "in May."]
+        fake = FastAPI()
+        fake.post("/openai/v1/chat/completions")(self.complete)
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        self.base_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+        self.server = uvicorn.Server(uvicorn.Config(fake, log_level="warning", ws="none", timeout_graceful_shutdown=1))
+        self.thread = threading.Thread(target=self.server.run, kwargs={"sockets": [sock]}, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(5)
+
+    async def complete(self, request: Request):
+        body = await request.json()
+        self.requests += 1
+        step = self.plan.pop(0) if self.plan else {}
+        await asyncio.sleep(step.get("delay", 0))
+        if "status" in step:
+            return JSONResponse({"error": {"message": "fake failure"}}, step["status"], headers=step.get("headers"))
+        if body.get("stream"):
+            return StreamingResponse(self.events(), media_type="text/event-stream")
+        return {
+            "id": "fake", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "answer"}, "finish_reason": "stop"}],
+        }
+
+    async def events(self):
+        for token in self.tokens:
+            chunk = {
+                "id": "fake", "object": "chat.completion.chunk", "created": 0, "model": "fake",
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = FakeOpenAIServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def fake(server, monkeypatch):
+    server.plan, server.requests = [], 0
+    monkeypatch.setattr(settings, "GROQ_BASE_URL", server.base_url)
+    return server
+
+
+def gateway(**overrides):
+    """Gateway on a fresh pooled client; build it inside the event loop that uses it"""
+    options = dict(
+        timeout=2.0, max_retries=2, backoff_base=0.01, backoff_max=0.5,
+        hedge=False, hedge_min_samples=5, breaker=CircuitBreaker(3, 60),
+    )
+    options.update(overrides)
+    return LLMGateway(GroqProvider(create_groq_client()), **options)
+
+
+def run(coro_factory, **overrides):
+    async def main():
+        llm = gateway(**overrides)
+        try:
+            return llm, await coro_factory(llm)
+        finally:
+            await llm.provider.aclose()
+
+    return asyncio.run(main())
+
+
+async def collect(tokens):
+    return "".join([token async for token in tokens])
+
+
+# ──────────────────────────────────────────────
+# 1. Retries and timeouts
+# ──────────────────────────────────────────────
+
+class TestRetries:
+    def test_5xx_is_retried(self, fake):
+        fake.plan = [{"status": 503}, {"status": 500}]
+        llm, answer = run(lambda llm: llm.complete(MESSAGES, model="fake"))
+        assert answer == "answer"
+        assert fake.requests == 3
+        assert llm.stats.retries == 2
+
+    def test_retry_after_is_honoured_up_to_the_cap(self, fake):
+        fake.plan = [{"status": 429, "headers": {"retry-after": "0"}}]
+        assert run(lambda llm: llm.complete(MESSAGES, model="fake"))[1] == "answer"
+
+        fake.plan, fake.requests = [{"status": 429, "headers": {"retry-after": "60"}}], 0
+        with pytest.raises(LLMUnavailableError):
+            run(lambda llm: llm.complete(MESSAGES, model="fake"))
+        assert fake.requests == 1
+
+    def test_client_errors_are_not_retried(self, fake):
+        fake.plan = [{"status": 400}]
+        breaker = CircuitBreaker(1, 60)
+        with pytest.raises(groq.BadRequestError):
+            run(lambda llm: llm.complete(MESSAGES, model="fake"), breaker=breaker)
+        assert fake.requests == 1
+        assert breaker.state == "closed"
+
+    def test_slow_call_times_out(self, fake):
+        fake.plan = [{"delay": 1.0}]
+        started = time.perf_counter()
+        with pytest.raises(LLMUnavailableError):
+            run(lambda llm: llm.complete(MESSAGES, model="fake"), timeout=0.2, max_retries=0)
+        assert time.perf_counter() - started < 0.9
+
+    def test_stream_retries_before_the_first_token(self, fake):
+        fake.plan = [{"status": 502}]
+        llm, text = run(lambda llm: collect(llm.stream(MESSAGES, model="fake")))
+        assert text == "Admission opens in May."
+        assert fake.requests == 2
+
+
+# ──────────────────────────────────────────────
+# 2. Hedging
+# ──────────────────────────────────────────────
+
+class TestHedging:
+    def test_slow_call_is_hedged_after_p95(self, fake):
+        fake.plan = [{"delay": 1.5}]
+
+        async def call(llm):
+            for _ in range(5):
+                llm.latency["complete"].add(0.05)
+            return await llm.complete(MESSAGES, model="fake")
+
+        started = time.perf_counter()
+        llm, answer = run(call, hedge=True)
+        assert answer == "answer"
+        assert time.perf_counter() - started < 1.2
+        assert (llm.stats.hedged, llm.stats.hedge_wins) == (1, 1)
+
+    def test_no_hedging_without_enough_samples(self, fake):
+        llm, _ = run(lambda llm: llm.complete(MESSAGES, model="fake"), hedge=True)
+        assert llm.stats.hedged == 0
+        assert fake.requests == 1
+
+
+# ──────────────────────────────────────────────
+# 3. Circuit breaker
+# ──────────────────────────────────────────────
+
+class TestCircuitBreaker:
+    def test_opens_then_lets_one_trial_through(self):
+        now = [0.0]
+        breaker = CircuitBreaker(2, cooldown=10, clock=lambda: now[0])
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open" and not breaker.allow()
+
+        now[0] = 11
+        assert breaker.allow()          # the trial
+        assert not breaker.allow()      # everyone else waits for it
+        breaker.record_failure()
+        assert breaker.state == "open"
+
+        now[0] = 22
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed" and breaker.allow()
+
+    def test_open_circuit_rejects_without_calling_the_provider(self, fake):
+        fake.plan = [{"status": 503}]
+        breaker = CircuitBreaker(1, 60)
+        with pytest.raises(LLMUnavailableError):
+            run(lambda llm: llm.complete(MESSAGES, model="fake"), max_retries=0, breaker=breaker)
+        with pytest.raises(CircuitOpenError):
+            run(lambda llm: llm.complete(MESSAGES, model="fake"), breaker=breaker)
+        assert fake.requests == 1
+
+
+# ──────────────────────────────────────────────
+# 4. Degraded answers in the chat pipeline
+# ──────────────────────────────────────────────
+
+class TestDegradedChat:
+    @pytest.fixture(autouse=True)
+    def _provider_down(self, monkeypatch, fake_llm):
+        def answer(kwargs):
+            if self.down:
+                raise asyncio.TimeoutError()
+            return "LLM answer"
+
+        calls = fake_llm(answer)
+        monkeypatch.setattr(chat_service.llm, "max_retries", 0)
+        monkeypatch.setattr(chat_service.llm, "breaker", CircuitBreaker(1, 60))
+        client.post("/api/v1/documents/embed", json={
+            "content": "Admission for the BCom programme opens in May. Hostel rooms are allotted in June.",
+            "title": "Admissions",
+        }, params={"collection_name": GATEWAY_COLLECTION})
+        self.calls, self.down = calls, True
+
+    def ask(self, path="/api/v1/chat/"):
+        r = client.post(path, json={"message": "When does BCom admission open?", "collection_name": GATEWAY_COLLECTION})
+        assert r.status_code == 200
+        return r
+
+    def test_outage_serves_extract_of_the_sources(self):
+        body = self.ask().json()
+        assert body["response"].startswith(DEGRADED_RESPONSE_PREFIX)
+        assert "Admission for the BCom programme opens in May." in body["response"]
+        assert body["sources"]
+
+        # The circuit is open now: answered without waiting on the provider
+        assert self.ask().json()["response"].startswith(DEGRADED_RESPONSE_PREFIX)
+        assert len(self.calls) == 1
+
+    def test_stream_marks_degraded_answers(self):
+        text = self.ask("/api/v1/chat/stream").text
+        assert "opens in May" in text
+        assert '"degraded": true' in text
+
+    def test_degraded_answers_are_not_cached(self):
+        self.ask()
+        chat_service.llm.breaker.record_success()
+        self.down = False
+        assert self.ask().json()["response"] == "LLM answer"
+
+    def test_admin_stats(self, admin_headers):
+        self.ask()
+        stats = client.get("/api/v1/admin/llm", headers=admin_headers).json()
+        assert stats["circuit"] == "open"
+        assert stats["degraded"] >= 1
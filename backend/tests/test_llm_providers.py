@@ -0,0 +1,185 @@
+"""
+Tests for the pluggable LLM providers: the deterministic stub and its timing and error
+model, the generic OpenAI-compatible provider against the stub server, provider
+selection from settings, and the chat pipeline running fully offline on the stub.
+"""
+
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.chat_service import chat_service
+from app.services.llm_gateway import CircuitBreaker, LLMGateway, is_retryable
+from app.services.llm_providers import (
+    GroqProvider,
+    OpenAICompatibleProvider,
+    ProviderError,
+    StubProvider,
+    create_llm_provider,
+    create_stub_app,
+)
+
+client = TestClient(app)
+PROVIDER_COLLECTION = "llm_provider_test"
+MESSAGES = [{"role": "user", "content": "how do I apply"}]
+
+
+async def collect(tokens):
+    return [token async for token in tokens]
+
+
+@pytest.fixture(scope="module")
+def stub_server():
+    """The stub behind a real OpenAI-compatible HTTP server"""
+    stub = StubProvider(ttft=0.01, tokens_per_second=1000, answer_tokens=6, error_rate=0.0)
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(create_stub_app(stub), log_level="warning", ws="none"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield stub, f"http://127.0.0.1:{sock.getsockname()[1]}/v1"
+    server.should_exit = True
+    thread.join(5)
+
+
+# ──────────────────────────────────────────────
+# 1. Stub provider
+# ──────────────────────────────────────────────
+
+class TestStubProvider:
+    def test_answers_are_deterministic(self):
+        stub = StubProvider(ttft=0, tokens_per_second=1000, answer_tokens=5)
+        first = asyncio.run(stub.complete(MESSAGES))
+        assert first == "how do I apply how"
+        assert asyncio.run(stub.complete(MESSAGES)) == first
+        assert "".join(asyncio.run(collect(stub.stream(MESSAGES)))) == first
+
+    def test_max_tokens_caps_the_answer(self):
+        stub = StubProvider(ttft=0, tokens_per_second=1000, answer_tokens=50)
+        assert len(asyncio.run(collect(stub.stream(MESSAGES, max_tokens=3)))) == 3
+
+    def test_simulated_ttft_and_throughput(self):
+        stub = StubProvider(ttft=0.1, tokens_per_second=50, answer_tokens=6)
+
+        async def timed():
+            started, arrivals = time.perf_counter(), []
+            async for _ in stub.stream(MESSAGES):
+                arrivals.append(time.perf_counter() - started)
+            return arrivals
+
+        arrivals = asyncio.run(timed())
+        assert 0.09 <= arrivals[0] < 0.5            # event loop timers may fire a hair early
+        assert arrivals[-1] - arrivals[0] >= 0.1    # 5 more tokens at 50/s
+
+    def test_seeded_error_rate(self):
+        def outcomes(seed):
+            stub = StubProvider(ttft=0, tokens_per_second=1000, error_rate=0.5, seed=seed)
+
+            async def run():
+                results = []
+                for _ in range(20):
+                    try:
+                        await stub.complete(MESSAGES)
+                        results.append("ok")
+                    except ProviderError as e:
+                        assert e.status_code == 503 and is_retryable(e)
+                        results.append("error")
+                return results
+
+            return asyncio.run(run())
+
+        assert outcomes(1) == outcomes(1)
+        assert 0 < outcomes(1).count("error") < 20
+
+
+# ──────────────────────────────────────────────
+# 2. OpenAI-compatible provider (against the stub server)
+# ──────────────────────────────────────────────
+
+class TestOpenAICompatibleProvider:
+    def run(self, base_url, call):
+        async def main():
+            provider = OpenAICompatibleProvider(base_url, api_key="secret")
+            try:
+                return await call(provider)
+            finally:
+                await provider.aclose()
+
+        return asyncio.run(main())
+
+    def test_complete_and_stream(self, stub_server):
+        stub, base_url = stub_server
+        expected = "".join(stub.answer(MESSAGES))
+        assert self.run(base_url, lambda p: p.complete(MESSAGES, model="stub")) == expected
+        tokens = self.run(base_url, lambda p: collect(p.stream(MESSAGES, model="stub")))
+        assert len(tokens) == 6 and "".join(tokens) == expected
+
+    def test_http_errors_become_retryable_provider_errors(self, stub_server, monkeypatch):
+        stub, base_url = stub_server
+        monkeypatch.setattr(stub, "error_rate", 1.0)
+        with pytest.raises(ProviderError) as error:
+            self.run(base_url, lambda p: collect(p.stream(MESSAGES, model="stub")))
+        assert error.value.status_code == 503
+        assert is_retryable(error.value)
+
+    def test_gateway_retries_through_the_stub(self, stub_server, monkeypatch):
+        stub, base_url = stub_server
+        draws = iter([0.0, 0.9])             # with a 50% error rate: fail, then succeed
+        monkeypatch.setattr(stub, "error_rate", 0.5)
+        monkeypatch.setattr(stub._random, "random", lambda: next(draws, 0.9))
+
+        async def call(provider):
+            gateway = LLMGateway(
+                provider, timeout=2, max_retries=1, backoff_base=0.01, backoff_max=1,
+                hedge=False, hedge_min_samples=5, breaker=CircuitBreaker(3, 60),
+            )
+            return await gateway.complete(MESSAGES, model="stub"), gateway.stats.retries
+
+        assert self.run(base_url, call) == ("".join(stub.answer(MESSAGES)), 1)
+
+
+# ──────────────────────────────────────────────
+# 3. Selection and the offline chat pipeline
+# ──────────────────────────────────────────────
+
+class TestProviderSelection:
+    @pytest.mark.parametrize("name, kind", [
+        ("groq", GroqProvider),
+        ("openai", OpenAICompatibleProvider),
+        ("stub", StubProvider),
+    ])
+    def test_provider_from_settings(self, monkeypatch, name, kind):
+        monkeypatch.setattr(settings, "LLM_PROVIDER", name)
+        provider = create_llm_provider()
+        assert isinstance(provider, kind)
+        assert provider.name == name
+        asyncio.run(provider.aclose())
+
+    def test_unknown_provider(self, monkeypatch):
+        monkeypatch.setattr(settings, "LLM_PROVIDER", "nope")
+        with pytest.raises(ValueError):
+            create_llm_provider()
+
+    def test_chat_runs_offline_on_the_stub(self, monkeypatch):
+        monkeypatch.setattr(chat_service.llm, "provider", StubProvider(ttft=0, tokens_per_second=1000, answer_tokens=8))
+        monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", False)
+        client.post("/api/v1/documents/embed", json={
+            "content": "Applications are submitted through the online admission portal.",
+            "title": "Admissions",
+        }, params={"collection_name": PROVIDER_COLLECTION})
+
+        r = client.post("/api/v1/chat/", json={"message": "How do I apply?", "collection_name": PROVIDER_COLLECTION})
+        assert r.status_code == 200
+        assert len(r.json()["response"].split()) == 8
+
+        r = client.post("/api/v1/chat/stream", json={"message": "How do I apply?", "collection_name": PROVIDER_COLLECTION})
+        assert r.text.count("event: token") == 8
@@ -0,0 +1,150 @@
+"""
+Tests for the Prometheus metrics: the registry and its text format, per-stage chat
+timings, answer and token counters, ingestion metrics and the /metrics endpoint.
+"""
+
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.metrics import (
+    Metric,
+    MetricsRegistry,
+    chat_answers,
+    chat_stage_seconds,
+    ingest_chunks,
+    ingest_extract_seconds,
+    llm_tokens,
+)
+from app.main import app
+
+client = TestClient(app)
+METRICS_COLLECTION = "metrics_test"
+
+
+def completion_tokens():
+    return sum(llm_tokens.value(kind="completion", route=route) for route in ("small", "large", "default"))
+
+
+def sample(text, line_start):
+    """Value of the first exposition line starting with `line_start`"""
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+# ──────────────────────────────────────────────
+# 1. Registry and text format
+# ──────────────────────────────────────────────
+
+class TestRegistry:
+    def test_counter(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("hits", "Hits by cache", ["cache"])
+        counter.inc(cache="semantic")
+        counter.inc(2, cache="semantic")
+        text = registry.render()
+        assert "# HELP hits Hits by cache\n# TYPE hits counter\n" in text
+        assert 'hits_total{cache="semantic"} 3\n' in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latency", ["stage"], buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, stage="embed")
+        text = registry.render()
+        assert 'latency_seconds_bucket{stage="embed",le="0.1"} 2\n' in text
+        assert 'latency_seconds_bucket{stage="embed",le="1"} 3\n' in text
+        assert 'latency_seconds_bucket{stage="embed",le="+Inf"} 4\n' in text
+        assert 'latency_seconds_sum{stage="embed"} 3.65\n' in text
+        assert 'latency_seconds_count{stage="embed"} 4\n' in text
+
+    def test_histogram_timer(self):
+        histogram = MetricsRegistry().histogram("work_seconds", "Work")
+        with pytest.raises(RuntimeError):
+            with histogram.time():
+                raise RuntimeError("failed work is timed too")
+        assert histogram.count() == 1
+
+    def test_callback_metrics_and_label_escaping(self):
+        registry = MetricsRegistry()
+        registry.callback("open", "Open", "gauge", lambda: {('say "hi"\n',): 1}, ["name"])
+        assert 'open{name="say \\"hi\\"\\n"} 1\n' in registry.render()
+
+    def test_label_mismatch_and_duplicates(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("calls", "Calls", ["outcome"])
+        with pytest.raises(ValueError):
+            counter.inc(status="ok")
+        with pytest.raises(ValueError):
+            registry.counter("calls", "Again")
+
+    def test_metric_without_samples_cannot_be_created(self):
+        class Incomplete(Metric):
+            kind = "gauge"
+
+        with pytest.raises(TypeError):
+            Incomplete("incomplete", "Forgot samples()")
+
+
+# ──────────────────────────────────────────────
+# 2. Instrumented pipeline and /metrics
+# ──────────────────────────────────────────────
+
+class TestEndpoint:
+    @pytest.fixture(autouse=True)
+    def _fake_llm(self, monkeypatch, fake_llm):
+        fake_llm("The fee is 20,000 rupees.")
+        monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", False)
+        client.post("/api/v1/documents/embed", json={
+            "content": "The BCom course fee is 20,000 rupees per year.",
+            "title": "Fees",
+        }, params={"collection_name": METRICS_COLLECTION})
+
+    def test_chat_stages_answers_and_tokens(self):
+        stages = ("embed", "vector_query", "context_build", "llm_total", "serialization")
+        before = {stage: chat_stage_seconds.count(stage=stage) for stage in stages}
+        answers, tokens = chat_answers.value(source="llm"), completion_tokens()
+
+        r = client.post("/api/v1/chat/", json={"message": "What is the BCom fee?", "collection_name": METRICS_COLLECTION})
+        assert r.status_code == 200 and r.json()["response"] == "The fee is 20,000 rupees."
+
+        assert all(chat_stage_seconds.count(stage=stage) == count + 1 for stage, count in before.items())
+        assert chat_answers.value(source="llm") == answers + 1
+        assert completion_tokens() > tokens
+
+    def test_stream_records_ttft(self, fake_llm):
+        fake_llm(stream=["20,000"])
+        ttft = chat_stage_seconds.count(stage="llm_ttft")
+        serialization = chat_stage_seconds.count(stage="serialization")
+        client.post("/api/v1/chat/stream", json={"message": "BCom fee per year?", "collection_name": METRICS_COLLECTION})
+        assert chat_stage_seconds.count(stage="llm_ttft") == ttft + 1
+        assert chat_stage_seconds.count(stage="serialization") == serialization + 1
+
+    def test_ingestion_metrics(self):
+        extracted, chunks = ingest_extract_seconds.count(file_type="txt"), ingest_chunks.value()
+        r = client.post("/api/v1/documents/upload",
+                        files={"file": ("fees.txt", io.BytesIO(b"Hostel fee is 5,000 rupees."), "text/plain")},
+                        data={"collection_name": METRICS_COLLECTION, "metadata": "{}"})
+        assert r.status_code == 200
+        assert ingest_extract_seconds.count(file_type="txt") == extracted + 1
+        assert ingest_chunks.value() == chunks + 1
+
+    def test_prometheus_text(self):
+        client.post("/api/v1/chat/", json={"message": "What is the BCom fee?", "collection_name": METRICS_COLLECTION})
+        r = client.get("/metrics")
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = r.text
+        assert sample(text, 'chatbot_chat_stage_seconds_count{stage="embed"}') >= 1
+        # Requests are labelled with their route template, not the raw path
+        assert sample(text, 'chatbot_http_request_seconds_count{method="POST",route="/api/v1/chat/",status="200"}') >= 1
+        assert sample(text, 'chatbot_cache_lookups_total{cache="embedding",result="miss"}') is not None
+        assert sample(text, "chatbot_llm_circuit_open ") == 0
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "METRICS_ENABLED", False)
+        assert client.get("/metrics").status_code == 404
@@ -0,0 +1,191 @@
+"""
+Tests for routing queries between a small and a large model: complexity features and
+scoring, the persisted routing policy, per-route metrics, and routing in the chat
+pipeline and admin API.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.conversation_memory import Memory
+from app.services.model_router import (
+    ModelRouter,
+    RoutingPolicy,
+    complexity_score,
+    model_router,
+    score_features,
+)
+from app.services.semantic_cache import semantic_cache
+
+client = TestClient(app)
+ROUTER_COLLECTION = "model_router_test"
+
+
+@pytest.fixture(autouse=True)
+def _router_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "ROUTER_ENABLED", True)
+
+
+@pytest.fixture
+def router(tmp_path):
+    return ModelRouter(str(tmp_path / "routing.json"), small_model="small-model")
+
+
+# ──────────────────────────────────────────────
+# 1. Complexity scoring
+# ──────────────────────────────────────────────
+
+class TestScoring:
+    def test_features_are_scaled_to_unit_range(self):
+        features = score_features(RoutingPolicy(), query_tokens=24, best_distance=2.0, depth=3, intent_label=None)
+        assert features == {"length": 0.5, "retrieval": 1.0, "depth": 0.5}
+
+    def test_unmeasured_features_do_not_count(self):
+        policy = RoutingPolicy(weights={"length": 1, "retrieval": 1, "depth": 0, "intent": 0})
+        features = score_features(policy, query_tokens=40, best_distance=None, depth=0, intent_label="unknown")
+        assert complexity_score(policy, features) == 1.0
+
+    def test_intent_scores(self):
+        policy = RoutingPolicy(weights={"intent": 1}, intent_scores={"lookup": 0.0, "guidance": 1.0})
+        assert complexity_score(policy, score_features(policy, 5, None, 0, "guidance")) == 1.0
+        assert complexity_score(policy, score_features(policy, 5, None, 0, "lookup")) == 0.0
+
+    def test_easy_and_hard_queries(self, router):
+        easy = router.route("college address", [{"distance": 0.3}], Memory(), None)
+        hard = router.route(
+            "Compare the eligibility, fees and career prospects of BCom Finance and BCom Computer Applications "
+            "for a student who finished Plus Two in the humanities stream and wants to study abroad later",
+            [{"distance": 1.4}],
+            Memory(depth=5),
+            None,
+        )
+        assert (easy.route, easy.model) == ("small", "small-model")
+        assert (hard.route, hard.model) == ("large", settings.GROQ_MODEL)
+        assert easy.score < 0.5 <= hard.score
+
+    def test_requested_model_and_disabled_router(self, router, monkeypatch):
+        assert router.route("hi", [], None, None, requested_model="custom").route == "client"
+        monkeypatch.setattr(settings, "ROUTER_ENABLED", False)
+        assert router.route("hi", [], None, None).route == "default"
+
+
+# ──────────────────────────────────────────────
+# 2. Policy and metrics
+# ──────────────────────────────────────────────
+
+class TestPolicy:
+    def test_changes_persist_across_instances(self, router):
+        router.set_policy({"threshold": 0.7, "small_model": "tiny"})
+        reloaded = ModelRouter(router.path, small_model="small-model")
+        assert reloaded.get_policy().threshold == 0.7
+        assert reloaded.route("hi", [], None, None).model == "tiny"
+
+    @pytest.mark.parametrize("changes", [
+        {"threshold": 2},
+        {"weights": {"length": 0}},
+        {"weights": {"sentiment": 1}},
+        {"long_query_tokens": 1},
+        {"intent_scores": {"lookup": 5}},
+        {"unknown_field": 1},
+    ])
+    def test_invalid_policy_rejected(self, router, changes):
+        with pytest.raises(ValueError):
+            router.set_policy(changes)
+        assert router.get_policy() == RoutingPolicy()
+
+    @pytest.mark.parametrize("content", [
+        "{not json",
+        '["threshold", 0.7]',
+        '{"threshold": 0.7, "unknown_field": 1}',
+        '{"threshold": 7}',
+    ])
+    def test_malformed_file_falls_back_to_default(self, router, content, caplog):
+        with open(router.path, "w", encoding="utf-8") as f:
+            f.write(content)
+        assert router.get_policy() == RoutingPolicy()
+        assert router.route("hi", [], None, None).route == "small"
+        assert "invalid routing policy" in caplog.text
+
+    def test_reset(self, router):
+        router.set_policy({"threshold": 0.9})
+        router.reset()
+        assert router.get_policy() == RoutingPolicy()
+
+    def test_per_route_metrics(self, router):
+        small = router.route("hi", [], None, None)
+        router.record(small, 0.2, prompt_tokens=100, completion_tokens=20)
+        router.record(small, 0.4, prompt_tokens=100, completion_tokens=40)
+        router.record(small, 5.0, prompt_tokens=100, completion_tokens=0, degraded=True)
+        stats = router.get_stats()["routes"]["small"]
+        assert (stats["requests"], stats["degraded"]) == (3, 1)
+        assert (stats["prompt_tokens"], stats["completion_tokens"], stats["avg_completion_tokens"]) == (300, 60, 30.0)
+        assert stats["p95_ms"] == 400.0
+
+
+# ──────────────────────────────────────────────
+# 3. Chat pipeline and admin API
+# ──────────────────────────────────────────────
+
+class TestRoutingInChat:
+    @pytest.fixture(autouse=True)
+    def _length_only_policy(self, monkeypatch, fake_llm):
+        self.calls = fake_llm("LLM answer")
+        monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", False)
+        # Route on query length alone, whatever the embedding model in use
+        model_router.set_policy({"weights": {"length": 1.0}, "small_model": "small-model", "large_model": "large-model"})
+        client.post("/api/v1/documents/embed", json={
+            "content": "The college is on Jubilee Mission Road. BCom admission opens in May.",
+            "title": "About",
+        }, params={"collection_name": ROUTER_COLLECTION})
+        yield
+        model_router.reset()
+
+    @property
+    def models(self):
+        return [call["model"] for call in self.calls]
+
+    def ask(self, text, **extra):
+        r = client.post("/api/v1/chat/", json={"message": text, "collection_name": ROUTER_COLLECTION, **extra})
+        assert r.status_code == 200
+        return r
+
+    def test_short_question_goes_to_the_small_model(self):
+        self.ask("college address")
+        assert self.models == ["small-model"]
+
+    def test_long_question_goes_to_the_large_model(self):
+        self.ask(" ".join(["Please explain in detail how admission to BCom works for a late applicant"] * 4))
+        assert self.models == ["large-model"]
+
+    def test_client_choice_wins(self):
+        self.ask("college address", groq_model="chosen-model")
+        assert self.models == ["chosen-model"]
+
+    def test_small_model_answers_are_not_cached(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", True)
+        semantic_cache.clear()
+        self.ask("college address")
+        self.ask("college address")
+        assert self.models == ["small-model", "small-model"]
+        semantic_cache.clear()
+
+    def test_streams_are_routed(self, fake_llm):
+        self.calls = fake_llm(stream=["ok"])
+        client.post("/api/v1/chat/stream", json={"message": "college address", "collection_name": ROUTER_COLLECTION})
+        assert self.models == ["small-model"]
+
+    def test_admin_policy_and_metrics(self, admin_headers):
+        self.ask("college address")
+        body = client.get("/api/v1/admin/routing", headers=admin_headers).json()
+        assert body["routes"]["small"]["requests"] >= 1
+        assert body["policy"]["weights"] == {"length": 1.0}
+
+        r = client.put("/api/v1/admin/routing", headers=admin_headers, json={"threshold": 0.8, "large_model": None})
+        assert r.status_code == 200
+        assert r.json()["policy"]["threshold"] == 0.8 and r.json()["policy"]["large_model"] is None
+        assert client.put("/api/v1/admin/routing", headers=admin_headers, json={"threshold": 3}).status_code == 400
+
+        r = client.delete("/api/v1/admin/routing", headers=admin_headers)
+        assert r.json()["policy"]["threshold"] == 0.5
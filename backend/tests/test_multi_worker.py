@@ -0,0 +1,193 @@
+"""
+Multi-worker test: several API processes share one set of state files
+(WORKERS > 1), and a single chat session is driven through all of them.
+Each worker runs with a fake LLM that answers with its own process id.
+Documents are either ingested before the workers start or, with a Chroma
+server, written through one worker and retrieved through the other.
+"""
+
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RATE_LIMIT = 6
+
+WORKER_SCRIPT = """
+import os, sys
+from types import SimpleNamespace
+import uvicorn
+from app.main import app
+from app.services.chat_service import chat_service
+
+async def fake_create(**kwargs):
+    answer = f"answer from worker {os.getpid()}"
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=answer))])
+
+chat_service.groq_client.chat.completions.create = fake_create
+uvicorn.run(app, host="127.0.0.1", port=int(sys.argv[1]), log_level="warning")
+"""
+
+SEED_SCRIPT = """
+from app.services.document_service import document_service
+document_service.process_and_store_document(
+    "Vimala College in Thrissur offers BCom, BSc and BA programmes. Hostel rooms are allotted in June.",
+    "Multi-worker Seed", {}, "default",
+)
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ──────────────────────────────────────────────
+# Fixtures
+# ──────────────────────────────────────────────
+
+def wait_until_up(url, deadline, what):
+    while True:
+        try:
+            if httpx.get(url).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        assert time.monotonic() < deadline, f"{what} did not start"
+        time.sleep(0.5)
+
+
+@contextmanager
+def running(commands, env, urls, what):
+    processes = [subprocess.Popen(command, cwd=BACKEND_DIR, env=env) for command in commands]
+    try:
+        deadline = time.monotonic() + 180
+        for url in urls:
+            wait_until_up(url, deadline, what)
+        yield
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+
+
+def worker_env(state_dir, **overrides):
+    return {
+        **os.environ,
+        "CHROMA_DB_PATH": os.path.join(state_dir, "chroma"),
+        "SESSION_DB_PATH": os.path.join(state_dir, "sessions.db"),
+        "SHARED_STATE_DB_PATH": os.path.join(state_dir, "shared_state.db"),
+        "WORKERS": "2",
+        "ADMIN_USERNAME": "testadmin",
+        "ADMIN_PASSWORD": "testpass123",
+        "ADMIN_SECRET_KEY": "test-secret-key-for-jwt-minimum-32bytes!",
+        "GROQ_API_KEY": "test-key",
+        **overrides,
+    }
+
+
+@contextmanager
+def running_workers(env):
+    ports = [free_port(), free_port()]
+    urls = [f"http://127.0.0.1:{port}" for port in ports]
+    commands = [[sys.executable, "-c", WORKER_SCRIPT, str(port)] for port in ports]
+    with running(commands, env, [f"{url}/health" for url in urls], "workers"):
+        yield urls
+
+
+@pytest.fixture(scope="module")
+def workers():
+    env = worker_env(tempfile.mkdtemp(prefix="chatbot_multi_worker_"), RATE_LIMIT_PER_MINUTE=str(RATE_LIMIT))
+    # Embedded Chroma does not see writes from other processes, so documents go in before the workers start
+    subprocess.run([sys.executable, "-c", SEED_SCRIPT], cwd=BACKEND_DIR, env=env, check=True)
+    with running_workers(env) as urls:
+        yield urls
+
+
+@pytest.fixture(scope="module")
+def server_workers():
+    """Two workers sharing one Chroma server, with nothing ingested up front"""
+    chroma = shutil.which("chroma")
+    if chroma is None:
+        pytest.skip("the chroma CLI is not installed")
+    state_dir = tempfile.mkdtemp(prefix="chatbot_multi_worker_server_")
+    port = free_port()
+    server = [chroma, "run", "--path", os.path.join(state_dir, "chroma_server"), "--port", str(port)]
+    env = worker_env(state_dir, CHROMA_SERVER_HOST="127.0.0.1", CHROMA_SERVER_PORT=str(port))
+    with running([server], env, [f"http://127.0.0.1:{port}/api/v2/heartbeat"], "chroma server"):
+        with running_workers(env) as urls:
+            yield urls
+
+
+# ──────────────────────────────────────────────
+# Tests
+# ──────────────────────────────────────────────
+
+class TestMultiWorker:
+    def test_shared_session_cache_and_rate_limit(self, workers):
+        a, b = workers
+        # Rate limits use one-minute windows; start well inside one
+        if time.time() % 60 > 40:
+            time.sleep(61 - time.time() % 60)
+        sid = httpx.post(f"{a}/api/v1/chat/session", json={}).json()["session_id"]
+
+        questions = ["Which programmes are offered?", "hostel allotment month", "Tell me about BCom"]
+        for i, question in enumerate(questions):
+            r = httpx.post(f"{workers[i % 2]}/api/v1/chat/", json={"message": question, "session_id": sid}, timeout=60)
+            assert r.status_code == 200
+
+        # History written by both workers is visible from either
+        history = httpx.get(f"{b}/api/v1/chat/history/{sid}").json()["history"]
+        assert [m["content"] for m in history if m["role"] == "user"] == questions
+        assert httpx.get(f"{a}/api/v1/chat/sessions").json()["total_sessions"] == 1
+
+        # An answer stored by one worker is served from the shared cache by the other
+        first = httpx.post(f"{a}/api/v1/chat/", json={"message": "Is there a PhD programme?"}, timeout=60).json()
+        second = httpx.post(f"{b}/api/v1/chat/", json={"message": "Is there a PhD programme?"}, timeout=60).json()
+        assert second["response"] == first["response"]
+
+        # Five chat requests so far: one more is allowed, then either worker refuses
+        assert httpx.post(f"{b}/api/v1/chat/", json={"message": "Last allowed"}, timeout=60).status_code == 200
+        limited = httpx.post(f"{a}/api/v1/chat/", json={"message": "Over the limit"}, timeout=60)
+        assert limited.status_code == 429
+        assert int(limited.headers["Retry-After"]) > 0
+
+    def test_document_writes_need_a_chroma_server(self, workers):
+        a, _ = workers
+        r = httpx.post(f"{a}/api/v1/documents/embed", json={"content": "Lost on the other worker.", "title": "Refused"})
+        assert r.status_code == 409
+        assert httpx.get(f"{a}/api/v1/documents/").status_code == 200
+
+
+class TestMultiWorkerChromaServer:
+    def test_writes_on_one_worker_are_retrieved_by_the_other(self, server_workers):
+        a, b = server_workers
+        doc = {"content": "The QX91 bridge course runs for six weeks in July.", "title": "Bridge course"}
+        r = httpx.post(f"{a}/api/v1/documents/embed", json=doc, params={"collection_name": "shared_col"}, timeout=60)
+        assert r.status_code == 200
+
+        chat = {"message": "How long is the QX91 bridge course?", "collection_name": "shared_col"}
+        sources = httpx.post(f"{b}/api/v1/chat/", json=chat, timeout=60).json()["sources"]
+        assert any("QX91" in source["content"] for source in sources)
+
+        # Recreated by one worker while the other holds a handle to the old collection
+        r = httpx.post(f"{a}/api/v1/documents/collections/create", json={"name": "shared_col", "overwrite": True})
+        assert r.status_code == 200
+        doc = {"content": "The QX92 bridge course runs for four weeks in May.", "title": "New bridge course"}
+        httpx.post(f"{a}/api/v1/documents/embed", json=doc, params={"collection_name": "shared_col"}, timeout=60)
+
+        chat = {"message": "How long is the QX92 bridge course?", "collection_name": "shared_col"}
+        r = httpx.post(f"{b}/api/v1/chat/", json=chat, timeout=60)
+        assert r.status_code == 200
+        assert [source["content"] for source in r.json()["sources"]] == [doc["content"]]
@@ -0,0 +1,183 @@
+"""
+Tests for on-demand profiling: the sampling CPU profiler and its collapsed-stack output,
+tracemalloc snapshots and diffs, thread and task stack dumps, and the admin endpoints.
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.profiler import (
+    MemoryProfiler,
+    SamplingProfiler,
+    cpu_profiler,
+    memory_profiler,
+    task_stacks,
+    thread_stacks,
+)
+
+client = TestClient(app)
+PROFILE_COLLECTION = "profiler_test"
+
+
+def spin_for_profile(seconds):
+    until = time.perf_counter() + seconds
+    while time.perf_counter() < until:
+        pass
+
+
+def wait_for(condition, timeout=2.0):
+    until = time.monotonic() + timeout
+    while not condition() and time.monotonic() < until:
+        time.sleep(0.01)
+    return condition()
+
+
+# ──────────────────────────────────────────────
+# 1. CPU sampling
+# ──────────────────────────────────────────────
+
+class TestSamplingProfiler:
+    def test_profiles_the_next_n_requests(self):
+        profiler = SamplingProfiler(max_seconds=10)
+        profiler.start(requests=2, interval=0.001)
+        for _ in range(3):
+            with profiler.request():
+                spin_for_profile(0.05)
+
+        status = profiler.get_status()
+        assert status["state"] == "done"
+        assert (status["started"], status["finished"]) == (2, 2)
+        assert status["samples"] > 0
+
+        lines = profiler.collapsed().splitlines()
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) >= 1 and stack.startswith("thread ")
+        assert any("spin_for_profile (" in line and "test_profiler.py:" in line for line in lines)
+
+    def test_one_session_at_a_time(self):
+        profiler = SamplingProfiler(max_seconds=10)
+        profiler.start(requests=1, interval=0.01)
+        with pytest.raises(ValueError):
+            profiler.start(requests=1, interval=0.01)
+        profiler.stop()
+        assert profiler.get_status()["state"] == "cancelled"
+        profiler.start(requests=1, interval=0.01)
+        profiler.stop()
+
+    def test_session_times_out(self):
+        profiler = SamplingProfiler(max_seconds=0.05)
+        profiler.start(requests=5, interval=0.01)
+        assert wait_for(lambda: profiler.get_status()["state"] == "timed_out")
+        with profiler.request():
+            pass
+        assert profiler.get_status()["started"] == 0
+
+
+# ──────────────────────────────────────────────
+# 2. Memory snapshots and stack dumps
+# ──────────────────────────────────────────────
+
+class TestMemoryProfiler:
+    def test_snapshot_diff_finds_the_allocation(self):
+        profiler = MemoryProfiler(frames=5, max_snapshots=3)
+        try:
+            before = profiler.take_snapshot()
+            retained = [bytes(1024) for _ in range(2000)]
+            after = profiler.take_snapshot()
+
+            stats = profiler.diff(after["id"], before["id"], limit=5)
+            assert "test_profiler.py" in stats[0]["location"]
+            assert stats[0]["size_diff"] >= 2000 * 1024
+            assert profiler.diff(after["id"], group_by="filename", limit=3)
+            assert len(retained) == 2000
+        finally:
+            profiler.stop()
+        assert profiler.get_stats() == {"tracing": False, "traced_bytes": 0, "peak_bytes": 0, "snapshots": []}
+
+    def test_old_snapshots_are_dropped_and_bad_requests_rejected(self):
+        profiler = MemoryProfiler(frames=1, max_snapshots=2)
+        try:
+            ids = [profiler.take_snapshot()["id"] for _ in range(3)]
+            assert [s["id"] for s in profiler.get_stats()["snapshots"]] == ids[1:]
+            with pytest.raises(KeyError):
+                profiler.diff(ids[2], ids[0])
+            with pytest.raises(ValueError):
+                profiler.diff(ids[2], group_by="module")
+        finally:
+            profiler.stop()
+
+
+class TestStackDumps:
+    def test_thread_stacks(self):
+        main = next(t for t in thread_stacks() if t["name"] == "MainThread")
+        assert any("test_thread_stacks" in line for line in main["stack"])
+
+    def test_task_stacks(self):
+        async def parked():
+            await asyncio.sleep(10)
+
+        async def run():
+            task = asyncio.ensure_future(parked())
+            await asyncio.sleep(0)
+            stacks = task_stacks()
+            task.cancel()
+            return stacks
+
+        tasks = asyncio.run(run())
+        assert any(t["coroutine"].endswith("parked") and t["stack"][0].startswith("parked (") for t in tasks)
+
+
+# ──────────────────────────────────────────────
+# 3. Admin endpoints
+# ──────────────────────────────────────────────
+
+class TestProfilingEndpoints:
+    @pytest.fixture(autouse=True)
+    def _cleanup(self):
+        yield
+        cpu_profiler.stop()
+        memory_profiler.stop()
+
+    def test_cpu_profile_of_chat_requests(self, monkeypatch, fake_llm, admin_headers):
+        fake_llm("Profiled answer")
+        monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", False)
+        client.post("/api/v1/documents/embed", json={
+            "content": "Library hours are 8 am to 6 pm on weekdays.", "title": "Library",
+        }, params={"collection_name": PROFILE_COLLECTION})
+
+        r = client.post("/api/v1/admin/profile/cpu", headers=admin_headers, json={"requests": 1, "interval_ms": 1})
+        assert r.status_code == 200 and r.json()["state"] == "running"
+        assert client.post("/api/v1/admin/profile/cpu", headers=admin_headers, json={"requests": 1}).status_code == 409
+
+        client.post("/api/v1/chat/", json={"message": "Library hours?", "collection_name": PROFILE_COLLECTION})
+        status = client.get("/api/v1/admin/profile/cpu", headers=admin_headers).json()
+        assert (status["state"], status["finished"]) == ("done", 1)
+
+        r = client.get("/api/v1/admin/profile/cpu/flamegraph", headers=admin_headers)
+        assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+
+    def test_memory_endpoints(self, admin_headers):
+        first = client.post("/api/v1/admin/profile/memory/snapshots", headers=admin_headers).json()
+        second = client.post("/api/v1/admin/profile/memory/snapshots", headers=admin_headers).json()
+        assert client.get("/api/v1/admin/profile/memory", headers=admin_headers).json()["tracing"] is True
+
+        r = client.get("/api/v1/admin/profile/memory/diff", headers=admin_headers,
+                       params={"from": first["id"], "to": second["id"], "limit": 5})
+        assert r.status_code == 200 and len(r.json()["stats"]) <= 5
+        assert client.get("/api/v1/admin/profile/memory/diff", headers=admin_headers, params={"to": 10 ** 6}).status_code == 404
+        assert client.get("/api/v1/admin/profile/memory/diff", headers=admin_headers,
+                          params={"to": second["id"], "group_by": "module"}).status_code == 400
+
+        assert client.delete("/api/v1/admin/profile/memory", headers=admin_headers).json()["tracing"] is False
+
+    def test_stack_dump_endpoint_requires_admin(self, admin_headers):
+        assert client.get("/api/v1/admin/profile/threads").status_code in (401, 403)
+        body = client.get("/api/v1/admin/profile/threads", headers=admin_headers).json()
+        assert body["pid"] == os.getpid()
+        assert any(t["name"] == "MainThread" for t in body["threads"]) and body["tasks"]
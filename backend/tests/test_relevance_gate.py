@@ -0,0 +1,159 @@
+"""
+Tests for the relevance gate: threshold calibration from an evaluation set,
+per-collection persistence, and skipping the LLM for off-topic questions.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.chat_service import NO_CONTEXT_RESPONSE
+from app.services.relevance_gate import RelevanceGate, calibrate_threshold, relevance_gate
+from app.services.semantic_cache import semantic_cache
+
+client = TestClient(app)
+
+GATE_COLLECTION = "test_relevance_gate"
+
+
+# ──────────────────────────────────────────────
+# 1. Calibration and persistence
+# ──────────────────────────────────────────────
+
+class TestCalibration:
+    def test_picks_cut_between_separated_sets(self):
+        report = calibrate_threshold([0.2, 0.3, 0.4], [0.9, 1.1, 1.3], target_recall=1.0)
+        assert report["threshold"] == 0.4
+        assert report["recall"] == 1.0
+        assert report["rejection_rate"] == 1.0
+
+    def test_recall_target_wins_over_rejection(self):
+        # 0.8 is both the last in-scope and first out-of-scope distance
+        report = calibrate_threshold([0.2, 0.5, 0.8], [0.8, 1.0], target_recall=1.0)
+        assert report["threshold"] == 0.8
+        assert report["rejection_rate"] == 0.5
+
+        lenient = calibrate_threshold([0.2, 0.5, 0.8], [0.8, 1.0], target_recall=0.6)
+        assert lenient["threshold"] == 0.5
+        assert lenient["rejection_rate"] == 1.0
+
+    def test_requires_in_scope_questions(self):
+        with pytest.raises(ValueError):
+            calibrate_threshold([], [1.0], target_recall=0.9)
+
+    def test_thresholds_persist_per_collection(self, tmp_path):
+        path = str(tmp_path / "thresholds.json")
+        gate = RelevanceGate(path)
+        gate.set_threshold("a", 0.75)
+
+        reloaded = RelevanceGate(path)
+        assert reloaded.get_threshold("a") == 0.75
+        assert reloaded.get_threshold("b") is None
+
+        reloaded.forget("a")
+        assert RelevanceGate(path).get_threshold("a") is None
+
+    def test_uncalibrated_collection_uses_default(self, tmp_path):
+        gate = RelevanceGate(str(tmp_path / "t.json"), default_threshold=0.5)
+        assert gate.allows("any", [0.4])
+        assert not gate.allows("any", [0.6])
+        assert gate.get_stats()["llm_calls_avoided"] == 1
+
+        # Keyword-only chunks have no distance; a keyword match passes on its own
+        assert gate.allows("any", [None], keyword_match=True)
+        assert not gate.allows("any", [None])
+
+        ungated = RelevanceGate(str(tmp_path / "u.json"))
+        assert ungated.allows("any", [99.0])
+        assert ungated.get_stats()["collections"] == {}
+
+
+# ──────────────────────────────────────────────
+# 2. Chat short-circuit
+# ──────────────────────────────────────────────
+
+class TestChatShortCircuit:
+    @pytest.fixture(autouse=True)
+    def _setup(self, fake_llm):
+        self.calls = fake_llm("Fees are listed online.")
+        semantic_cache.clear()
+        client.post("/api/v1/documents/embed", json={
+            "content": "The BCom programme fee at Vimala College is 20000 rupees per year.",
+            "title": "Fees",
+        }, params={"collection_name": GATE_COLLECTION})
+        yield
+        relevance_gate.forget(GATE_COLLECTION)
+        semantic_cache.clear()
+
+    def ask(self, message):
+        r = client.post("/api/v1/chat/", json={"message": message, "collection_name": GATE_COLLECTION})
+        assert r.status_code == 200
+        return r.json()
+
+    def test_far_question_skips_llm(self):
+        relevance_gate.set_threshold(GATE_COLLECTION, 0.0)
+        before = relevance_gate.get_stats()["llm_calls_avoided"]
+
+        body = self.ask("Who won the football world cup?")
+        assert body["response"] == NO_CONTEXT_RESPONSE
+        assert body["sources"] == []
+        assert self.calls == []
+        assert relevance_gate.get_stats()["llm_calls_avoided"] == before + 1
+
+    def test_close_question_reaches_llm(self):
+        relevance_gate.set_threshold(GATE_COLLECTION, 1e9)
+        body = self.ask("What is the BCom fee?")
+        assert body["response"] == "Fees are listed online."
+        assert len(self.calls) == 1
+
+    def test_keyword_match_reaches_llm(self, monkeypatch):
+        monkeypatch.setattr(settings, "HYBRID_SEARCH_ENABLED", True)
+        relevance_gate.set_threshold(GATE_COLLECTION, 0.0)
+        body = self.ask("Vimala BCom rupees")
+        assert body["response"] == "Fees are listed online."
+        assert len(self.calls) == 1
+
+    def test_stream_short_circuits_too(self):
+        relevance_gate.set_threshold(GATE_COLLECTION, 0.0)
+        r = client.post("/api/v1/chat/stream", json={"message": "Recipe for cake", "collection_name": GATE_COLLECTION})
+        assert NO_CONTEXT_RESPONSE in r.text
+        assert self.calls == []
+
+    def test_calibrate_endpoint_applies_threshold(self, admin_headers):
+        r = client.post(f"/api/v1/admin/relevance/{GATE_COLLECTION}/calibrate", headers=admin_headers, json={
+            "in_scope": ["What is the BCom programme fee?", "How much is the BCom fee per year?"],
+            "out_of_scope": ["Write a poem about the ocean"],
+            "target_recall": 1.0,
+        })
+        assert r.status_code == 200
+        report = r.json()
+        assert report["applied"] is True
+        assert report["recall"] == 1.0
+        assert relevance_gate.get_threshold(GATE_COLLECTION) == report["threshold"]
+
+        stats = client.get("/api/v1/admin/relevance", headers=admin_headers).json()
+        assert stats["thresholds"][GATE_COLLECTION] == report["threshold"]
+
+    def test_calibrate_rejects_empty_eval_set(self, admin_headers):
+        r = client.post(f"/api/v1/admin/relevance/{GATE_COLLECTION}/calibrate", headers=admin_headers, json={
+            "in_scope": [],
+        })
+        assert r.status_code == 400
+
+    def test_deleting_collection_drops_threshold(self):
+        relevance_gate.set_threshold(GATE_COLLECTION, 0.5)
+        client.delete(f"/api/v1/documents/collections/{GATE_COLLECTION}")
+        assert relevance_gate.get_threshold(GATE_COLLECTION) is None
+
+    def test_overwriting_collection_drops_threshold(self):
+        relevance_gate.set_threshold(GATE_COLLECTION, 0.5)
+        r = client.post("/api/v1/documents/collections/create", json={"name": GATE_COLLECTION, "overwrite": True})
+        assert r.status_code == 200
+        assert relevance_gate.get_threshold(GATE_COLLECTION) is None
+
+    def test_calibrate_rejects_empty_collection(self, admin_headers):
+        r = client.post("/api/v1/admin/relevance/test_relevance_empty/calibrate", headers=admin_headers, json={
+            "in_scope": ["What is the BCom fee?"],
+        })
+        assert r.status_code == 400
@@ -0,0 +1,143 @@
+"""
+Tests for the cross-encoder rerank stage: batched scoring, the pair score cache,
+the latency budget fallback, and reranked sources in the chat pipeline.
+"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services import reranker as reranker_module
+from app.services.reranker import Reranker
+from app.services.semantic_cache import semantic_cache
+
+client = TestClient(app)
+
+RERANK_COLLECTION = "test_reranker"
+
+
+class KeywordCrossEncoder:
+    """Scores a pair by how often 'scholarship' appears in the chunk; records every batch"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    def predict(self, pairs, batch_size, show_progress_bar):
+        self.batches.append(list(pairs))
+        time.sleep(self.delay)
+        return [doc.lower().count("scholarship") for _, doc in pairs]
+
+
+def results(*documents):
+    ids = [f"c{i}" for i in range(len(documents))]
+    return {
+        "ids": [ids],
+        "documents": [list(documents)],
+        "metadatas": [[{"i": i} for i in range(len(documents))]],
+        "distances": [[0.1 * i for i in range(len(documents))]],
+    }
+
+
+# ──────────────────────────────────────────────
+# 1. Reranker unit behaviour
+# ──────────────────────────────────────────────
+
+class TestReranker:
+    def test_reorders_and_keeps_top_n(self):
+        model = KeywordCrossEncoder()
+        reranker = Reranker(lambda: model, timeout_ms=1000, cache_size=100)
+        out = asyncio.run(reranker.rerank("scholarships?", results("fees", "scholarship scholarship", "scholarship"), top_n=2))
+
+        assert out["ids"] == [["c1", "c2"]]
+        assert out["distances"] == [[0.1, 0.2]]
+        assert len(model.batches) == 1
+        assert len(model.batches[0]) == 3
+
+    def test_pair_scores_are_cached(self):
+        model = KeywordCrossEncoder()
+        reranker = Reranker(lambda: model, timeout_ms=1000, cache_size=100)
+        asyncio.run(reranker.rerank("Scholarships?", results("a", "scholarship"), top_n=2))
+        asyncio.run(reranker.rerank("scholarships", results("a", "scholarship", "scholarship b"), top_n=2))
+
+        assert [len(batch) for batch in model.batches] == [2, 1]
+        assert reranker.stats.cache_hits == 2
+
+    def test_cache_is_bounded(self):
+        reranker = Reranker(lambda: KeywordCrossEncoder(), timeout_ms=1000, cache_size=2)
+        asyncio.run(reranker.rerank("q", results("a", "b", "c"), top_n=3))
+        assert reranker.get_stats()["cached_pairs"] == 2
+
+    def test_over_budget_keeps_retrieval_order_and_fills_cache(self):
+        model = KeywordCrossEncoder(delay=0.3)
+        reranker = Reranker(lambda: model, timeout_ms=20, cache_size=100)
+        candidates = results("fees", "scholarship", "hostel")
+
+        out = asyncio.run(reranker.rerank("scholarship", candidates, top_n=2))
+        assert out["ids"] == [["c0", "c1"]]
+        assert reranker.stats.timeouts == 1
+
+        # The late pass still lands in the cache, so the repeat is reranked without the model
+        time.sleep(0.4)
+        out = asyncio.run(reranker.rerank("scholarship", candidates, top_n=2))
+        assert out["ids"][0][0] == "c1"
+        assert len(model.batches) == 1
+
+    def test_requests_during_a_running_pass_keep_retrieval_order(self):
+        model = KeywordCrossEncoder(delay=0.3)
+        reranker = Reranker(lambda: model, timeout_ms=20, cache_size=100)
+
+        asyncio.run(reranker.rerank("scholarship", results("fees", "scholarship"), top_n=2))
+        out = asyncio.run(reranker.rerank("scholarships", results("hostel", "scholarship"), top_n=2))
+
+        assert out["ids"] == [["c0", "c1"]]
+        assert reranker.stats.busy == 1
+        assert len(model.batches) == 1
+        time.sleep(0.4)
+
+    def test_model_errors_fall_back(self):
+        def broken():
+            raise RuntimeError("no model")
+
+        reranker = Reranker(broken, timeout_ms=1000, cache_size=10)
+        out = asyncio.run(reranker.rerank("q", results("a", "b"), top_n=1))
+        assert out["ids"] == [["c0"]]
+        assert reranker.stats.errors == 1
+
+
+# ──────────────────────────────────────────────
+# 2. Chat pipeline
+# ──────────────────────────────────────────────
+
+class TestChatRerank:
+    @pytest.fixture(autouse=True)
+    def _setup(self, monkeypatch, fake_llm):
+        self.model = KeywordCrossEncoder()
+        fake_llm("ok")
+        monkeypatch.setattr(settings, "RERANK_ENABLED", True)
+        monkeypatch.setattr(settings, "N_RESULTS", 1)
+        monkeypatch.setattr(reranker_module.reranker, "_load_model", lambda: self.model)
+        reranker_module.reranker.clear()
+        semantic_cache.clear()
+        yield
+        semantic_cache.clear()
+
+    def test_sources_follow_cross_encoder_order(self):
+        for content in ("Hostel rooms are allotted in June.", "Merit scholarship for toppers.", "Library opens at 8."):
+            client.post("/api/v1/documents/embed", json={"content": content, "title": content[:10]},
+                        params={"collection_name": RERANK_COLLECTION})
+
+        r = client.post("/api/v1/chat/", json={"message": "When do hostels open?", "collection_name": RERANK_COLLECTION})
+        assert r.status_code == 200
+        sources = r.json()["sources"]
+        assert [s["content"] for s in sources] == ["Merit scholarship for toppers."]
+        assert len(self.model.batches[0]) == 3
+
+    def test_admin_stats(self, admin_headers):
+        r = client.get("/api/v1/admin/rerank", headers=admin_headers)
+        assert r.status_code == 200
+        assert r.json()["enabled"] is True
@@ -0,0 +1,228 @@
+"""
+Tests for the chat caches: the semantic answer cache (similarity matching,
+eviction, expiry, invalidation when a collection's documents change) and the
+normalized query embedding cache.
+"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.embedding_cache import QueryEmbeddingCache
+from app.services.semantic_cache import SemanticCache, semantic_cache
+from app.utils.text import normalize_query
+
+client = TestClient(app)
+
+CACHE_COLLECTION = "test_semantic_cache"
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def make_cache(**overrides):
+    options = {"threshold": 0.9, "ttl_seconds": 60, "max_entries": 100, "max_bytes": 1 << 20}
+    options.update(overrides)
+    return SemanticCache(**options)
+
+
+# ──────────────────────────────────────────────
+# 1. Cache unit behaviour
+# ──────────────────────────────────────────────
+
+class TestSemanticCacheUnit:
+    def test_hit_above_threshold_miss_below(self):
+        cache = make_cache()
+        ns = cache.namespace("col", "model", "prompt")
+        cache.store(ns, unit(1, 0, 0), "BCom fee is listed on the website.", [])
+
+        assert cache.lookup(ns, unit(1, 0.1, 0)).response.startswith("BCom fee")
+        assert cache.lookup(ns, unit(0, 1, 0)) is None
+        assert cache.stats.hits == 1
+        assert cache.stats.misses == 1
+
+    def test_namespaces_are_isolated(self):
+        cache = make_cache()
+        cache.store(cache.namespace("col", "model", "prompt"), unit(1, 0), "answer", [])
+        assert cache.lookup(cache.namespace("col", "other-model", "prompt"), unit(1, 0)) is None
+        assert cache.lookup(cache.namespace("other-col", "model", "prompt"), unit(1, 0)) is None
+        assert cache.lookup(cache.namespace("col", "model", "other prompt"), unit(1, 0)) is None
+
+    def test_lru_eviction_by_entry_count(self):
+        cache = make_cache(max_entries=2)
+        ns = cache.namespace("col", "m", "p")
+        cache.store(ns, unit(1, 0, 0), "a", [])
+        cache.store(ns, unit(0, 1, 0), "b", [])
+        cache.lookup(ns, unit(1, 0, 0))  # touch "a" so "b" is least recently used
+        cache.store(ns, unit(0, 0, 1), "c", [])
+
+        assert cache.lookup(ns, unit(0, 1, 0)) is None
+        assert cache.lookup(ns, unit(1, 0, 0)).response == "a"
+        assert cache.stats.evictions == 1
+
+    def test_memory_cap(self):
+        cache = make_cache(max_bytes=2000)
+        ns = cache.namespace("col", "m", "p")
+        for i in range(10):
+            cache.store(ns, unit(i + 1, 1), "x" * 500, [])
+        assert cache.get_stats()["bytes"] <= 2000
+        assert cache.get_stats()["entries"] < 10
+
+    def test_ttl_expiry(self):
+        cache = make_cache(ttl_seconds=0.05)
+        ns = cache.namespace("col", "m", "p")
+        cache.store(ns, unit(1, 0), "stale", [])
+        time.sleep(0.1)
+        assert cache.lookup(ns, unit(1, 0)) is None
+        assert cache.stats.expirations == 1
+
+    def test_expired_best_match_does_not_hide_a_live_one(self):
+        cache = make_cache(ttl_seconds=0.05)
+        ns = cache.namespace("col", "m", "p")
+        cache.store(ns, unit(1, 0), "stale", [])
+        time.sleep(0.1)
+        cache.store(ns, unit(1, 0.2), "fresh", [])
+
+        assert cache.lookup(ns, unit(1, 0)).response == "fresh"
+        assert cache.stats.expirations == 1
+        assert cache.get_stats()["entries"] == 1
+
+    def test_invalidation_bumps_collection_version(self):
+        cache = make_cache()
+        old_ns = cache.namespace("col", "m", "p")
+        cache.store(old_ns, unit(1, 0), "old answer", [])
+        cache.invalidate_collection("col")
+
+        new_ns = cache.namespace("col", "m", "p")
+        assert new_ns != old_ns
+        assert cache.lookup(new_ns, unit(1, 0)) is None
+        # An answer computed before the invalidation must not be stored afterwards
+        cache.store(old_ns, unit(1, 0), "late answer", [])
+        assert cache.get_stats()["entries"] == 0
+
+
+# ──────────────────────────────────────────────
+# 2. Chat pipeline integration
+# ──────────────────────────────────────────────
+
+class TestSemanticCacheInChat:
+    @pytest.fixture(autouse=True)
+    def _counting_llm(self, fake_llm):
+        calls = fake_llm(lambda kwargs: f"answer {len(calls)}")
+        semantic_cache.clear()
+        client.post("/api/v1/documents/embed", json={
+            "content": "The BCom programme fee is published in the prospectus.",
+            "title": "Fees",
+        }, params={"collection_name": CACHE_COLLECTION})
+        self.calls = calls
+        yield
+        semantic_cache.clear()
+
+    def ask(self, text):
+        r = client.post("/api/v1/chat/", json={"message": text, "collection_name": CACHE_COLLECTION})
+        assert r.status_code == 200
+        return r.json()
+
+    def test_repeat_question_skips_llm(self):
+        first = self.ask("what is the fee for bcom")
+        second = self.ask("what is the fee for bcom")
+        assert len(self.calls) == 1
+        assert second["response"] == first["response"]
+        assert second["sources"] == first["sources"]
+
+    def test_answers_with_conversation_memory_are_not_shared(self):
+        def ask_in(session_id):
+            r = client.post("/api/v1/chat/", json={
+                "message": "what is the fee for bcom", "collection_name": CACHE_COLLECTION, "session_id": session_id,
+            })
+            return r.json()["response"]
+
+        first = ask_in("cache-memory-a")
+        # The session now has a turn, so the cached answer is not served and the new one is not stored
+        follow_up = ask_in("cache-memory-a")
+        assert len(self.calls) == 2
+        assert follow_up != first
+        assert ask_in("cache-memory-b") == first
+        assert len(self.calls) == 2
+
+    def test_cache_calls_run_off_the_event_loop(self, monkeypatch):
+        threads = []
+
+        def recording(method):
+            def wrapper(*args, **kwargs):
+                threads.append(threading.current_thread().name)
+                return method(*args, **kwargs)
+            return wrapper
+
+        for name in ("namespace", "lookup", "store"):
+            monkeypatch.setattr(semantic_cache, name, recording(getattr(semantic_cache, name)))
+        self.ask("what is the fee for bcom")
+
+        assert len(threads) == 3
+        assert all(name.startswith("blocking") for name in threads)
+
+    def test_document_change_invalidates(self):
+        self.ask("what is the fee for bcom")
+        client.post("/api/v1/documents/embed", json={
+            "content": "Updated BCom fee details.",
+            "title": "Fees v2",
+        }, params={"collection_name": CACHE_COLLECTION})
+        self.ask("what is the fee for bcom")
+        assert len(self.calls) == 2
+
+    def test_admin_stats_endpoint(self, admin_headers):
+        self.ask("what is the fee for bcom")
+        self.ask("what is the fee for bcom")
+        r = client.get("/api/v1/admin/cache", headers=admin_headers)
+        assert r.status_code == 200
+        assert r.json()["hits"] >= 1
+
+
+# ──────────────────────────────────────────────
+# 3. Query embedding cache
+# ──────────────────────────────────────────────
+
+class TestQueryEmbeddingCache:
+    def make_cache(self, max_bytes=1 << 20):
+        encoded = []
+
+        def encode(texts):
+            encoded.extend(texts)
+            return np.ones((len(texts), 8), dtype=np.float64) * len(encoded)
+
+        return QueryEmbeddingCache(encode, max_bytes), encoded
+
+    def test_normalize_query(self):
+        assert normalize_query("  What is the FEE for BCom?? ") == "what is the fee for bcom"
+        assert normalize_query("bcom   fees!") == normalize_query("BCom fees")
+
+    def test_variants_share_one_encode(self):
+        cache, encoded = self.make_cache()
+        first = cache.embed("What is the fee for BCom?")
+        second = cache.embed("what is the fee for bcom")
+        assert encoded == ["what is the fee for bcom"]
+        assert np.array_equal(first, second)
+        assert first.dtype == np.float32
+        assert cache.get_stats()["hits"] == 1
+
+    def test_bounded_by_bytes(self):
+        cache, _ = self.make_cache(max_bytes=1000)
+        for i in range(20):
+            cache.embed(f"question {i}")
+        stats = cache.get_stats()
+        assert stats["bytes"] <= 1000
+        assert stats["evictions"] > 0
+        assert stats["entries"] < 20
+
+    def test_embed_many_encodes_only_misses(self):
+        cache, encoded = self.make_cache()
+        cache.embed("fees")
+        vectors = cache.embed_many(["Fees", "hostel", "HOSTEL!"])
+        assert encoded == ["fees", "hostel"]
+        assert len(vectors) == 3
@@ -0,0 +1,158 @@
+"""
+Tests for the chat session stores: shared behaviour of the in-memory and SQLite
+backends, memory-store eviction (LRU, idle TTL, byte cap), SQLite persistence,
+and paginated session listing through the API.
+"""
+
+import sqlite3
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.chat_service import chat_service
+from app.services.session_store import InMemorySessionStore, SQLiteSessionStore
+
+client = TestClient(app)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemorySessionStore(max_sessions=100, idle_ttl=3600, max_bytes=1 << 20)
+    return SQLiteSessionStore(str(tmp_path / "sessions.db"), idle_ttl=3600)
+
+
+# ──────────────────────────────────────────────
+# 1. Behaviour shared by both backends
+# ──────────────────────────────────────────────
+
+class TestSessionStoreContract:
+    def test_append_and_read_history(self, store):
+        store.create("s1")
+        assert store.get_history("s1") == []
+
+        store.append("s1", [("user", "Hi"), ("assistant", "Hello")])
+        history = store.get_history("s1")
+        assert [(m["role"], m["content"]) for m in history] == [("user", "Hi"), ("assistant", "Hello")]
+        assert history[0]["timestamp"]
+
+    def test_missing_session(self, store):
+        assert store.get_history("nope") is None
+        assert store.delete("nope") is False
+
+    def test_append_creates_evicted_session(self, store):
+        store.append("fresh", [("user", "q"), ("assistant", "a")])
+        assert len(store.get_history("fresh")) == 2
+
+    def test_delete(self, store):
+        store.append("s1", [("user", "q")])
+        assert store.delete("s1") is True
+        assert store.get_history("s1") is None
+
+    def test_list_is_paginated_most_recent_first(self, store):
+        for i in range(5):
+            store.append(f"s{i}", [("user", "q")] * i)
+            time.sleep(0.002)
+
+        total, page = store.list(offset=1, limit=2)
+        assert total == 5
+        assert [s["session_id"] for s in page] == ["s3", "s2"]
+        assert [s["message_count"] for s in page] == [3, 2]
+
+    def test_clear(self, store):
+        store.create("s1")
+        store.clear()
+        assert store.list() == (0, [])
+
+
+# ──────────────────────────────────────────────
+# 2. Backend-specific bounds and persistence
+# ──────────────────────────────────────────────
+
+class TestInMemoryBounds:
+    def test_least_recently_active_session_is_evicted(self):
+        store = InMemorySessionStore(max_sessions=2, idle_ttl=3600, max_bytes=1 << 20)
+        store.create("a")
+        store.create("b")
+        store.append("a", [("user", "still here")])
+        store.create("c")
+
+        assert store.get_history("b") is None
+        assert store.get_history("a") is not None
+        assert store.evictions == 1
+
+    def test_byte_cap_evicts_oldest(self):
+        store = InMemorySessionStore(max_sessions=100, idle_ttl=3600, max_bytes=20_000)
+        for i in range(10):
+            store.append(f"s{i}", [("user", "x" * 3000)])
+
+        assert store.get_stats()["bytes"] <= 20_000
+        assert store.get_history("s0") is None
+        assert store.get_history("s9") is not None
+
+    def test_idle_sessions_expire(self):
+        store = InMemorySessionStore(max_sessions=100, idle_ttl=0.05, max_bytes=1 << 20)
+        store.append("old", [("user", "q")])
+        time.sleep(0.1)
+        store.create("new")
+
+        assert store.get_history("old") is None
+        assert store.list()[0] == 1
+        assert store.expirations == 1
+
+
+class TestSQLiteStore:
+    def test_history_survives_a_new_instance(self, tmp_path):
+        path = str(tmp_path / "sessions.db")
+        SQLiteSessionStore(path, idle_ttl=3600).append("s1", [("user", "q"), ("assistant", "a")])
+
+        assert len(SQLiteSessionStore(path, idle_ttl=3600).get_history("s1")) == 2
+
+    def test_uses_wal_journal(self, tmp_path):
+        path = str(tmp_path / "sessions.db")
+        SQLiteSessionStore(path, idle_ttl=3600).create("s1")
+        assert sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_expired_session_starts_over(self, tmp_path):
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"), idle_ttl=0.05)
+        store.append("s1", [("user", "old")])
+        time.sleep(0.1)
+
+        assert store.get_history("s1") is None
+        assert store.list() == (0, [])
+        store.append("s1", [("user", "new")])
+        assert [m["content"] for m in store.get_history("s1")] == ["new"]
+
+
+# ──────────────────────────────────────────────
+# 3. Session API
+# ──────────────────────────────────────────────
+
+class TestSessionAPI:
+    @pytest.fixture(autouse=True)
+    def _clean(self):
+        chat_service.chat_sessions.clear()
+        yield
+        chat_service.chat_sessions.clear()
+
+    def test_sessions_endpoint_pages(self):
+        created = [client.post("/api/v1/chat/session", json={}).json()["session_id"] for _ in range(3)]
+        r = client.get("/api/v1/chat/sessions", params={"offset": 0, "limit": 2})
+        assert r.status_code == 200
+        body = r.json()
+        assert body["total_sessions"] == 3
+        assert body["limit"] == 2
+        assert len(body["sessions"]) == 2
+        assert body["sessions"][0]["session_id"] == created[-1]
+
+    def test_limit_is_bounded(self):
+        assert client.get("/api/v1/chat/sessions", params={"limit": 0}).status_code == 422
+        assert client.get("/api/v1/chat/sessions", params={"limit": 10_000}).status_code == 422
+
+    def test_new_session_has_empty_history(self):
+        sid = client.post("/api/v1/chat/session", json={}).json()["session_id"]
+        r = client.get(f"/api/v1/chat/history/{sid}")
+        assert r.status_code == 200
+        assert r.json()["history"] == []
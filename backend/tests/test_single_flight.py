@@ -0,0 +1,196 @@
+"""
+Tests for single-flight coalescing of identical in-flight LLM requests: shared calls and
+streams, leader failure, stuck-leader timeouts, and concurrent identical chat requests.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.main import app
+from app.services.single_flight import SingleFlight, llm_flights
+
+COALESCE_COLLECTION = "coalesce_test"
+
+
+class Upstream:
+    """Counts upstream calls; each call takes `delay` seconds"""
+
+    def __init__(self, delay=0.05, tokens=("a", "b", "c")):
+        self.calls = 0
+        self.delay = delay
+        self.tokens = tokens
+
+    async def complete(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return f"answer {self.calls}"
+
+    async def stream(self):
+        self.calls += 1
+        for token in self.tokens:
+            await asyncio.sleep(self.delay)
+            yield token
+
+
+async def collect(tokens):
+    return "".join([token async for token in tokens])
+
+
+# ──────────────────────────────────────────────
+# 1. Shared calls
+# ──────────────────────────────────────────────
+
+class TestSharedCalls:
+    def test_identical_calls_share_one_upstream_call(self):
+        flights, upstream = SingleFlight(timeout=5), Upstream()
+
+        async def run():
+            return await asyncio.gather(*[flights.call("k", upstream.complete) for _ in range(10)])
+
+        assert asyncio.run(run()) == ["answer 1"] * 10
+        assert upstream.calls == 1
+        assert flights.get_stats()["followers"] == 9
+        assert flights.get_stats()["in_flight"] == 0
+
+    def test_different_keys_do_not_share(self):
+        flights, upstream = SingleFlight(timeout=5), Upstream()
+
+        async def run():
+            return await asyncio.gather(flights.call("a", upstream.complete), flights.call("b", upstream.complete))
+
+        asyncio.run(run())
+        assert upstream.calls == 2
+
+    def test_leader_failure_reaches_followers_then_clears(self):
+        flights = SingleFlight(timeout=5)
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        async def run():
+            results = await asyncio.gather(*[flights.call("k", failing) for _ in range(3)], return_exceptions=True)
+            return results, await flights.call("k", Upstream().complete)
+
+        results, retry = asyncio.run(run())
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert retry == "answer 1"
+
+    def test_stuck_leader_times_out_to_own_call(self):
+        flights = SingleFlight(timeout=0.05)
+        stuck, fast = Upstream(delay=5), Upstream(delay=0)
+
+        async def run():
+            leader = asyncio.ensure_future(flights.call("k", stuck.complete))
+            await asyncio.sleep(0)
+            answer = await flights.call("k", fast.complete)
+            leader.cancel()
+            return answer
+
+        assert asyncio.run(run()) == "answer 1"
+        assert fast.calls == 1
+        assert flights.get_stats()["timeouts"] == 1
+
+    def test_leader_disconnect_does_not_cancel_followers(self):
+        flights, upstream = SingleFlight(timeout=5), Upstream(delay=0.05)
+
+        async def run():
+            leader = asyncio.ensure_future(flights.call("k", upstream.complete))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flights.call("k", upstream.complete))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await follower
+
+        assert asyncio.run(run()) == "answer 1"
+        assert upstream.calls == 1
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "COALESCE_ENABLED", False)
+        flights, upstream = SingleFlight(timeout=5), Upstream()
+
+        async def run():
+            return await asyncio.gather(*[flights.call("k", upstream.complete) for _ in range(3)])
+
+        asyncio.run(run())
+        assert upstream.calls == 3
+
+
+# ──────────────────────────────────────────────
+# 2. Shared streams
+# ──────────────────────────────────────────────
+
+class TestSharedStreams:
+    def test_concurrent_streams_share_one_upstream_stream(self):
+        flights, upstream = SingleFlight(timeout=5), Upstream()
+
+        async def run():
+            first = asyncio.ensure_future(collect(flights.stream("k", upstream.stream)))
+            await asyncio.sleep(0.07)  # join after the first token went out
+            second = await collect(flights.stream("k", upstream.stream))
+            return await first, second
+
+        assert asyncio.run(run()) == ("abc", "abc")
+        assert upstream.calls == 1
+
+    def test_silent_leader_times_out_to_own_stream(self):
+        flights = SingleFlight(timeout=0.05)
+        silent, fast = Upstream(delay=5), Upstream(delay=0, tokens=("x", "y"))
+
+        async def run():
+            leader = asyncio.ensure_future(collect(flights.stream("k", silent.stream)))
+            await asyncio.sleep(0)
+            answer = await collect(flights.stream("k", fast.stream))
+            leader.cancel()
+            return answer
+
+        assert asyncio.run(run()) == "xy"
+        assert flights.get_stats()["timeouts"] == 1
+
+    def test_stream_error_reaches_every_subscriber(self):
+        flights = SingleFlight(timeout=5)
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            yield "a"
+            raise RuntimeError("stream broke")
+
+        async def run():
+            return await asyncio.gather(*[collect(flights.stream("k", failing)) for _ in range(2)], return_exceptions=True)
+
+        assert all(isinstance(r, RuntimeError) for r in asyncio.run(run()))
+
+
+# ──────────────────────────────────────────────
+# 3. Chat pipeline
+# ──────────────────────────────────────────────
+
+class TestCoalescingInChat:
+    @pytest.fixture(autouse=True)
+    def _slow_llm(self, monkeypatch, fake_llm):
+        calls = fake_llm("shared answer", delay=0.2)
+        monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", False)
+        from fastapi.testclient import TestClient
+        TestClient(app).post("/api/v1/documents/embed", json={
+            "content": "The admission notice lists the last date to apply.",
+            "title": "Notice",
+        }, params={"collection_name": COALESCE_COLLECTION})
+        self.calls = calls
+
+    def test_identical_questions_share_one_llm_call(self):
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+                return await asyncio.gather(*[
+                    ac.post("/api/v1/chat/", json={"message": question, "collection_name": COALESCE_COLLECTION})
+                    for question in ["When is the last date to apply?"] * 5 + ["when is the last date to apply"]
+                ])
+
+        before = llm_flights.get_stats()["followers"]
+        responses = asyncio.run(run())
+        assert [r.json()["response"] for r in responses] == ["shared answer"] * 6
+        assert len(self.calls) == 1
+        assert llm_flights.get_stats()["followers"] == before + 5
@@ -0,0 +1,156 @@
+"""
+Tests for the slow-request log: request traces, the background JSONL writer and its
+rotation, reading recent records back, and the breakdown recorded by the chat pipeline.
+"""
+
+import asyncio
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.models.chat import ChatMessage
+from app.services.llm_gateway import CircuitOpenError, LLMUnavailableError, failure_reason, llm_gateway
+from app.services.llm_providers import ProviderError
+from app.services.slow_request_log import SlowRequestLog, add_stage, annotate, slow_request_log
+
+client = TestClient(app)
+SLOW_COLLECTION = "slow_log_test"
+
+
+def make_log(tmp_path, **overrides):
+    options = {"threshold_ms": 0, "max_bytes": 1024 * 1024, "backup_count": 2, "queue_size": 100}
+    return SlowRequestLog(str(tmp_path / "slow.jsonl"), **{**options, **overrides})
+
+
+def message(text="What is the fee?", collection="default"):
+    return ChatMessage(message=text, collection_name=collection, session_id="s1")
+
+
+# ──────────────────────────────────────────────
+# 1. Traces and the writer
+# ──────────────────────────────────────────────
+
+class TestSlowRequestLog:
+    def test_slow_request_is_written_with_its_breakdown(self, tmp_path):
+        log = make_log(tmp_path)
+        with log.trace("chat", message()):
+            add_stage("embed", 0.01)
+            add_stage("serialization", 0.001)
+            add_stage("serialization", 0.001)
+            annotate(model="small-model", prompt_tokens=120, upstream_status="ok")
+        log.flush()
+
+        [record] = log.recent()
+        assert record["kind"] == "chat" and record["session_id"] == "s1"
+        assert record["stages_ms"] == {"embed": 10.0, "serialization": 2.0}
+        assert (record["model"], record["prompt_tokens"], record["upstream_status"]) == ("small-model", 120, "ok")
+        assert log.get_stats()["written"] == 1
+
+    def test_fast_requests_and_untraced_code_are_not_logged(self, tmp_path):
+        log = make_log(tmp_path, threshold_ms=60_000)
+        annotate(model="ignored")          # no active trace: a no-op
+        with log.trace("chat", message()):
+            pass
+        log.flush()
+        assert log.recent() == []
+
+    def test_errors_are_recorded(self, tmp_path):
+        log = make_log(tmp_path)
+        with pytest.raises(RuntimeError):
+            with log.trace("chat", message()):
+                raise RuntimeError("boom")
+        log.flush()
+        assert "boom" in log.recent()[0]["error"]
+
+    def test_tasks_annotate_the_same_trace(self, tmp_path):
+        log = make_log(tmp_path)
+
+        async def child():
+            add_stage("vector_query", 0.5)
+
+        async def run():
+            with log.trace("stream", message()) as trace:
+                await asyncio.gather(child())      # runs as a separate task, with a copy of the context
+                return trace
+
+        assert asyncio.run(run()).stages == {"vector_query": 0.5}
+
+    def test_rotation_and_recent_across_files(self, tmp_path):
+        log = make_log(tmp_path, max_bytes=1, backup_count=2)
+        for i in range(4):
+            with log.trace("chat", message(f"question {i}", collection="a" if i % 2 else "b")):
+                pass
+            log.flush()
+
+        assert sorted(os.listdir(tmp_path)) == ["slow.jsonl", "slow.jsonl.1", "slow.jsonl.2"]
+        # The oldest record was rotated out; the rest come back newest first
+        assert [r["query"] for r in log.recent()] == ["question 3", "question 2", "question 1"]
+        assert [r["query"] for r in log.recent(collection="a")] == ["question 3", "question 1"]
+        assert len(log.recent(limit=1)) == 1
+
+    def test_failure_reasons(self):
+        assert failure_reason(CircuitOpenError("open")) == "circuit_open"
+        assert failure_reason(asyncio.TimeoutError()) == "timeout"
+        try:
+            try:
+                raise ProviderError("busy", status_code=503)
+            except ProviderError as e:
+                raise LLMUnavailableError("failed") from e
+        except LLMUnavailableError as e:
+            assert failure_reason(e) == "503"
+        assert failure_reason(ValueError()) == "ValueError"
+
+
+# ──────────────────────────────────────────────
+# 2. The chat pipeline and the admin API
+# ──────────────────────────────────────────────
+
+class TestPipelineBreakdown:
+    @pytest.fixture(autouse=True)
+    def _log_everything(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(slow_request_log, "path", str(tmp_path / "slow.jsonl"))
+        monkeypatch.setattr(slow_request_log, "threshold_ms", 0)
+        monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", False)
+        client.post("/api/v1/documents/embed", json={
+            "content": "The hostel fee is 40,000 rupees per year, payable in two instalments.",
+            "title": "Hostel",
+        }, params={"collection_name": SLOW_COLLECTION})
+
+    def latest(self):
+        slow_request_log.flush()
+        return slow_request_log.recent(limit=1)[0]
+
+    def test_chat_breakdown(self, fake_llm):
+        fake_llm("It is 40,000 rupees.")
+        client.post("/api/v1/chat/", json={"message": "Hostel fee?", "collection_name": SLOW_COLLECTION})
+
+        record = self.latest()
+        assert record["kind"] == "chat" and record["collection"] == SLOW_COLLECTION
+        assert {"embed", "vector_query", "context_build", "llm_total", "serialization"} <= set(record["stages_ms"])
+        assert record["chunks"] and record["chunks"][0]["id"].endswith("_chunk_0")
+        assert record["answer_source"] == "llm" and record["upstream_status"] == "ok"
+        assert record["prompt_tokens"] > 0 and record["completion_tokens"] > 0 and record["model"]
+
+    def test_upstream_failure_is_recorded(self, monkeypatch, fake_llm):
+        def overloaded(kwargs):
+            raise ProviderError("overloaded", status_code=503)
+
+        fake_llm(overloaded)
+        monkeypatch.setattr(llm_gateway, "max_retries", 0)
+        client.post("/api/v1/chat/stream", json={"message": "Hostel fee instalments?", "collection_name": SLOW_COLLECTION})
+
+        record = self.latest()
+        assert record["kind"] == "stream"
+        assert (record["answer_source"], record["upstream_status"]) == ("degraded", "503")
+
+    def test_admin_endpoint(self, monkeypatch, admin_headers):
+        with slow_request_log.trace("chat", message(collection="other")):
+            pass
+        slow_request_log.flush()
+        body = client.get("/api/v1/admin/slow-requests", headers=admin_headers, params={"collection": "other"}).json()
+        assert body["threshold_ms"] == 0 and [r["collection"] for r in body["requests"]] == ["other"]
+        assert client.get("/api/v1/admin/slow-requests", headers=admin_headers, params={"min_total_ms": 10 ** 9}).json()["requests"] == []
+        assert client.get("/api/v1/admin/slow-requests").status_code in (401, 403)
@@ -30,6 +30,9 @@
   let activeView = "chat";
   let messages = [];
   let loading = false;
+  let socket = null;
+  let socketReady = null;
+  let streamingMsg = null;
 
   // ── API helpers ──
   async function apiPost(path, body) {
@@ -50,6 +53,52 @@
     }
   }
 
+  // ── WebSocket channel (one connection per conversation, HTTP fallback) ──
+  function openSocket() {
+    if (!("WebSocket" in window) || !sessionId) return Promise.resolve(null);
+    if (socketReady) return socketReady;
+    socketReady = new Promise((resolve) => {
+      const url = `${API_BASE.replace(/^http/, "ws")}/api/v1/chat/ws?session_id=${encodeURIComponent(sessionId)}`;
+      const ws = new WebSocket(url);
+      ws.onopen = () => { socket = ws; resolve(ws); };
+      ws.onmessage = (e) => handleFrame(JSON.parse(e.data));
+      ws.onerror = () => ws.close();
+      ws.onclose = () => {
+        socket = null;
+        socketReady = null;
+        resolve(null);
+        if (loading || streamingMsg) finishStream("Connection lost. Please try again.");
+      };
+    });
+    return socketReady;
+  }
+
+  function handleFrame(frame) {
+    if (frame.type === "ping") {
+      if (socket) socket.send(JSON.stringify({ type: "pong" }));
+    } else if (frame.type === "token") {
+      if (!streamingMsg) {
+        streamingMsg = { sender: "bot", text: "" };
+        messages.push(streamingMsg);
+        loading = false;
+      }
+      streamingMsg.text += frame.content;
+      renderMessages();
+    } else if (frame.type === "error") {
+      console.error("[VimalaBot] Chat error:", frame.detail);
+      if (!streamingMsg) finishStream("Error getting response. Please try again.");
+    } else if (frame.type === "done") {
+      finishStream();
+    }
+  }
+
+  function finishStream(errorText) {
+    if (errorText) messages.push({ sender: "bot", text: errorText });
+    streamingMsg = null;
+    loading = false;
+    renderMessages();
+  }
+
   async function sendMessage(text) {
     if (!text.trim()) return;
     messages.push({ sender: "user", text });
@@ -65,6 +114,12 @@
     loading = true;
     renderMessages();
 
+    const ws = await openSocket();
+    if (ws) {
+      ws.send(JSON.stringify({ message: text, collection_name: COLLECTION }));
+      return;
+    }
+
     try {
       const data = await apiPost("/chat/", {
         message: text,